@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from maneuver_recognition import FFP_INPUTS, classify_ffp, ffp_recognition_rowwise
+from storage import read_tables
+
+# --- FFP classifier benchmark ---
+# Times the original row-wise DataFrame.apply classifier against the vectorized
+# classify_ffp on the same table and checks that both produce identical labels.
+
+def synthetic_flight(rows, seed=0):
+    """Random flight state covering every FFP branch, with some NaNs sprinkled in."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Time': np.arange(rows) * 0.1,
+        'Roll': rng.uniform(-180, 180, rows),
+        'Pitch': rng.uniform(-70, 70, rows),
+        'VS_ms': rng.normal(0, 5, rows),
+        'G_Normal': rng.uniform(0.5, 4.0, rows),
+        'RollRate': rng.normal(0, 10, rows),
+        'PitchRate': rng.normal(0, 10, rows),
+        'TurnRate': rng.normal(0, 6, rows),
+        'SpecificPower': rng.normal(0, 20, rows),
+    })
+    for column in FFP_INPUTS:
+        df.loc[rng.random(rows) < 0.01, column] = np.nan
+    return df
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def benchmark(df, repeat):
+    rowwise_time, rowwise = best_time(lambda: ffp_recognition_rowwise(df.copy())['FFP_Label'].to_numpy(), repeat)
+    vectorized_time, vectorized = best_time(lambda: classify_ffp(df), repeat)
+    if not np.array_equal(rowwise, vectorized):
+        mismatches = np.flatnonzero(rowwise != vectorized)
+        raise SystemExit(f"Label mismatch in {len(mismatches)} rows (first at row {mismatches[0]}).")
+    print(f"{len(df):>10,} rows | row-wise {rowwise_time:8.3f}s | vectorized {vectorized_time:8.4f}s | speedup {rowwise_time / vectorized_time:8.1f}x | labels identical")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized FFP classifier against the row-wise implementation.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[10_000, 100_000], help="Synthetic table sizes to benchmark.")
+    parser.add_argument("--input-dir", help="Optionally benchmark real processed tables (e.g., '..._Processed/') instead.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best time is reported.")
+    args = parser.parse_args()
+
+    if args.input_dir:
+        for name, df in read_tables(args.input_dir).items():
+            print(f"{name}: ", end='')
+            benchmark(df, args.repeat)
+    else:
+        for rows in args.rows:
+            benchmark(synthetic_flight(rows), args.repeat)
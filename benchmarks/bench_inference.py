@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from tflite_backend import BACKENDS, load_model_backend, model_artifact_path
+from window_dataset import WindowDataset
+
+# --- Inference backend benchmark ---
+# Runs the Keras model and its exported TFLite artifacts on the same windows and reports
+# batch throughput, single-window latency and how often each backend's label agrees with
+# the Keras model's.
+
+def benchmark_windows(dataset_path, sequence_length, n_features, count, seed=0):
+    """Up to count windows of a window dataset, or random windows shaped like the model input."""
+    if dataset_path:
+        dataset = WindowDataset.load(dataset_path)
+        if dataset.sequence_length != sequence_length:
+            dataset = dataset.with_window(sequence_length)
+        return dataset.windows(np.arange(min(count, len(dataset)))).astype(np.float32)
+    return np.random.default_rng(seed).normal(size=(count, sequence_length, n_features)).astype(np.float32)
+
+def batch_throughput(model, windows, batch_size, repeat):
+    """Best windows/s over repeat passes of batched predictions, and the class indices."""
+    best, encoded = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        probabilities = [np.asarray(model.predict_on_batch(windows[i:i + batch_size])) for i in range(0, len(windows), batch_size)]
+        best = min(best, time.perf_counter() - start)
+        encoded = np.argmax(np.concatenate(probabilities), axis=1)
+    return len(windows) / best, encoded
+
+def single_latency(model, windows, calls):
+    """p50/p99 latency in ms of predicting one window per call."""
+    model.predict_on_batch(windows[:1])  # warm-up (graph tracing / tensor allocation)
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        model.predict_on_batch(windows[i % len(windows):i % len(windows) + 1])
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(np.array(latencies) * 1000, [50, 99])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Keras model against its TFLite CPU backends.")
+    parser.add_argument("model_path", help="Path to the trained Keras model (.h5); TFLite artifacts are looked up next to it.")
+    parser.add_argument("--dataset", help="Window dataset to take the windows from (default: random windows).")
+    parser.add_argument("--windows", type=int, default=10_000, help="Number of windows to predict.")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Windows per batched predict call.")
+    parser.add_argument("--calls", type=int, default=200, help="Single-window calls for the latency measurement.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per throughput measurement; the best is reported.")
+    args = parser.parse_args()
+
+    reference = load_model_backend(args.model_path, 'keras')
+    windows = benchmark_windows(args.dataset, reference.input_shape[1], reference.input_shape[2], args.windows)
+    print(f"{len(windows):,} windows of {windows.shape[1]} steps x {windows.shape[2]} features, batch size {args.batch_size}")
+    reference_labels = None
+    for backend in BACKENDS:
+        artifact_path = model_artifact_path(args.model_path, backend)
+        if not os.path.exists(artifact_path):
+            print(f"{backend:>12} | skipped, '{artifact_path}' not found")
+            continue
+        model = reference if backend == 'keras' else load_model_backend(args.model_path, backend)
+        throughput, labels = batch_throughput(model, windows, args.batch_size, args.repeat)
+        p50, p99 = single_latency(model, windows, args.calls)
+        if reference_labels is None:
+            reference_labels = labels
+        agreement = np.mean(labels == reference_labels) * 100
+        print(f"{backend:>12} | {os.path.getsize(artifact_path) / 1e6:6.2f} MB | {throughput:10,.0f} windows/s | "
+              f"1-window latency p50 {p50:7.2f} ms, p99 {p99:7.2f} ms | label agreement {agreement:6.2f}%")
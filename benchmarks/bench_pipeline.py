@@ -0,0 +1,166 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from synthetic_acmi import synthesize_track
+from acmi_converter import parse_acmi_content
+from feature_engineering import engineer_aircraft_features
+from maneuver_recognition import label_aircraft
+from curate_ml_data import extract_maneuver_clips
+from prepare_data_for_ml import aircraft_frames, build_window_dataset
+from storage import TABLE_FORMATS, DEFAULT_FORMAT
+from tflite_backend import BACKENDS, DEFAULT_BACKEND
+
+# --- Per-stage pipeline benchmark ---
+# Generates a synthetic track (synthetic_acmi.py) and runs every pipeline stage on it in this
+# process, each on the previous stage's output: ACMI parsing (parse_acmi_content, including
+# writing the partitioned tables), feature engineering, FFP and maneuver recognition,
+# curation, sequence preparation and, given a trained model, inference. For each stage it
+# reports the wall time (best of --repeat), rows/s and the peak Python memory (tracemalloc,
+# which also sees NumPy buffers, measured in a separate run).
+#
+# --save writes the results as a baseline; --baseline compares against one and fails (exit
+# code 1) when a stage's rows/s dropped, or its peak memory grew, by more than --tolerance.
+# The run also fails when a scripted maneuver was never recognized.
+
+def best_time(func, setup, repeat):
+    """Best wall time of func(setup()) over repeat runs (setup is not timed), and the last result."""
+    timings, result = [], None
+    for _ in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def peak_memory(func, setup):
+    data = setup()
+    tracemalloc.start()
+    try:
+        func(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def per_aircraft(task):
+    """Stage running task(aircraft_id, df) for every aircraft, dropping None results."""
+    def run(frames):
+        results = {aircraft_id: task(aircraft_id, df) for aircraft_id, df in frames.items()}
+        return {aircraft_id: result for aircraft_id, result in results.items() if result is not None}
+    return run
+
+def copied(frames):
+    return lambda: {aircraft_id: df.copy() for aircraft_id, df in frames.items()}
+
+# --- Stages: (name, run(data) -> output, setup() -> data, rows(output)) built one at a time ---
+
+def parse_stage(data, fmt):
+    def run(content):
+        with tempfile.TemporaryDirectory() as output_dir:
+            parser = parse_acmi_content(io.BytesIO(content), output_dir, fmt=fmt)
+        return {object_id: df for _, object_id, df in sorted(parser.to_frames(), key=lambda item: item[1])}
+    return run, lambda: data
+
+def prepare_stage(frames, sequence_length, stride):
+    def run(frames):
+        return build_window_dataset([(aircraft_id,) + aircraft_frames(df) for aircraft_id, df in frames.items()], sequence_length, stride)
+    return run, copied(frames)
+
+def inference_stage(dataset, model_path, backend):
+    # Imported here so that the benchmark runs without TensorFlow when no model is given.
+    from predict_maneuvers import load_predictor, predict_encoded
+    model, _ = load_predictor(model_path, backend)
+    if model.input_shape[1] != dataset.sequence_length:
+        dataset = dataset.with_window(model.input_shape[1])
+    return lambda dataset: predict_encoded(model, dataset), lambda: dataset
+
+def table_rows(frames):
+    return sum(len(df) for df in frames.values())
+
+def recognized_maneuvers(labeled):
+    names = set()
+    for df in labeled.values():
+        names.update(label for label in df['Maneuver_Label'].dropna().unique() if label)
+    return names
+
+def run_benchmark(args):
+    lines, flown = synthesize_track(args.aircraft, args.duration, args.rate, args.seed)
+    content = ("\n".join(lines) + "\n").encode('utf-8')
+    scripted = {name for maneuvers in flown.values() for name, _ in maneuvers}
+    print(f"Synthetic track: {args.aircraft} aircraft x {args.duration:g}s at {args.rate:g} Hz, {len(content) / 1e6:.1f} MB, seed {args.seed}")
+
+    results, problems = {}, []
+    def measure(name, run, setup, rows):
+        with redirect_stdout(io.StringIO()):
+            elapsed, output = best_time(run, setup, args.repeat)
+            peak = peak_memory(run, setup) if not args.no_memory else None
+        results[name] = {'rows': rows(output), 'seconds': elapsed, 'rows_per_s': rows(output) / elapsed if elapsed > 0 else float('inf'), 'peak_mb': None if peak is None else peak / 1e6}
+        return output
+
+    frames = measure('parse', *parse_stage(content, args.format), table_rows)
+    processed = measure('feature', per_aircraft(lambda aircraft_id, df: engineer_aircraft_features(df, aircraft_id)), copied(frames), table_rows)
+    labeled = measure('recog', per_aircraft(lambda aircraft_id, df: label_aircraft(df)), copied(processed), table_rows)
+    curated = measure('curate', per_aircraft(lambda aircraft_id, df: extract_maneuver_clips(df, args.padding)[0]), copied(labeled), table_rows)
+    dataset = measure('prepare', *prepare_stage(curated, args.sequence_length, args.stride), lambda dataset: len(dataset) if dataset is not None else 0)
+    if args.model and dataset is not None:
+        measure('inference', *inference_stage(dataset, args.model, args.backend), len)
+
+    missing = scripted - recognized_maneuvers(labeled)
+    if missing:
+        problems.append(f"scripted maneuvers never recognized: {', '.join(sorted(missing))}")
+    return results, problems
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against a saved baseline, as messages."""
+    regressions = []
+    for stage, result in results.items():
+        reference = baseline.get(stage)
+        if reference is None:
+            continue
+        if result['rows_per_s'] < reference['rows_per_s'] * (1 - tolerance):
+            regressions.append(f"{stage}: {result['rows_per_s']:,.0f} rows/s, baseline {reference['rows_per_s']:,.0f}")
+        if result['peak_mb'] is not None and reference.get('peak_mb') and result['peak_mb'] > reference['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{stage}: peak {result['peak_mb']:.1f} MB, baseline {reference['peak_mb']:.1f} MB")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on a synthetic track.")
+    parser.add_argument("--aircraft", type=int, default=8, help="Aircraft in the synthetic track.")
+    parser.add_argument("--duration", type=float, default=900.0, help="Track length in seconds.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Samples per second per aircraft.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic track.")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=DEFAULT_FORMAT, help="Storage format the parse stage writes.")
+    parser.add_argument("--padding", type=float, default=5.0, help="Curation padding in seconds.")
+    parser.add_argument("--sequence-length", type=int, default=20, help="Window length of the prepare stage.")
+    parser.add_argument("--stride", type=int, default=1, help="Window stride of the prepare stage.")
+    parser.add_argument("--model", help="Trained model (.h5) for the inference stage (default: skip inference).")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND, help="Inference backend.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best time is reported.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slower) peak memory runs.")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed rows/s drop and peak memory growth against the baseline (fraction).")
+    parser.add_argument("--save", help="Write the results as JSON (e.g. to use as a baseline later).")
+    args = parser.parse_args()
+
+    results, problems = run_benchmark(args)
+    for stage, result in results.items():
+        peak = f"{result['peak_mb']:8.1f} MB" if result['peak_mb'] is not None else '       - MB'
+        print(f"{stage:>10} | {result['rows']:>10,} rows | {result['seconds']:8.3f}s | {result['rows_per_s']:>12,.0f} rows/s | peak {peak}")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to '{args.save}'.")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            problems += compare(results, json.load(f), args.tolerance)
+    if problems:
+        print("\nFAIL:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("\nOK" + (f", within {args.tolerance:.0%} of the baseline." if args.baseline else "."))
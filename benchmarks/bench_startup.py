@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+from cloudsense import COMMANDS
+
+# --- CLI startup budget ---
+# Times 'cloudsense --help' and 'cloudsense <command> --help' in fresh interpreters and lists
+# the heavy packages each one imported (from python -X importtime). Fails (exit code 1) when
+# a command is slower than its budget or imports a heavy package it should not need just to
+# start: --help never needs TensorFlow, scikit-learn or matplotlib, not even for 'train' or 'plot'.
+
+HEAVY_PACKAGES = ('numpy', 'pandas', 'pyarrow', 'matplotlib', 'sklearn', 'joblib', 'tensorflow')
+DEFAULT_BUDGET = 2.0  # seconds
+BUDGETS = {None: 0.3}
+DEFAULT_ALLOWED = {'numpy', 'pandas', 'pyarrow'}
+ALLOWED = {None: set()}
+
+def startup(command, repeat):
+    """Best wall time of 'cloudsense [command] --help', the heavy packages imported and any error."""
+    arguments = [sys.executable, '-X', 'importtime', os.path.join(ROOT_DIR, 'cloudsense.py')] + ([command] if command else []) + ['--help']
+    best, imported, error = float('inf'), set(), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(arguments, capture_output=True, text=True)
+        best = min(best, time.perf_counter() - start)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+            break
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                module = line.rsplit('|', 1)[1].strip()
+                if module.split('.')[0] in HEAVY_PACKAGES:
+                    imported.add(module.split('.')[0])
+    return best, imported, error
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the startup time and imports of the cloudsense CLI against a budget.")
+    parser.add_argument("commands", nargs='*', help="Commands to check (default: the bare CLI and every command).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per command; the best time is reported.")
+    args = parser.parse_args()
+
+    failures = 0
+    for command in args.commands or [None] + list(COMMANDS):
+        name = command or '(none)'
+        elapsed, imported, error = startup(command, args.repeat)
+        if error and 'ModuleNotFoundError' in error:
+            print(f"{name:>12} | skipped, {error}")
+            continue
+        budget = BUDGETS.get(command, DEFAULT_BUDGET)
+        unexpected = imported - ALLOWED.get(command, DEFAULT_ALLOWED)
+        problems = [f"error: {error}"] if error else []
+        if elapsed > budget:
+            problems.append(f"over the {budget:.1f}s budget")
+        if unexpected:
+            problems.append(f"imports {', '.join(sorted(unexpected))}")
+        failures += bool(problems)
+        status = 'FAIL: ' + '; '.join(problems) if problems else 'ok'
+        print(f"{name:>12} | {elapsed:6.3f}s / {budget:4.1f}s | heavy imports: {', '.join(sorted(imported)) or '-':<28} | {status}")
+
+    if failures:
+        print(f"\n{failures} command(s) failed the startup budget.")
+        sys.exit(1)
+    print("\nAll commands are within the startup budget.")
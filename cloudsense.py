@@ -0,0 +1,69 @@
+import os
+import sys
+import types
+import argparse
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+# --- Unified command line ---
+# One entry point for every tool: 'python cloudsense.py <command> [args]'. Each command is the
+# existing script, run as if it had been started directly, so arguments and help are its own.
+# Nothing but the standard library is imported here: pandas, matplotlib or TensorFlow are only
+# loaded by the command that needs them, after it has been chosen.
+
+COMMANDS = {
+    'pipeline': (os.path.join(ROOT_DIR, 'run_pipeline.py'), "Run the full pipeline (or some of its steps) on a track."),
+    'convert': (os.path.join(SRC_DIR, 'acmi_converter.py'), "Convert an .acmi track into per-aircraft tables."),
+    'feature': (os.path.join(SRC_DIR, 'feature_engineering.py'), "Calculate flight dynamics features."),
+    'recog': (os.path.join(SRC_DIR, 'maneuver_recognition.py'), "Label FFPs and maneuvers."),
+    'curate': (os.path.join(SRC_DIR, 'curate_ml_data.py'), "Extract maneuver clips for ML training."),
+    'prepare': (os.path.join(SRC_DIR, 'prepare_data_for_ml.py'), "Build a window dataset from curated tables."),
+    'catalog': (os.path.join(SRC_DIR, 'dataset_catalog.py'), "Manage a multi-session dataset catalog."),
+    'train': (os.path.join(SRC_DIR, 'train_lstm.py'), "Train the LSTM model (loads TensorFlow)."),
+    'export': (os.path.join(SRC_DIR, 'tflite_backend.py'), "Export a trained model for the TFLite CPU backend."),
+    'predict': (os.path.join(SRC_DIR, 'predict_maneuvers.py'), "Predict maneuvers on a dataset or straight from a track."),
+    'serve': (os.path.join(SRC_DIR, 'inference_server.py'), "Run the warm local inference server."),
+    'live': (os.path.join(SRC_DIR, 'live_ingest.py'), "Follow a track while it is recorded."),
+    'plot': (os.path.join(SRC_DIR, 'visualize.py'), "Plot a labeled aircraft's flight parameters."),
+    'plot-3d': (os.path.join(SRC_DIR, 'visualize_3d.py'), "Plot a labeled aircraft's 3D flight path."),
+    'to-acmi': (os.path.join(SRC_DIR, 'csv_to_acmi.py'), "Convert a flight table back to an .acmi track."),
+    'export-csv': (os.path.join(SRC_DIR, 'storage.py'), "Export a directory of Parquet/Feather tables to CSV."),
+    'synth': (os.path.join(SRC_DIR, 'synthetic_acmi.py'), "Generate a synthetic track with scripted maneuvers."),
+}
+
+def run_command(command, args):
+    """
+    Runs a command's script as __main__ with args as its command line. Unlike runpy.run_path
+    this keeps 'cloudsense <command>' as argv[0], so usage messages name the command.
+    """
+    script_path = COMMANDS[command][0]
+    with open(script_path, 'rb') as f:
+        code = compile(f.read(), script_path, 'exec')
+    module = types.ModuleType("__main__")
+    module.__file__ = script_path
+    sys.argv = [f"cloudsense {command}"] + list(args)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    # Worker processes find the script's functions through sys.modules['__main__'].
+    previous_main, sys.modules["__main__"] = sys.modules["__main__"], module
+    try:
+        exec(code, module.__dict__)
+    finally:
+        sys.modules["__main__"] = previous_main
+
+def main(argv=None):
+    listing = "\n".join(f"  {name:<11} {description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="cloudsense",
+        description="CLOUDSENSE command line. Run 'cloudsense <command> --help' for the options of a command.",
+        epilog=f"commands:\n{listing}",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command", help="One of the commands listed below.")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments passed on to the command.")
+    args = parser.parse_args(argv)
+    run_command(args.command, args.args)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 import os
+import sys
 import subprocess
 import argparse
 import hashlib
 
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+sys.path.insert(0, SRC_DIR)
+
+from step_cache import StepCache, skip_fresh_steps
+from dataset_catalog import DatasetCatalog
+from run_metrics import PROFILERS, RunMetrics, children_peak_rss_mb
+from tflite_backend import BACKENDS
+
 def run_command(command, step_name):
     """Executes a command line command and prints its status."""
     print(f"\n{'='*20}\n[RUNNING] {step_name}\n{'='*20}")
@@ -20,18 +29,156 @@ def run_command(command, step_name):
         print("Please ensure Python is in your system's PATH.")
         exit(1)
 
+def run_in_process(steps, path_context, options, on_step_complete=None):
+    """Runs the steps with the in-process engine, exiting with an error like run_command does."""
+    from pipeline import run_steps, StepError
+    try:
+        run_steps(steps, path_context, options, on_step_complete)
+    except StepError as e:
+        print(f"[ERROR] {e}")
+        exit(1)
+
+def session_paths(input_file, args):
+    """Deterministic session name of a track (from its path) and every path of its run."""
+    hasher = hashlib.md5()
+    hasher.update(input_file.encode('utf-8'))
+    session_id = hasher.hexdigest()[:6]
+    base_name = f"Run-{session_id}"
+    path_context = {
+        "session_name": base_name,
+        "workers": str(args.workers),
+        "format": args.format,
+        "padding": str(args.padding),
+        "sequence_length": str(args.sequence_length),
+        "stride": str(args.stride),
+        "input_file": input_file,
+        "output_dir": args.output_dir,
+        "partitioned_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Partitioned"),
+        "processed_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Processed"),
+        "labeled_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Labeled"),
+        "curated_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Curated_For_ML"),
+        "ml_output_dir": os.path.join(args.output_dir, "ml_data"),
+        "dataset_path": os.path.join(args.output_dir, "ml_data", f"{base_name}_dataset"),
+        "train_input": args.catalog or os.path.join(args.output_dir, "ml_data", f"{base_name}_dataset"),
+        "model_path": os.path.join("models", f"{base_name}_lstm_model.h5"),
+        "encoder_path": os.path.join("models", f"{base_name}_lstm_model_encoder.joblib"),
+        "cache_manifest": os.path.join(args.output_dir, f"{base_name}_cache.json"),
+        "metrics_path": os.path.join(args.output_dir, f"{base_name}_metrics.json"),
+        "profile_dir": os.path.join(args.output_dir, f"{base_name}_profiles"),
+        "log_path": os.path.join(args.output_dir, f"{base_name}_log.txt")
+    }
+    return base_name, path_context
+
+def pipeline_options(args):
+    return {
+        "workers": args.workers,
+        "format": args.format,
+        "padding": args.padding,
+        "sequence_length": args.sequence_length,
+        "stride": args.stride,
+        "ffp_thresholds": args.ffp_thresholds,
+        "maneuver_library": args.maneuver_library,
+        "catalog": args.catalog,
+        "checkpoint": args.checkpoint,
+        "epochs": args.epochs,
+        "warm_start": args.warm_start,
+        "exports": sorted(set(args.export)),
+    }
+
+def run_batch_mode(args, steps_to_run, step_choices):
+    """
+    Batch mode (see src/batch_pipeline.py): the per-track steps of every recording matched by
+    args.input_file, then one 'train' on the window datasets of all of them.
+    """
+    from batch_pipeline import TRACK_STEPS, BatchManifest, expand_inputs, memory_budget_mb, register_datasets, run_batch
+    if args.engine == "subprocess":
+        print("[ERROR] Batch mode runs with the in-process engine; drop '--engine subprocess'.")
+        exit(1)
+    selected = [step["short_name"] for step in steps_to_run]
+    if any(name in TRACK_STEPS for name in selected) and "prepare" not in selected:
+        print("[ERROR] Batch mode runs the per-track steps through 'prepare'; use --start-step or --single-step prepare/train.")
+        exit(1)
+    input_files = expand_inputs(args.input_file)
+    if not input_files:
+        print(f"[ERROR] No ACMI recordings found for '{args.input_file}'.")
+        exit(1)
+
+    hasher = hashlib.md5()
+    hasher.update(args.input_file.encode('utf-8'))
+    batch_name = f"Batch-{hasher.hexdigest()[:6]}"
+    catalog_path = args.catalog or os.path.join(args.output_dir, f"{batch_name}_catalog.json")
+    print(f"Input: {args.input_file} ({len(input_files)} recordings)")
+    print(f"Generated consistent batch name for output: '{batch_name}'")
+    os.makedirs(os.path.join(args.output_dir, "ml_data"), exist_ok=True)
+    os.makedirs("models", exist_ok=True)
+
+    # --- Per-track steps, several tracks at a time; every track is its own Run-<hash> session ---
+    # Parallelism is across tracks, so every track processes its aircraft serially.
+    options = dict(pipeline_options(args), workers=1, catalog=None)
+    track_steps = [step for step in steps_to_run if step["short_name"] in TRACK_STEPS]
+    tracks = [(input_file, session_paths(input_file, args)[1], track_steps) for input_file in input_files]
+    manifest = BatchManifest(os.path.join(args.output_dir, f"{batch_name}_manifest.json"), args.input_file)
+    if track_steps:
+        run_batch(tracks, manifest, options, step_choices, args.workers, memory_budget_mb(args.memory_budget), args.force, args.profile)
+
+    catalog = DatasetCatalog(catalog_path)
+    try:
+        shards = register_datasets(manifest, tracks, catalog)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Could not register the window datasets in catalog '{catalog_path}': {e}")
+        exit(1)
+    statuses = {}
+    for input_file, _, _ in tracks:
+        status = manifest.tracks.get(os.path.abspath(input_file), {}).get("status", "not run")
+        statuses[status] = statuses.get(status, 0) + 1
+    print("\nBatch tracks: " + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())) + f". {shards} sessions in catalog '{catalog_path}'.")
+
+    # --- One 'train' on every session of the catalog ---
+    if "train" in selected:
+        if shards == 0:
+            print("[ERROR] No track produced a window dataset; nothing to train on.")
+            exit(1)
+        train_steps = [step for step in steps_to_run if step["short_name"] == "train"]
+        batch_context = {
+            "session_name": batch_name,
+            "model_path": os.path.join("models", f"{batch_name}_lstm_model.h5"),
+            "encoder_path": os.path.join("models", f"{batch_name}_lstm_model_encoder.joblib"),
+        }
+        train_options = dict(options, catalog=catalog_path)
+        cache = StepCache(os.path.join(args.output_dir, f"{batch_name}_cache.json"))
+        step_keys = cache.step_keys(["train"], catalog_path, train_options)
+        if not args.force:
+            train_steps = skip_fresh_steps(train_steps, cache, step_keys, batch_context)
+        metrics = RunMetrics({"session_name": batch_name, "input_file": args.input_file, "engine": "inprocess", "batch": True, "sessions": shards},
+                             args.profile, os.path.join(args.output_dir, f"{batch_name}_profiles"))
+        train_options["metrics"] = metrics
+        def on_step_complete(step, saved):
+            if saved:
+                cache.record(step["short_name"], step_keys[step["short_name"]], batch_context)
+        try:
+            run_in_process(train_steps, batch_context, train_options, on_step_complete)
+        finally:
+            if metrics.steps:
+                metrics.save(os.path.join(args.output_dir, f"{batch_name}_metrics.json"))
+
+    print(f"\n{'='*20}\nBATCH EXECUTION FINISHED.\n{'='*20}")
+    print(f"Per-track progress: '{manifest.manifest_path}'")
+    if statuses.get("failed"):
+        print(f"{statuses['failed']} tracks failed; run the same command again to retry them (see their *_log.txt files).")
+        exit(1)
+
 def main():
     """
     Main function to run the data processing pipeline with step control and deterministic naming.
     """
     
     pipeline_steps = [
-        {"name": "Step 1: ACMI Conversion", "short_name": "convert", "command_template": ["python", "src/acmi_converter.py", "{input_file}", "-o", "{output_dir}", "-sn", "{session_name}"]},
-        {"name": "Step 2: Feature Engineering", "short_name": "feature", "command_template": ["python", "src/feature_engineering.py", "{partitioned_dir}", "{output_dir}"]},
-        {"name": "Step 3: Maneuver Recognition", "short_name": "recog", "command_template": ["python", "src/maneuver_recognition.py", "{processed_dir}", "{output_dir}"]},
-        {"name": "Step 4: Curate ML Data", "short_name": "curate", "command_template": ["python", "src/curate_ml_data.py", "{labeled_dir}", "{output_dir}", "--padding", "5"]},
-        {"name": "Step 5: Prepare Data for ML", "short_name": "prepare", "command_template": ["python", "src/prepare_data_for_ml.py", "{curated_dir}", "{sequences_path}", "{labels_path}"]},
-        {"name": "Step 6: Train LSTM Model", "short_name": "train", "command_template": ["python", "src/train_lstm.py", "{sequences_path}", "{labels_path}", "{model_path}"]}
+        {"name": "Step 1: ACMI Conversion", "short_name": "convert", "command_template": ["python", "src/acmi_converter.py", "{input_file}", "-o", "{output_dir}", "-sn", "{session_name}", "-w", "{workers}", "--format", "{format}"]},
+        {"name": "Step 2: Feature Engineering", "short_name": "feature", "command_template": ["python", "src/feature_engineering.py", "{partitioned_dir}", "{output_dir}", "--format", "{format}", "--workers", "{workers}"]},
+        {"name": "Step 3: Maneuver Recognition", "short_name": "recog", "command_template": ["python", "src/maneuver_recognition.py", "{processed_dir}", "{output_dir}", "--format", "{format}", "--workers", "{workers}"]},
+        {"name": "Step 4: Curate ML Data", "short_name": "curate", "command_template": ["python", "src/curate_ml_data.py", "{labeled_dir}", "{output_dir}", "--padding", "{padding}", "--format", "{format}", "--workers", "{workers}"]},
+        {"name": "Step 5: Prepare Data for ML", "short_name": "prepare", "command_template": ["python", "src/prepare_data_for_ml.py", "{curated_dir}", "{dataset_path}", "--sequence_length", "{sequence_length}", "--stride", "{stride}", "--workers", "{workers}"]},
+        {"name": "Step 6: Train LSTM Model", "short_name": "train", "command_template": ["python", "src/train_lstm.py", "{train_input}", "{model_path}"]}
     ]
 
     step_choices = [step['short_name'] for step in pipeline_steps]
@@ -46,54 +193,126 @@ def main():
         description="Run the complete aircraft maneuver recognition pipeline. Generates a unique, consistent name for each input file.",
         formatter_class=argparse.RawTextHelpFormatter
     )
-    parser.add_argument("input_file", help="Path to the input .acmi or .zip.acmi file.")
+    parser.add_argument("input_file", help="Path to the input .acmi or .zip.acmi file, or a directory or quoted glob pattern\n(e.g. 'archive/**/*.zip.acmi') of recordings for batch mode.")
     parser.add_argument("output_dir", help="Path to the base output directory for all processed data.")
 
     step_control_group = parser.add_mutually_exclusive_group()
     step_control_group.add_argument("--start-step", choices=step_choices, default=step_choices[0], help=f"Start the pipeline from this step.\n(default: {step_choices[0]})\n\n{step_help}")
     step_control_group.add_argument("--single-step", choices=step_choices, help=f"Run only a single specified step.\n\n{step_help}")
+    parser.add_argument("--format", choices=["parquet", "feather", "csv"], default="parquet", help="Storage format for the intermediate per-aircraft tables.\nUse 'python src/storage.py <dir> <csv_dir>' to export any stage to CSV.\n(default: parquet)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes for parallel stages (0 = all cores).\nIn batch mode: number of tracks processed at a time.\n(default: 1)")
+    parser.add_argument("--memory-budget", type=float, help="Batch mode: memory (MB) the tracks running at the same time may use together.\n(default: 80%% of the available memory)")
+    parser.add_argument("--padding", type=float, default=5.0, help="Seconds of padding around each curated maneuver clip.\n(default: 5)")
+    parser.add_argument("--sequence-length", type=int, default=20, help="Number of time steps in each ML sequence.\n(default: 20)")
+    parser.add_argument("--ffp-thresholds", help="JSON file overriding the FFP classification thresholds used by 'recog'.")
+    parser.add_argument("--maneuver-library", help="JSON file with the maneuver definitions used by 'recog' (replaces the built-in ones).")
+    parser.add_argument("--stride", type=int, default=1, help="Time steps between the starts of consecutive ML sequences.\n(default: 1)")
+    parser.add_argument("--catalog", help="Dataset catalog (.json) to register this session's window dataset in after 'prepare';\n'train' then trains on every session in the catalog.")
+    parser.add_argument("--epochs", type=int, default=20, help="Maximum number of training epochs; training stops earlier once the validation loss\nstops improving, and an interrupted 'train' resumes from its checkpoint.\n(default: 20)")
+    parser.add_argument("--warm-start", help="Trained model (.h5) that 'train' fine-tunes instead of training from scratch; with\n--catalog only the sessions the model has not seen (or that changed) are used.")
+    parser.add_argument("--export", nargs='+', choices=BACKENDS[1:], default=[], help="Also export the model 'train' writes for these CPU inference backends\n(e.g. 'tflite tflite-int8'), for predict_maneuvers.py --backend.")
+    parser.add_argument("--engine", choices=["inprocess", "subprocess"], default="inprocess", help="'inprocess' runs all steps in this interpreter and passes data between them in memory.\n'subprocess' runs every step as a separate script, round-tripping data through disk.\n(default: inprocess)")
+    parser.add_argument("--force", action="store_true", help="Re-run every selected step even if the step cache says its outputs are up to date.")
+    parser.add_argument("--checkpoint", action="store_true", help="In-process engine: also write every intermediate step's output to disk so a later\n--start-step can resume from it. Without it only the last step's output, the\n.npy dataset and the model are written.")
+    parser.add_argument("--profile", choices=PROFILERS, help="Profile every step with cProfile ('cprofile', .prof files) or a sampling profiler\n('sample', collapsed stacks) into <output_dir>/<session>_profiles/.")
     
     args = parser.parse_args()
 
+    if args.single_step:
+        steps_to_run = [pipeline_steps[step_map[args.single_step]]]
+    else:
+        steps_to_run = pipeline_steps[step_map[args.start_step]:]
+    from batch_pipeline import is_batch_input
+    if is_batch_input(args.input_file):
+        run_batch_mode(args, steps_to_run, step_choices)
+        return
+
     # --- 1. Configuration: Generate a deterministic unique name and derive all paths ---
-    hasher = hashlib.md5()
-    hasher.update(args.input_file.encode('utf-8'))
-    session_id = hasher.hexdigest()[:6]
-    base_name = f"Run-{session_id}"
-    
+    base_name, path_context = session_paths(args.input_file, args)
     print(f"Input file: {args.input_file}")
     print(f"Generated consistent session name for output: '{base_name}'")
 
-    path_context = {
-        "session_name": base_name,
-        "input_file": args.input_file,
-        "output_dir": args.output_dir,
-        "partitioned_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Partitioned"),
-        "processed_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Processed"),
-        "labeled_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Labeled"),
-        "curated_dir": os.path.join(args.output_dir, f"{base_name}_FlightData_Curated_For_ML"),
-        "ml_output_dir": os.path.join(args.output_dir, "ml_data"),
-        "sequences_path": os.path.join(args.output_dir, "ml_data", f"{base_name}_sequences.npy"),
-        "labels_path": os.path.join(args.output_dir, "ml_data", f"{base_name}_labels.npy"),
-        "model_path": os.path.join("models", f"{base_name}_lstm_model.h5")
-    }
-
     os.makedirs(path_context["ml_output_dir"], exist_ok=True)
     os.makedirs("models", exist_ok=True)
     
     for step in pipeline_steps:
         step["command"] = [p.format(**path_context) for p in step["command_template"]]
+    recog_command = pipeline_steps[step_map["recog"]]["command"]
+    if args.ffp_thresholds:
+        recog_command += ["--ffp-thresholds", args.ffp_thresholds]
+    if args.maneuver_library:
+        recog_command += ["--maneuver-library", args.maneuver_library]
+    train_command = pipeline_steps[step_map["train"]]["command"]
+    train_command += ["--epochs", str(args.epochs)]
+    if args.warm_start:
+        train_command += ["--warm-start", args.warm_start]
+    if args.export:
+        train_command += ["--export"] + args.export
 
     # --- 2. Execution Logic ---
-    if args.single_step:
-        step_index = step_map[args.single_step]
-        step_to_run = pipeline_steps[step_index]
-        run_command(step_to_run["command"], step_to_run["name"])
+    options = pipeline_options(args)
+
+    # --- 3. Step cache: skip steps whose outputs are up to date for this input, parameters and code ---
+    cache, step_keys = None, {}
+    selected_steps = [step["short_name"] for step in steps_to_run]
+    if os.path.exists(args.input_file):
+        cache = StepCache(path_context["cache_manifest"])
+        step_keys = cache.step_keys(step_choices, args.input_file, options)
+        if not args.force:
+            steps_to_run = skip_fresh_steps(steps_to_run, cache, step_keys, path_context)
     else:
-        start_index = step_map[args.start_step]
-        steps_to_run = pipeline_steps[start_index:]
-        for step in steps_to_run:
-            run_command(step["command"], step["name"])
+        print(f"Warning: Input file '{args.input_file}' not found; the step cache is disabled for this run.")
+
+    # --- 4. Dataset catalog: register this session's dataset so 'train' sees every session ---
+    catalog = DatasetCatalog(args.catalog) if args.catalog else None
+    def register_dataset():
+        try:
+            catalog.add(path_context["dataset_path"], name=base_name)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Could not register the dataset in catalog '{args.catalog}': {e}")
+            exit(1)
+        print(f"Registered '{path_context['dataset_path']}' in catalog '{args.catalog}' ({len(catalog.shard_names)} sessions).")
+        if cache is not None:
+            # The train key covers the catalog's content, which just changed.
+            step_keys.update(cache.step_keys(step_choices, args.input_file, options))
+
+    if catalog is not None and base_name not in catalog.shard_names and os.path.isdir(path_context["dataset_path"]) \
+            and "prepare" not in [step["short_name"] for step in steps_to_run]:
+        register_dataset()
+
+    def on_step_complete(step, saved):
+        if catalog is not None and step["short_name"] == "prepare" and saved:
+            register_dataset()
+        if cache is None: return
+        if saved:
+            cache.record(step["short_name"], step_keys[step["short_name"]], path_context)
+        else:
+            cache.forget(step["short_name"])
+
+    # --- 5. Run metrics: wall/CPU time, rows, bytes and peak memory per step (and per aircraft in-process) ---
+    metrics = RunMetrics({
+        "session_name": base_name,
+        "input_file": args.input_file,
+        "engine": args.engine,
+        "workers": args.workers,
+        "format": args.format,
+        "cached_steps": [name for name in selected_steps if name not in [step["short_name"] for step in steps_to_run]],
+    }, args.profile, path_context["profile_dir"])
+    options["metrics"] = metrics
+
+    try:
+        if args.engine == "subprocess":
+            for step in steps_to_run:
+                with metrics.step(step["short_name"]) as record:
+                    run_command(step["command"], step["name"])
+                    record["worker_peak_rss_mb"] = children_peak_rss_mb()
+                on_step_complete(step, True)
+        else:
+            run_in_process(steps_to_run, path_context, options, on_step_complete)
+    finally:
+        metrics.save(path_context["metrics_path"])
+        if metrics.steps:
+            print(f"\nStep metrics (saved to '{path_context['metrics_path']}'):\n{metrics.summary()}")
 
     print(f"\n{'='*20}\nPIPELINE EXECUTION FINISHED.\n{'='*20}")
     print(f"All outputs for this run are named with the consistent prefix: '{base_name}'")
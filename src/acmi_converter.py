@@ -1,159 +1,490 @@
-import csv
+import io
 import os
 import re
+import sys
+import gzip
+import time
 import argparse
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import zipfile
 import tempfile
+import numpy as np
+import pandas as pd
+from storage import TABLE_FORMATS, DEFAULT_FORMAT, table_path, write_table
+from schema import FLOAT_DTYPE, is_exact_column
 
-def parse_acmi_content(file_stream, output_dir):
+BASE_KINEMATIC_HEADERS = [
+    'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw', 'U', 'V', 'W'
+]
+
+# --- MODIFIED: Only target Aircraft. Weapons will now be ignored. ---
+TARGET_OBJECT_TYPES = {
+    'Aircraft': 'Air+FixedWing'
+}
+
+T_LINE_PATTERN = re.compile(r'^([0-9a-fA-F]+),T=(.*)$')
+TIME_PATTERN = re.compile(r'^#(\d+(\.\d+)?)$')
+TYPE_PATTERN = re.compile(r'Type=([a-zA-Z0-9\+_-]+)')
+# Commas inside text values (names, pilots) are escaped as '\,'.
+ATTRIBUTE_SEPARATOR_PATTERN = re.compile(r'(?<!\\),')
+PARALLEL_CHUNK_SIZE = 16 << 20
+
+
+def _forward_fill_positions(n_rows, rows):
+    """For every row, the position of the most recent update at or before it (-1 if none)."""
+    positions = np.full(n_rows, -1, dtype=np.int64)
+    positions[np.frombuffer(rows, dtype=np.int64)] = np.arange(len(rows), dtype=np.int64)
+    return np.maximum.accumulate(positions)
+
+
+def _forward_fill_numeric(n_rows, rows, values, dtype=np.float64):
+    filled = np.append(np.frombuffer(values, dtype=np.float64), np.nan).astype(dtype, copy=False)
+    return filled[_forward_fill_positions(n_rows, rows)]
+
+
+def _forward_fill_attribute(n_rows, rows, values):
+    """Numeric attributes become float64 columns, everything else a categorical."""
+    positions = _forward_fill_positions(n_rows, rows)
+    try:
+        numeric = np.append(np.asarray(values, dtype=np.float64), np.nan)
+        return numeric[positions]
+    except ValueError:
+        codes, categories = pd.factorize(np.asarray(values, dtype=object))
+        codes = np.append(codes, -1)[positions]
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+
+class ObjectTrack:
     """
-    Parses ACMI content, focusing only on aircraft and saving them to a single
-    flat directory. Dynamically discovers all attributes to use as headers.
+    Columnar sample buffer for a single object. Every T-line appends one row, but only
+    the values actually present on that line are stored (row index + value). The
+    carried-forward state of the original per-row dict copies is rebuilt once, at the
+    end, by forward-filling each column.
     """
-    BASE_KINEMATIC_HEADERS = [
-        'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw', 'U', 'V', 'W'
-    ]
-    
-    # --- MODIFIED: Only target Aircraft. Weapons will now be ignored. ---
-    TARGET_OBJECT_TYPES = {
-        'Aircraft': 'Air+FixedWing'
-    }
-
-    object_ids_by_type = defaultdict(set)
-    object_type_map = {}
-    records_by_id = defaultdict(list)
-    last_known_states = {}
-    found_attribute_keys = set()
-    
-    max_kinematic_vals = len(BASE_KINEMATIC_HEADERS)
-    current_time = 0.0
 
-    t_line_pattern = re.compile(r'^([0-9a-fA-F]+),T=(.*)$')
-    time_pattern = re.compile(r'^#(\d+(\.\d+)?)$')
-    type_pattern = re.compile(r'Type=([a-zA-Z0-9\+_-]+)')
+    def __init__(self):
+        self.times = array('d')
+        self.kinematics = {}  # kinematic index -> (rows, float64 values)
+        self.attributes = {}  # attribute key -> (rows, interned string values)
 
-    print("Parsing ACMI content (1st Pass: Discovering aircraft data points)...")
-    
-    for line_bytes in file_stream:
-        try:
-            line = line_bytes.decode('utf-8').strip()
-        except UnicodeDecodeError:
-            continue
+    def __len__(self):
+        return len(self.times)
 
-        if not line: continue
+    def extend(self, other):
+        """Appends another track's rows; its deltas are re-based onto this track's row count."""
+        offset = len(self.times)
+        self.times.extend(other.times)
+        for store, other_store in ((self.kinematics, other.kinematics), (self.attributes, other.attributes)):
+            for key, (rows, values) in other_store.items():
+                column = store.get(key)
+                if column is None:
+                    column = store[key] = (array('q'), array('d') if isinstance(values, array) else [])
+                column[0].frombytes((np.frombuffer(rows, dtype=np.int64) + offset).tobytes())
+                column[1].extend(values)
 
-        time_match = time_pattern.match(line)
-        if time_match:
-            current_time = float(time_match.group(1))
-            continue
+    def to_frame(self, kinematic_headers, attribute_keys):
+        """Materialises the track as a DataFrame with the given column layout and the schema.py types."""
+        n_rows = len(self.times)
+        data = {'Time': np.frombuffer(self.times, dtype=np.float64).copy()}
+        for i, header in enumerate(kinematic_headers):
+            dtype = np.float64 if is_exact_column(header) else FLOAT_DTYPE
+            if i in self.kinematics:
+                data[header] = _forward_fill_numeric(n_rows, *self.kinematics[i], dtype=dtype)
+            else:
+                data[header] = np.full(n_rows, np.nan, dtype=dtype)
+        for key in attribute_keys:
+            if key in self.attributes:
+                data[key] = _forward_fill_attribute(n_rows, *self.attributes[key])
+            else:
+                data[key] = np.full(n_rows, np.nan)
+        return pd.DataFrame(data, columns=['Time'] + kinematic_headers + attribute_keys)
+
+
+class AcmiParser:
+    """
+    Incremental ACMI parser. Lines can be fed in any number of calls; kinematics are
+    parsed to floats on ingest and string attributes are interned, so each sample only
+    costs the values that changed on its line.
+    """
+
+    def __init__(self, target_object_types=None):
+        self.target_object_types = target_object_types or TARGET_OBJECT_TYPES
+        self.object_ids_by_type = defaultdict(set)
+        self.object_type_map = {}
+        self.tracks = {}
+        self.found_attribute_keys = set()
+        self.max_kinematic_vals = len(BASE_KINEMATIC_HEADERS)
+        self.current_time = 0.0
+        self.parsed_at = None
+
+    def feed(self, file_stream):
+        """Parses an iterable of raw (bytes) ACMI lines."""
+        n_base = len(BASE_KINEMATIC_HEADERS)
+        object_type_map, tracks = self.object_type_map, self.tracks
+        found_attribute_keys = self.found_attribute_keys
+        intern = sys.intern
+        current_time = self.current_time
+        max_kinematic_vals = self.max_kinematic_vals
+
+        for line_bytes in file_stream:
+            try:
+                line = line_bytes.decode('utf-8').strip()
+            except UnicodeDecodeError:
+                continue
+
+            if not line: continue
+
+            if line[0] == '#':
+                time_match = TIME_PATTERN.match(line)
+                if time_match:
+                    current_time = float(time_match.group(1))
+                    continue
 
-        if line.startswith('0,'): continue
+            if line.startswith('0,'): continue
+
+            match = T_LINE_PATTERN.match(line)
+            if not match: continue
 
-        match = t_line_pattern.match(line)
-        if match:
             object_id = match.group(1).lower()
             data_str = match.group(2)
-            
+
             if object_id not in object_type_map:
-                type_match = type_pattern.search(data_str)
+                type_match = TYPE_PATTERN.search(data_str)
                 if type_match:
                     full_type = type_match.group(1)
-                    for category, type_string in TARGET_OBJECT_TYPES.items():
+                    for category, type_string in self.target_object_types.items():
                         if full_type == type_string:
                             object_type_map[object_id] = category
-                            object_ids_by_type[category].add(object_id)
+                            self.object_ids_by_type[category].add(object_id)
                             break
-            
-            if object_id not in object_type_map:
-                continue
 
-            current_state = last_known_states.get(object_id, {})
-            parts = data_str.split(',', 1)
-            kinematic_values_str = parts[0]
-            attributes_str = parts[1] if len(parts) > 1 else ''
-            
+                if object_id not in object_type_map:
+                    continue
+
+            track = tracks.get(object_id)
+            if track is None:
+                track = tracks[object_id] = ObjectTrack()
+            row = len(track.times)
+            track.times.append(current_time)
+
+            kinematic_values_str, _, attributes_str = data_str.partition(',')
             kinematic_values = kinematic_values_str.split('|')
-            max_kinematic_vals = max(max_kinematic_vals, len(kinematic_values))
-            
-            for i, value in enumerate(kinematic_values):
-                if value and i < len(BASE_KINEMATIC_HEADERS):
-                    current_state[BASE_KINEMATIC_HEADERS[i]] = value
-            
+            if len(kinematic_values) > max_kinematic_vals:
+                max_kinematic_vals = len(kinematic_values)
+
+            kinematics = track.kinematics
+            for i, value in enumerate(kinematic_values[:n_base]):
+                if not value: continue
+                try:
+                    number = float(value)
+                except ValueError:
+                    number = np.nan
+                column = kinematics.get(i)
+                if column is None:
+                    column = kinematics[i] = (array('q'), array('d'))
+                column[0].append(row)
+                column[1].append(number)
+
             if attributes_str:
-                for attr_pair in attributes_str.split(','):
-                    if '=' in attr_pair:
-                        key, value = attr_pair.split('=', 1)
-                        current_state[key] = value
+                attributes = track.attributes
+                if '\\,' in attributes_str:
+                    attr_pairs = [pair.replace('\\,', ',') for pair in ATTRIBUTE_SEPARATOR_PATTERN.split(attributes_str)]
+                else:
+                    attr_pairs = attributes_str.split(',')
+                for attr_pair in attr_pairs:
+                    key, sep, value = attr_pair.partition('=')
+                    if not sep: continue
+                    column = attributes.get(key)
+                    if column is None:
+                        key = intern(key)
+                        column = attributes[key] = (array('q'), [])
                         found_attribute_keys.add(key)
-            
-            last_known_states[object_id] = current_state
-            
-            records_by_id[object_id].append({
-                'time': current_time,
-                'state': current_state.copy()
-            })
-
-    print(f"Parsing complete. Found {len(object_ids_by_type.get('Aircraft', set()))} aircraft.")
-    print(f"Discovered {len(found_attribute_keys)} unique attributes.")
-
-    final_kinematic_headers = BASE_KINEMATIC_HEADERS[:]
-    if max_kinematic_vals > len(BASE_KINEMATIC_HEADERS):
-        for i in range(len(BASE_KINEMATIC_HEADERS), max_kinematic_vals):
-            final_kinematic_headers.append(f'ExtraValue_{i}')
-            
-    sorted_attribute_keys = sorted(list(found_attribute_keys))
-    final_header = ['Time'] + final_kinematic_headers + sorted_attribute_keys
-
-    for category, object_ids in object_ids_by_type.items():
-        if not object_ids: continue
+                    column[0].append(row)
+                    column[1].append(intern(value))
 
-        print(f"Generating {len(object_ids)} CSV files in '{output_dir}'...")
+        self.current_time = current_time
+        self.max_kinematic_vals = max_kinematic_vals
 
-        for object_id in object_ids:
-            records = records_by_id.get(object_id, [])
-            if not records: continue
+    def absorb(self, chunk_parser):
+        """
+        Merges the result of parsing the next chunk of the same file. Carried-forward
+        state needs no reconciliation at the seam: the chunk's deltas are appended and
+        the forward fill in to_frame() runs across the whole concatenated track.
+        """
+        for category, object_ids in chunk_parser.object_ids_by_type.items():
+            self.object_ids_by_type[category].update(object_ids)
+        self.object_type_map.update(chunk_parser.object_type_map)
+        for object_id, track in chunk_parser.tracks.items():
+            if object_id in self.tracks:
+                self.tracks[object_id].extend(track)
+            else:
+                self.tracks[object_id] = track
+        self.found_attribute_keys.update(chunk_parser.found_attribute_keys)
+        self.max_kinematic_vals = max(self.max_kinematic_vals, chunk_parser.max_kinematic_vals)
+        self.current_time = chunk_parser.current_time
 
-            output_csv_path = os.path.join(output_dir, f"{object_id}.csv")
+    def discover_types(self, chunk):
+        """
+        Registers the target objects whose type is first declared in a raw chunk, exactly as
+        feed() would, without parsing anything else. Only lines mentioning 'Type=' are looked at.
+        """
+        object_type_map = self.object_type_map
+        position = chunk.find(b'Type=')
+        while position >= 0:
+            line_start = chunk.rfind(b'\n', 0, position) + 1
+            line_end = chunk.find(b'\n', position)
+            if line_end < 0:
+                line_end = len(chunk)
+            position = chunk.find(b'Type=', line_end)
             try:
-                with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(final_header)
-                    
-                    for record in records:
-                        row_data = [record['time']]
-                        for key in final_kinematic_headers:
-                            row_data.append(record['state'].get(key, ''))
-                        for key in sorted_attribute_keys:
-                            row_data.append(record['state'].get(key, ''))
-                        writer.writerow(row_data)
-            except Exception as e:
-                print(f"Failed to write file '{output_csv_path}': {e}")
-
-
-def convert_acmi_to_partitioned_csv(acmi_filepath, output_dir=None, session_name=None):
-    if not os.path.exists(acmi_filepath):
-        print(f"Error: Input file '{acmi_filepath}' not found.")
-        return
+                line = chunk[line_start:line_end].decode('utf-8').strip()
+            except UnicodeDecodeError:
+                continue
+            if line.startswith('0,'): continue
+            match = T_LINE_PATTERN.match(line)
+            if not match: continue
+            object_id = match.group(1).lower()
+            if object_id in object_type_map: continue
+            type_match = TYPE_PATTERN.search(match.group(2))
+            if not type_match: continue
+            for category, type_string in self.target_object_types.items():
+                if type_match.group(1) == type_string:
+                    object_type_map[object_id] = category
+                    self.object_ids_by_type[category].add(object_id)
+                    break
 
-    base_output_dir = output_dir if output_dir else os.path.dirname(acmi_filepath)
-    
-    if session_name:
-        partition_folder_name = f"{session_name}_FlightData_Partitioned"
+    def header(self):
+        """Returns (kinematic_headers, sorted_attribute_keys) shared by every output file."""
+        final_kinematic_headers = BASE_KINEMATIC_HEADERS[:]
+        if self.max_kinematic_vals > len(BASE_KINEMATIC_HEADERS):
+            for i in range(len(BASE_KINEMATIC_HEADERS), self.max_kinematic_vals):
+                final_kinematic_headers.append(f'ExtraValue_{i}')
+        return final_kinematic_headers, sorted(self.found_attribute_keys)
+
+    def to_frames(self):
+        """Yields (category, object_id, DataFrame) for every discovered object with samples."""
+        kinematic_headers, attribute_keys = self.header()
+        for category, object_ids in self.object_ids_by_type.items():
+            for object_id in object_ids:
+                track = self.tracks.get(object_id)
+                if not track: continue
+                yield category, object_id, track.to_frame(kinematic_headers, attribute_keys)
+
+
+def _frame_boundary(data):
+    """
+    Offset of the last complete '#<time>' frame marker line in data, or -1. Only lines the
+    serial parser would accept as a time marker count, so every chunk but the first starts
+    with a known current_time.
+    """
+    position = len(data)
+    while True:
+        position = data.rfind(b'\n#', 0, position)
+        if position < 0:
+            return -1
+        line_end = data.find(b'\n', position + 1)
+        if line_end >= 0:
+            try:
+                if TIME_PATTERN.match(data[position + 1:line_end].decode('utf-8').strip()):
+                    return position + 1
+            except UnicodeDecodeError:
+                pass
+
+
+def iter_frame_chunks(file_stream, chunk_size=PARALLEL_CHUNK_SIZE):
+    """Reads a binary stream in blocks of roughly chunk_size bytes, cut on frame boundaries."""
+    pending = b''
+    while True:
+        block = file_stream.read(chunk_size)
+        if not block:
+            if pending:
+                yield pending
+            return
+        data = pending + block
+        cut = _frame_boundary(data)
+        if cut <= 0:
+            pending = data
+            continue
+        yield data[:cut]
+        pending = data[cut:]
+
+
+def _parse_chunk(chunk, object_type_map):
+    """Worker entry point: parses one chunk given the objects already discovered before it."""
+    parser = AcmiParser()
+    parser.object_type_map.update(object_type_map)
+    parser.feed(io.BytesIO(chunk))
+    return parser
+
+
+def parse_acmi_parallel(file_stream, workers, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    Parses ACMI content in a process pool and returns an AcmiParser identical to a serial
+    feed() of the same stream. The stream is cut into chunks on '#<time>' frame markers;
+    type discovery runs in order in this process (it only inspects 'Type=' lines), so each
+    worker knows which objects are already tracked when its chunk starts. Results are
+    merged in file order with a bounded number of chunks in flight.
+    """
+    parser = AcmiParser()
+    discovery = AcmiParser()
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in iter_frame_chunks(file_stream, chunk_size):
+            known_objects = dict(discovery.object_type_map)
+            discovery.discover_types(chunk)
+            in_flight.append(executor.submit(_parse_chunk, chunk, known_objects))
+            while len(in_flight) > 2 * workers:
+                parser.absorb(in_flight.popleft().result())
+        while in_flight:
+            parser.absorb(in_flight.popleft().result())
+    return parser
+
+
+def write_partitioned_tables(parser, output_dir, fmt=DEFAULT_FORMAT):
+    """Writes one table per discovered object into output_dir, in the given storage format."""
+    for category, object_ids in parser.object_ids_by_type.items():
+        if not object_ids: continue
+        print(f"Generating {len(object_ids)} {fmt.upper()} files in '{output_dir}'...")
+
+    for _, object_id, df in parser.to_frames():
+        output_path = table_path(output_dir, object_id, fmt)
+        try:
+            write_table(df, output_path)
+        except Exception as e:
+            print(f"Failed to write file '{output_path}': {e}")
+
+
+def parse_acmi_stream(file_stream, workers=1):
+    """
+    Parses ACMI content into an AcmiParser holding one columnar track per aircraft.
+    With workers > 1 the stream is parsed in parallel chunks (see parse_acmi_parallel).
+    """
+    if workers > 1:
+        print(f"Parsing ACMI content with {workers} worker processes...")
+        parser = parse_acmi_parallel(file_stream, workers)
     else:
-        base_filename = os.path.basename(acmi_filepath)
-        if base_filename.lower().endswith('.zip.acmi'):
-            folder_name, _ = os.path.splitext(base_filename)
-            folder_name, _ = os.path.splitext(folder_name)
+        print("Parsing ACMI content (1st Pass: Discovering aircraft data points)...")
+        parser = AcmiParser()
+        parser.feed(file_stream)
+    parser.parsed_at = time.perf_counter()
+
+    print(f"Parsing complete. Found {len(parser.object_ids_by_type.get('Aircraft', set()))} aircraft.")
+    print(f"Discovered {len(parser.found_attribute_keys)} unique attributes.")
+    return parser
+
+
+def parse_acmi_content(file_stream, output_dir, workers=1, fmt=DEFAULT_FORMAT):
+    """
+    Parses ACMI content, focusing only on aircraft and saving them to a single
+    flat directory. Dynamically discovers all attributes to use as headers.
+    """
+    parser = parse_acmi_stream(file_stream, workers)
+    write_partitioned_tables(parser, output_dir, fmt)
+    return parser
+
+
+ZIP_MAGIC = b'PK\x03\x04'
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ACMI_SUFFIXES = ('.acmi', '.gz', '.zst')  # plain, .zip.acmi, .txt.acmi and compressed recordings
+STREAM_BUFFER_SIZE = 1 << 20
+
+
+class CountingStream:
+    """Wraps a binary stream and counts the bytes handed to the parser."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def __iter__(self):
+        for line in self.stream:
+            self.bytes_read += len(line)
+            yield line
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def find_acmi_member(zip_ref):
+    """The first .acmi member of a zip archive, or None."""
+    for info in zip_ref.infolist():
+        if info.filename.lower().endswith('.acmi'):
+            return info
+    return None
+
+
+@contextmanager
+def open_acmi_stream(acmi_filepath):
+    """
+    Opens a plain, zipped (.zip.acmi), gzip or zstd compressed ACMI file as a buffered
+    binary stream. Compressed inputs are decompressed on the fly, nothing touches disk.
+    The container is detected from the file's magic bytes rather than its extension.
+    """
+    with open(acmi_filepath, 'rb') as raw:
+        magic = raw.read(4)
+        raw.seek(0)
+
+        if acmi_filepath.lower().endswith('.zip.acmi') and not magic.startswith(ZIP_MAGIC):
+            raise zipfile.BadZipFile(acmi_filepath)
+
+        if magic.startswith(ZIP_MAGIC):
+            with zipfile.ZipFile(raw) as zip_ref:
+                member = find_acmi_member(zip_ref)
+                if member is None:
+                    raise ValueError("No .acmi file found inside the zip archive.")
+                print(f"Found '{member.filename}' in archive. Streaming...")
+                with zip_ref.open(member) as member_stream:
+                    yield io.BufferedReader(member_stream, buffer_size=STREAM_BUFFER_SIZE)
+        elif magic.startswith(GZIP_MAGIC):
+            with gzip.GzipFile(fileobj=raw) as gz_stream:
+                yield io.BufferedReader(gz_stream, buffer_size=STREAM_BUFFER_SIZE)
+        elif magic.startswith(ZSTD_MAGIC):
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError("Reading zstd-compressed input requires the 'zstandard' package.")
+            with zstandard.ZstdDecompressor().stream_reader(raw) as zstd_stream:
+                yield io.BufferedReader(zstd_stream, buffer_size=STREAM_BUFFER_SIZE)
         else:
-            folder_name, _ = os.path.splitext(base_filename)
-        partition_folder_name = f"{folder_name}_FlightData_Partitioned"
+            yield raw
 
-    flight_data_partition_dir = os.path.join(base_output_dir, partition_folder_name)
 
-    os.makedirs(flight_data_partition_dir, exist_ok=True)
+def _session_folder_name(acmi_filepath):
+    base_filename = os.path.basename(acmi_filepath)
+    lower_name = base_filename.lower()
+    for suffix in ('.zip.acmi', '.txt.acmi', '.acmi.gz', '.acmi.zst', '.gz', '.zst', '.acmi'):
+        if lower_name.endswith(suffix):
+            return base_filename[:-len(suffix)]
+    folder_name, _ = os.path.splitext(base_filename)
+    return folder_name
+
+
+def _report_throughput(stream, parser, start_time):
+    elapsed = parser.parsed_at - start_time
+    rate = stream.bytes_read / elapsed if elapsed > 0 else float('inf')
+    print(f"Read and parsed {stream.bytes_read / 1e6:.1f} MB of ACMI text in {elapsed:.2f}s ({rate / 1e6:.1f} MB/s).")
 
-    if acmi_filepath.lower().endswith('.zip.acmi'):
+
+def parse_acmi_file(acmi_filepath, extract=False, workers=1):
+    """
+    Reads and parses an ACMI track, returning the AcmiParser (or None on error). By default
+    the input is streamed, decompressing zip/gzip/zstd on the fly; extract=True keeps the
+    legacy behaviour of unzipping .zip.acmi files to a temporary directory first, for
+    comparison. workers > 1 parses the track in parallel; workers=0 uses every core.
+    """
+    workers = workers or os.cpu_count() or 1
+    if not os.path.exists(acmi_filepath):
+        print(f"Error: Input file '{acmi_filepath}' not found.")
+        return None
+
+    start_time = time.perf_counter()
+    if extract and acmi_filepath.lower().endswith('.zip.acmi'):
         print(f"Detected '.zip.acmi' file. Unzipping...")
         with tempfile.TemporaryDirectory() as tempdir:
             try:
@@ -169,19 +500,62 @@ def convert_acmi_to_partitioned_csv(acmi_filepath, output_dir=None, session_name
                 if acmi_file_in_zip:
                     print(f"Found '{os.path.basename(acmi_file_in_zip)}' in archive. Processing...")
                     with open(acmi_file_in_zip, 'rb') as f:
-                        parse_acmi_content(f, flight_data_partition_dir)
+                        stream = CountingStream(f)
+                        parser = parse_acmi_stream(stream, workers)
                 else:
                     print("Error: No .acmi file found inside the zip archive.")
-                    return
+                    return None
             except zipfile.BadZipFile:
                 print(f"Error: '{acmi_filepath}' is not a valid zip file.")
-                return
+                return None
     else:
-        print(f"Processing standard '.acmi' file...")
-        with open(acmi_filepath, 'rb') as f:
-            parse_acmi_content(f, flight_data_partition_dir)
-            
+        print(f"Processing '{os.path.basename(acmi_filepath)}'...")
+        try:
+            with open_acmi_stream(acmi_filepath) as f:
+                stream = CountingStream(f)
+                parser = parse_acmi_stream(stream, workers)
+        except zipfile.BadZipFile:
+            print(f"Error: '{acmi_filepath}' is not a valid zip file.")
+            return None
+        except (ValueError, OSError, EOFError) as e:
+            print(f"Error: Could not read '{acmi_filepath}': {e}")
+            return None
+
+    _report_throughput(stream, parser, start_time)
+    return parser
+
+
+def read_acmi_frames(acmi_filepath, extract=False, workers=1):
+    """Parses an ACMI track into {aircraft_id: DataFrame}, ordered by aircraft id. None on error."""
+    parser = parse_acmi_file(acmi_filepath, extract, workers)
+    if parser is None:
+        return None
+    return {object_id: df for _, object_id, df in sorted(parser.to_frames(), key=lambda item: item[1])}
+
+
+def convert_acmi_to_partitioned_csv(acmi_filepath, output_dir=None, session_name=None, extract=False, workers=1, fmt=DEFAULT_FORMAT):
+    """Converts an ACMI track into one table per aircraft (see parse_acmi_file for the options)."""
+    if not os.path.exists(acmi_filepath):
+        print(f"Error: Input file '{acmi_filepath}' not found.")
+        return
+
+    base_output_dir = output_dir if output_dir else os.path.dirname(acmi_filepath)
+    
+    if session_name:
+        partition_folder_name = f"{session_name}_FlightData_Partitioned"
+    else:
+        partition_folder_name = f"{_session_folder_name(acmi_filepath)}_FlightData_Partitioned"
+
+    flight_data_partition_dir = os.path.join(base_output_dir, partition_folder_name)
+
+    os.makedirs(flight_data_partition_dir, exist_ok=True)
+
+    parser = parse_acmi_file(acmi_filepath, extract, workers)
+    if parser is None:
+        return
+    write_partitioned_tables(parser, flight_data_partition_dir, fmt)
     print("\n--- Conversion Complete ---")
+    return parser
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -189,7 +563,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "input_file",
-        help="Path to the input .acmi or .zip.acmi file."
+        help="Path to the input .acmi, .zip.acmi, gzip or zstd compressed file."
     )
     parser.add_argument(
         "-o", "--output_dir", 
@@ -201,5 +575,22 @@ if __name__ == "__main__":
         help="A specific session name to use for the output folder, overriding the default naming scheme.", 
         default=None
     )
+    parser.add_argument(
+        "--extract",
+        action="store_true",
+        help="Extract .zip.acmi archives to a temporary directory before parsing instead of streaming them."
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the track (0 = all cores). Output is identical to the serial parser."
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(TABLE_FORMATS),
+        default=DEFAULT_FORMAT,
+        help="Storage format of the per-aircraft output tables."
+    )
     args = parser.parse_args()
-    convert_acmi_to_partitioned_csv(args.input_file, args.output_dir, args.session_name)
\ No newline at end of file
+    convert_acmi_to_partitioned_csv(args.input_file, args.output_dir, args.session_name, args.extract, args.workers, args.format)
@@ -0,0 +1,267 @@
+import os
+import glob
+import json
+import time
+import zipfile
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from acmi_converter import ACMI_SUFFIXES, ZIP_MAGIC, GZIP_MAGIC, ZSTD_MAGIC, find_acmi_member
+from executor import resolve_workers
+from pipeline import run_steps, StepError, NoDataError
+from run_metrics import RunMetrics
+from step_cache import StepCache, skip_fresh_steps
+from window_dataset import WindowDataset
+
+# --- Batch mode ---
+# run_pipeline.py given a directory or a glob pattern instead of one track runs the per-track
+# steps (convert ... prepare) of every track as its own session (Run-<hash>, exactly as a
+# single-track run would name it), several tracks at a time, and then trains once on all of
+# their window datasets through a dataset catalog.
+#
+# Scheduling: tracks run in worker processes (one fresh process per track, so a big track's
+# memory is returned to the system when it is done), at most --workers at a time, and only
+# while the estimated peak memory of the running tracks fits the memory budget. A track's
+# estimate is PROCESS_OVERHEAD_MB plus MEMORY_PER_TEXT_BYTE per byte of ACMI text (the
+# uncompressed size of zipped/gzipped recordings). The first waiting track that fits is
+# started next, so small tracks keep the workers busy while a big one waits for room; a
+# track bigger than the whole budget runs on its own.
+#
+# Progress is kept in <output_dir>/<batch>_manifest.json, rewritten after every track: its
+# status ('done', 'empty' when there was nothing to learn from, 'failed'), prepare cache key,
+# window count, wall time, peak memory and log file. Re-running the same command skips the
+# tracks that are done and whose datasets are up to date (their per-session step caches
+# decide) and the empty ones whose input, parameters and code are unchanged, and retries
+# everything else. Each track's output goes to <session>_log.txt.
+
+BATCH_VERSION = 1
+TRACK_STEPS = ('convert', 'feature', 'recog', 'curate', 'prepare')
+PROCESS_OVERHEAD_MB = 150       # interpreter, NumPy/pandas and the pipeline modules
+MEMORY_PER_TEXT_BYTE = 8        # peak bytes per byte of ACMI text (measured on synthetic tracks)
+COMPRESSION_RATIO = 10          # assumed for compressed inputs whose text size is not recorded
+MEMORY_BUDGET_FRACTION = 0.8    # of the available memory, when no budget is given
+
+def is_batch_input(input_spec):
+    """True for a directory or a glob pattern, i.e. input for batch mode."""
+    return os.path.isdir(input_spec) or glob.has_magic(input_spec)
+
+def expand_inputs(input_spec):
+    """Track files of a directory (not recursive) or of a glob pattern ('**' recurses), sorted."""
+    if os.path.isdir(input_spec):
+        paths = [os.path.join(input_spec, name) for name in os.listdir(input_spec)]
+    else:
+        paths = glob.glob(input_spec, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path) and path.lower().endswith(ACMI_SUFFIXES))
+
+def input_text_bytes(path):
+    """Size of the ACMI text of a recording: the file size, or its uncompressed size if compressed."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+        if magic.startswith(ZIP_MAGIC):
+            try:
+                with zipfile.ZipFile(f) as zip_ref:
+                    member = find_acmi_member(zip_ref)
+                    return member.file_size if member is not None else size
+            except zipfile.BadZipFile:
+                return size
+        if magic.startswith(GZIP_MAGIC) and size >= 4:
+            f.seek(-4, os.SEEK_END)
+            text_size = int.from_bytes(f.read(4), 'little')  # modulo 4 GiB
+            return text_size if text_size >= size else size * COMPRESSION_RATIO
+        if magic.startswith(ZSTD_MAGIC):
+            return size * COMPRESSION_RATIO
+    return size
+
+def estimate_memory_mb(path):
+    """Estimated peak memory (MB) of running the per-track steps on a recording."""
+    return PROCESS_OVERHEAD_MB + input_text_bytes(path) * MEMORY_PER_TEXT_BYTE / 1e6
+
+def available_memory_mb():
+    """Memory available to new processes (MB), or None if it cannot be determined."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1e3
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def memory_budget_mb(requested=None):
+    """The given budget, or MEMORY_BUDGET_FRACTION of the available memory (None = unlimited)."""
+    if requested:
+        return float(requested)
+    available = available_memory_mb()
+    return available * MEMORY_BUDGET_FRACTION if available is not None else None
+
+class BatchManifest:
+    """Per-track progress of a batch run, kept in a JSON file."""
+
+    def __init__(self, manifest_path, input_spec):
+        self.manifest_path = manifest_path
+        self.manifest = {'version': BATCH_VERSION, 'input': input_spec, 'tracks': {}}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == BATCH_VERSION:
+                    self.manifest = manifest
+            except (OSError, ValueError):
+                print(f"Warning: Ignoring unreadable batch manifest '{manifest_path}'.")
+
+    @property
+    def tracks(self):
+        return self.manifest['tracks']
+
+    def update(self, input_file, **fields):
+        self.tracks.setdefault(os.path.abspath(input_file), {}).update(fields)
+        self.save()
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def counts(self):
+        counts = {}
+        for entry in self.tracks.values():
+            counts[entry.get('status')] = counts.get(entry.get('status'), 0) + 1
+        return counts
+
+# --- One track (runs in a worker process) ---
+
+def run_track(input_file, path_context, steps, options, step_names, force=False, profiler=None):
+    """
+    Runs the per-track steps of one recording with the in-process engine, skipping the steps
+    its step cache says are up to date, with all output going to the session's log file.
+    Returns the track's manifest fields.
+    """
+    started = time.perf_counter()
+    log_path = path_context['log_path']
+    fields = {'session': path_context['session_name'], 'dataset': path_context['dataset_path'], 'log': log_path, 'error': None}
+    with open(log_path, 'w', encoding='utf-8') as log, redirect_stdout(log), redirect_stderr(log):
+        cache = StepCache(path_context['cache_manifest'])
+        step_keys = cache.step_keys(step_names, input_file, options)
+        fields['prepare_key'] = step_keys['prepare']
+        if not force:
+            steps = skip_fresh_steps(steps, cache, step_keys, path_context)
+        metrics = RunMetrics({'session_name': path_context['session_name'], 'input_file': input_file, 'engine': 'inprocess', 'batch': True},
+                             profiler, path_context['profile_dir'])
+
+        def on_step_complete(step, saved):
+            if saved:
+                cache.record(step['short_name'], step_keys[step['short_name']], path_context)
+            else:
+                cache.forget(step['short_name'])
+
+        try:
+            run_steps(steps, path_context, dict(options, metrics=metrics), on_step_complete)
+            fields['status'] = 'done'
+            fields['windows'] = len(WindowDataset.load(path_context['dataset_path']))
+        except StepError as e:
+            # A track with nothing to learn from (no aircraft, no maneuvers) is not worth
+            # retrying; one whose step crashed or could not start is.
+            fields['status'] = 'empty' if isinstance(e, NoDataError) else 'failed'
+            fields['error'] = str(e)
+            print(f"[ERROR] {e}")
+        finally:
+            metrics.save(path_context['metrics_path'])
+        run = metrics.to_dict()['run']
+    fields['wall_s'] = time.perf_counter() - started
+    fields['peak_rss_mb'] = run['peak_rss_mb']
+    return fields
+
+def _call_track(args):
+    try:
+        return run_track(*args), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+def schedule_tracks(jobs, workers, budget_mb):
+    """
+    Runs _call_track(args) for every (input_file, estimate_mb, args) job and yields
+    (input_file, fields, error) as tracks finish. At most workers tracks run at once and,
+    with a budget, only while the estimates of the running tracks fit it.
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1:
+        for input_file, _, args in jobs:
+            yield (input_file,) + _call_track(args)
+        return
+
+    pending, running = list(jobs), {}
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as executor:
+        while pending or running:
+            in_use = sum(estimate for _, estimate in running.values())
+            for job in list(pending):
+                if len(running) >= workers:
+                    break
+                input_file, estimate, args = job
+                if budget_mb is None or not running or in_use + estimate <= budget_mb:
+                    running[executor.submit(_call_track, args)] = (input_file, estimate)
+                    pending.remove(job)
+                    in_use += estimate
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                input_file, _ = running.pop(future)
+                try:
+                    fields, error = future.result()
+                except Exception as e:
+                    # The worker process itself died (e.g. out of memory); only this track is lost.
+                    fields, error = None, f"worker failed: {e}"
+                yield input_file, fields, error
+
+def run_batch(tracks, manifest, options, step_names, workers=1, budget_mb=None, force=False, profiler=None):
+    """
+    Runs the per-track steps of every (input_file, path_context, steps) in tracks that is not
+    already done, recording progress in the manifest. Returns the number of tracks run.
+    """
+    jobs = []
+    for input_file, path_context, steps in tracks:
+        entry = manifest.tracks.get(os.path.abspath(input_file), {})
+        if not force and entry.get('status') in ('done', 'empty') and _is_up_to_date(input_file, path_context, options, step_names, entry):
+            continue
+        estimate = estimate_memory_mb(input_file)
+        if budget_mb is not None and estimate > budget_mb:
+            print(f"Warning: '{input_file}' needs about {estimate:,.0f} MB, more than the {budget_mb:,.0f} MB budget; it will run on its own.")
+        manifest.update(input_file, session=path_context['session_name'], status='pending', estimate_mb=round(estimate, 1))
+        jobs.append((input_file, estimate, (input_file, path_context, steps, options, step_names, force, profiler)))
+
+    skipped = len(tracks) - len(jobs)
+    print(f"Batch: {len(tracks)} tracks, {skipped} already done or empty, {len(jobs)} to run with {resolve_workers(workers)} workers"
+          + (f" within {budget_mb:,.0f} MB." if budget_mb is not None else " (no memory limit)."))
+    for finished, (input_file, fields, error) in enumerate(schedule_tracks(jobs, workers, budget_mb), start=1):
+        if error:
+            fields = {'status': 'failed', 'error': error}
+        manifest.update(input_file, **fields)
+        detail = f"{fields['windows']} windows" if fields['status'] == 'done' else fields.get('error')
+        print(f"[{finished}/{len(jobs)}] {fields['status'].upper():<6} {input_file} ({detail})")
+    return len(jobs)
+
+def _is_up_to_date(input_file, path_context, options, step_names, entry):
+    # An empty track stays empty until its input, the parameters or the code change.
+    cache = StepCache(path_context['cache_manifest'])
+    key = cache.step_keys(step_names, input_file, options)['prepare']
+    if entry.get('prepare_key') != key:
+        return False
+    return entry['status'] == 'empty' or cache.is_fresh('prepare', key, path_context)
+
+def register_datasets(manifest, tracks, catalog):
+    """
+    Puts the window dataset of every done track in the catalog and takes out the sessions of
+    tracks that are no longer done. Returns the number of shards.
+    """
+    for input_file, path_context, _ in tracks:
+        entry = manifest.tracks.get(os.path.abspath(input_file), {})
+        if entry.get('status') == 'done':
+            catalog.add(path_context['dataset_path'], name=path_context['session_name'])
+        elif path_context['session_name'] in catalog.shard_names:
+            catalog.remove(path_context['session_name'])
+    return len(catalog.shard_names)
@@ -1,66 +1,412 @@
-import pandas as pd
-import argparse
 import os
+import re
+import time
+import argparse
+import zipfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from schema import aircraft_name
+
+# --- Streaming, delta-encoded ACMI writer ---
+# The CSV is read in chunks of CHUNK_ROWS rows, and every chunk is turned into ACMI text with
+# column-wide (NumPy) operations; no row is ever formatted on its own. Like Tacview's own
+# recordings, an object's line only carries the values that changed since its previous line:
+# empty T= fields and missing attributes keep their last value (this is also how
+# acmi_converter.py reads them back). Values are compared after rounding to the precision they
+# are written with (FIELD_DECIMALS), so noise below it does not count as a change.
+#
+# Rows must be in time order to be streamed. A CSV that is not is read whole and sorted
+# first, which needs memory for all of it. Missing values (NaN) are not written, so the
+# object keeps its previous value, as it would in a recording.
+#
+# The output is a plain .acmi file, or a zip archive when output_path ends in .zip.acmi
+# (written as it is generated, never through an uncompressed temporary file). --verify parses
+# the written track with acmi_converter.py and checks that every aircraft sample matches the
+# CSV to the written precision.
+
+CHUNK_ROWS = 100_000
+DEFAULT_REFERENCE_TIME = "2023-01-01T00:00:00Z"
+TIME_COLUMNS = ('Relative Time', 'Time', 'Unix time')  # in order of preference
+META_COLUMNS = ('Relative Time', 'Time', 'Unix time', 'ISO time', 'Id')
+T_FIELDS = ('Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw')
+# The 9-value form adds U, V and Heading (the ninth value is 'W' in acmi_converter.py tables).
+T_FIELDS_FLAT = T_FIELDS + ('U', 'V', 'Heading')
+HEADING_ALIASES = ('Heading', 'W')
+TIME_DECIMALS = 3
+FIELD_DECIMALS = {'Longitude': 7, 'Latitude': 7}
+DEFAULT_DECIMALS = 2            # every other T= value (metres and degrees)
+ATTRIBUTE_DECIMALS = 3          # numeric attributes
+OBJECT_ID_PATTERN = re.compile(r'^[0-9a-f]+$')
+# Written on an object's first line when the CSV has no Type column (e.g. pipeline tables):
+# acmi_converter.py only reads objects of this type.
+DEFAULT_OBJECT_TYPE = 'Air+FixedWing'
+ID_SAMPLE_ROWS = 1000           # rows read to tell integer Ids from hexadecimal ones
+
+class UnsortedInputError(Exception):
+    """Raised when the rows of a CSV being streamed go back in time."""
+
+# --- Fixed-point formatting ---
+
+def quantize(values, decimals):
+    """values in units of 10**-decimals, rounded to integers (as float64, NaN kept)."""
+    return np.rint(np.asarray(values, dtype=np.float64) * 10.0 ** decimals)
+
+def format_fixed(scaled, decimals):
+    """
+    Text of quantized values (integers in units of 10**-decimals) without trailing zeros,
+    e.g. 3612500 with 5 decimals -> '36.125'. Built from integer-to-text conversions only.
+    """
+    scaled = np.asarray(scaled, dtype=np.int64)
+    if not len(scaled):
+        return np.empty(0, dtype=object)
+    whole, fraction = np.divmod(np.abs(scaled), 10 ** decimals)
+    text = whole.astype(str).astype(object)
+    if decimals:
+        fraction_text = np.char.rstrip(np.char.zfill(fraction.astype(str), decimals), '0').astype(object)
+        has_fraction = fraction > 0
+        text[has_fraction] = text[has_fraction] + '.' + fraction_text[has_fraction]
+    negative = scaled < 0
+    text[negative] = '-' + text[negative]
+    return text
+
+def escape_text(value):
+    """ACMI text value: commas (the field separator) are escaped."""
+    return value.replace(',', '\\,')
+
+def normalize_ids(ids, integer_ids=False):
+    """
+    ACMI object ids (lower-case hexadecimal, without a 0x prefix) of an Id column. With
+    integer_ids the values are the integer Ids of pipeline tables (see schema.py), e.g. 101 -> '65'.
+    """
+    if integer_ids:
+        codes, uniques = pd.factorize(pd.Series(ids, dtype=object).astype(str).str.strip())
+        return np.array([aircraft_name(int(value)) for value in uniques], dtype=object)[codes]
+    text = pd.Series(ids, dtype=object).astype(str).str.strip().str.lower()
+    return text.str.replace(r'^0x', '', regex=True).to_numpy(dtype=object)
+
+def has_integer_ids(input_path, time_column):
+    """
+    True for a table of this pipeline (time column 'Time') whose Id column reads as integers:
+    the integer values of the ACMI ids. Tacview's CSVs keep their (hexadecimal) ids as text,
+    even when every digit of them is a decimal one.
+    """
+    if time_column != 'Time':
+        return False
+    ids = pd.read_csv(input_path, usecols=['Id'], nrows=ID_SAMPLE_ROWS)['Id']
+    return pd.api.types.is_integer_dtype(ids)
+
+# --- Reading the CSV ---
+
+def csv_layout(columns):
+    """(time column, T= fields with the CSV column of each, attribute columns) of a CSV's columns."""
+    time_column = next((column for column in TIME_COLUMNS if column in columns), None)
+    heading = next((column for column in HEADING_ALIASES if column in columns), None)
+    flat = 'U' in columns or 'V' in columns or heading is not None
+    t_columns = [(field, field if field != 'Heading' else heading) for field in (T_FIELDS_FLAT if flat else T_FIELDS)]
+    used = set(META_COLUMNS) | {column for _, column in t_columns if column}
+    attributes = [column for column in columns if column not in used and not str(column).startswith('Unnamed:')]
+    return time_column, t_columns, attributes
+
+def iter_csv_chunks(input_path, chunk_rows=CHUNK_ROWS):
+    return pd.read_csv(input_path, chunksize=chunk_rows, dtype={'Id': str}, keep_default_na=True)
+
+def iter_sorted_chunks(input_path, time_column, chunk_rows=CHUNK_ROWS):
+    """The whole CSV sorted by time (stable), in chunks of chunk_rows rows."""
+    df = pd.read_csv(input_path, dtype={'Id': str}).sort_values(time_column, kind='stable', ignore_index=True)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
 
-def csv_to_acmi(input_path, output_path):
+# --- Writing ---
+
+class AcmiWriter:
     """
-    Converts a CSV file (in Tacview's detailed format) back to a basic .acmi format.
+    Turns time-ordered chunks of CSV rows into delta-encoded ACMI text. Keeps, per object,
+    the last value written for every field, so each chunk continues where the last one ended.
+    """
+
+    def __init__(self, t_columns, attributes, object_id=None, time_offset=0.0, integer_ids=False):
+        self.t_columns, self.attributes = t_columns, attributes
+        self.object_id, self.time_offset, self.integer_ids = object_id, time_offset, integer_ids
+        self.fields = [field for field, _ in t_columns] + attributes
+        # Text attributes are compared as codes into a per-column vocabulary of escaped values,
+        # so change detection only ever sees float64 columns. The first chunk with values in an
+        # attribute decides whether it is text or numeric.
+        self.vocabularies, self.numeric = {}, set()
+        self.state = pd.DataFrame(columns=self.fields, dtype=np.float64)
+        self.last_time = None
+        self.lines = 0
+
+    def _text_codes(self, column, series):
+        """float64 codes of a text column into its vocabulary (new values are appended), NaN = missing."""
+        codes, uniques = pd.factorize(series)
+        vocabulary = self.vocabularies[column]
+        lookup = np.full(len(uniques) + 1, np.nan)
+        for code, value in enumerate(uniques):
+            text = str(value)
+            if text != '':
+                lookup[code] = vocabulary.setdefault(escape_text(text), len(vocabulary))
+        return lookup[codes]  # code -1 (missing) picks the NaN at the end
+
+    def _chunk_values(self, chunk, time_column):
+        """(ids, quantized times, per-field values to compare on) of a time-ordered chunk."""
+        times = quantize(chunk[time_column].to_numpy(dtype=np.float64) - self.time_offset, TIME_DECIMALS)
+        if np.isnan(times).any():
+            raise ValueError(f"Column '{time_column}' has missing values.")
+        if np.any(np.diff(times) < 0) or (self.last_time is not None and times[0] < self.last_time):
+            raise UnsortedInputError()
+        if self.object_id is not None:
+            ids = np.full(len(chunk), self.object_id, dtype=object)
+        else:
+            ids = normalize_ids(chunk['Id'].to_numpy(), self.integer_ids)
+        values = {}
+        for field, column in self.t_columns:
+            if column is None:
+                values[field] = np.full(len(chunk), np.nan)
+            else:
+                values[field] = quantize(pd.to_numeric(chunk[column], errors='coerce'), FIELD_DECIMALS.get(field, DEFAULT_DECIMALS))
+        for column in self.attributes:
+            series = chunk[column]
+            if column not in self.vocabularies and column not in self.numeric and series.notna().any():
+                if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                    self.numeric.add(column)
+                else:
+                    self.vocabularies[column] = {}
+            if column in self.vocabularies:
+                values[column] = self._text_codes(column, series)
+            else:
+                values[column] = quantize(pd.to_numeric(series, errors='coerce'), ATTRIBUTE_DECIMALS)
+        return ids, times, pd.DataFrame(values, columns=self.fields)
+
+    def _changes(self, ids, values):
+        """Mask of the values that differ from the same object's previous value (NaN never counts)."""
+        codes, uniques = pd.factorize(ids)
+        seed = self.state.reindex(uniques)
+        combined = pd.concat([seed.reset_index(drop=True), values], ignore_index=True)
+        keys = np.concatenate([np.arange(len(uniques)), codes])
+        filled = combined.groupby(keys, sort=False).ffill()
+        previous = filled.groupby(keys, sort=False).shift(1).to_numpy()[len(uniques):]
+        current = values.to_numpy()
+        changed = ~np.isnan(current) & (current != previous)
+        last = filled.groupby(keys, sort=False).last()
+        last.index = uniques[last.index]
+        self.state = pd.concat([self.state.drop(index=uniques, errors='ignore'), last])
+        return pd.DataFrame(changed, columns=self.fields)
+
+    def format_chunk(self, chunk, time_column):
+        """ACMI text of a chunk of CSV rows (frame markers included)."""
+        if chunk.empty:
+            return ''
+        ids, times, values = self._chunk_values(chunk, time_column)
+        first_line = ~pd.Index(ids).duplicated() & ~np.isin(ids, self.state.index)
+        changed = self._changes(ids, values)
+        n_rows = len(ids)
+
+        t_parts = []
+        for field, _ in self.t_columns:
+            text = np.full(n_rows, '', dtype=object)
+            mask = changed[field].to_numpy()
+            text[mask] = format_fixed(values[field].to_numpy(dtype=np.float64)[mask], FIELD_DECIMALS.get(field, DEFAULT_DECIMALS))
+            t_parts.append(text)
+        lines = ids + ',T=' + t_parts[0]
+        for text in t_parts[1:]:
+            lines = lines + '|' + text
+
+        for column in self.attributes:
+            mask = changed[column].to_numpy()
+            if not mask.any():
+                continue
+            raw = values[column].to_numpy()[mask]
+            if column in self.vocabularies:
+                text = np.array(list(self.vocabularies[column]), dtype=object)[raw.astype(np.int64)]
+            else:
+                text = format_fixed(raw, ATTRIBUTE_DECIMALS)
+            lines[mask] = lines[mask] + f',{column}=' + text
+        if 'Type' not in self.attributes:
+            lines[first_line] = lines[first_line] + f',Type={DEFAULT_OBJECT_TYPE}'
+
+        # A '#<time>' marker before the first line of every new frame
+        previous_times = np.concatenate([[np.nan if self.last_time is None else self.last_time], times[:-1]])
+        new_frame = times != previous_times
+        lines[new_frame] = '#' + format_fixed(times[new_frame], TIME_DECIMALS) + '\n' + lines[new_frame]
+        self.last_time = times[-1]
+        self.lines += n_rows + int(new_frame.sum())
+        return '\n'.join(lines.tolist()) + '\n'
+
+def reference_time(first_row, time_column):
+    if 'ISO time' in first_row and pd.notna(first_row['ISO time']):
+        return str(first_row['ISO time'])
+    if time_column == 'Unix time':
+        return datetime.fromtimestamp(float(first_row[time_column]), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return DEFAULT_REFERENCE_TIME
+
+def open_output(output_path):
+    """Binary stream of the output file; a member of a new zip archive for .zip.acmi paths."""
+    if output_path.lower().endswith('.zip.acmi'):
+        archive = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+        member_name = os.path.basename(output_path)[:-len('.zip.acmi')] + '.txt.acmi'
+        # The text size is not known in advance, so allow it to pass 2 GiB.
+        return archive, archive.open(member_name, 'w', force_zip64=True)
+    return None, open(output_path, 'wb')
+
+def write_acmi(chunks, output_path, time_column, t_columns, attributes, object_id=None, integer_ids=False):
+    """Writes the chunks (time-ordered DataFrames) as a delta-encoded ACMI track. Returns the AcmiWriter."""
+    archive, stream = open_output(output_path)
+    try:
+        writer = None
+        for chunk in chunks:
+            if writer is None:
+                first_row = chunk.iloc[0]
+                time_offset = float(first_row[time_column]) if time_column == 'Unix time' else 0.0
+                writer = AcmiWriter(t_columns, attributes, object_id, time_offset, integer_ids)
+                header = f"FileType=text/acmi/tacview\nFileVersion=2.2\n0,ReferenceTime={reference_time(first_row, time_column)}\n"
+                stream.write(header.encode('utf-8'))
+            stream.write(writer.format_chunk(chunk, time_column).encode('utf-8'))
+        return writer
+    finally:
+        stream.close()
+        if archive is not None:
+            archive.close()
+
+# --- Round-trip check ---
+
+def verify_round_trip(input_path, output_path, object_id=None, chunk_rows=CHUNK_ROWS, integer_ids=False):
+    """
+    Parses the written track with acmi_converter.py and compares every aircraft's samples with
+    the (time-sorted) CSV rows, to the written precision. Returns a list of mismatches.
+    """
+    # Imported here so that converting never loads the parser.
+    from acmi_converter import read_acmi_frames
+    frames = read_acmi_frames(output_path)
+    if frames is None:
+        return [f"'{output_path}' could not be parsed."]
+    header = pd.read_csv(input_path, nrows=0).columns
+    time_column, t_columns, attributes = csv_layout(header)
+    sorted_input = False
+    while True:
+        problems, cursors = [], {aircraft_id: 0 for aircraft_id in frames}
+        expected, other_types = set(), set()
+        chunks = iter_sorted_chunks(input_path, time_column, chunk_rows) if sorted_input else iter_csv_chunks(input_path, chunk_rows)
+        try:
+            time_offset, last_time = None, None
+            for chunk in chunks:
+                times = chunk[time_column].to_numpy(dtype=np.float64)
+                if len(times) and (np.any(np.diff(times) < 0) or last_time is not None and times[0] < last_time):
+                    raise UnsortedInputError()
+                last_time = times[-1] if len(times) else last_time
+                if time_offset is None:
+                    time_offset = times[0] if time_column == 'Unix time' else 0.0
+                ids = np.full(len(chunk), object_id, dtype=object) if object_id is not None else normalize_ids(chunk['Id'].to_numpy(), integer_ids)
+                if 'Type' in chunk:
+                    # Objects of other types (weapons, ground units) are not read back.
+                    types = chunk['Type'].astype(object)
+                    other_types.update(ids[(types.notna() & (types != DEFAULT_OBJECT_TYPE)).to_numpy()])
+                for aircraft_id in pd.unique(ids):
+                    expected.add(aircraft_id)
+                    if aircraft_id not in frames:
+                        continue
+                    rows = chunk[ids == aircraft_id]
+                    start = cursors[aircraft_id]
+                    parsed = frames[aircraft_id].iloc[start:start + len(rows)]
+                    cursors[aircraft_id] = start + len(rows)
+                    if len(parsed) != len(rows):
+                        problems.append(f"{aircraft_id}: the track has fewer samples than the CSV.")
+                        continue
+                    problems += _compare_samples(aircraft_id, rows, parsed, time_column, time_offset, t_columns, attributes)
+            break
+        except UnsortedInputError:
+            sorted_input = True
+    for aircraft_id in sorted(expected - other_types - set(frames)):
+        problems.append(f"{aircraft_id}: not in the track read back.")
+    for aircraft_id, df in frames.items():
+        if cursors[aircraft_id] != len(df):
+            problems.append(f"{aircraft_id}: the track has {len(df)} samples, the CSV {cursors[aircraft_id]}.")
+    return problems
+
+def _compare_samples(aircraft_id, rows, parsed, time_column, time_offset, t_columns, attributes):
+    problems = []
+    checks = [('Time', rows[time_column].to_numpy(dtype=np.float64) - time_offset, parsed['Time'].to_numpy(dtype=np.float64), TIME_DECIMALS)]
+    converter_names = {'Heading': 'W'}
+    for field, column in t_columns:
+        if column is not None:
+            checks.append((field, pd.to_numeric(rows[column], errors='coerce').to_numpy(dtype=np.float64),
+                           parsed[converter_names.get(field, field)].to_numpy(dtype=np.float64), FIELD_DECIMALS.get(field, DEFAULT_DECIMALS)))
+    for column in attributes:
+        expected = rows[column]
+        if pd.api.types.is_numeric_dtype(expected) and not pd.api.types.is_bool_dtype(expected):
+            checks.append((column, expected.to_numpy(dtype=np.float64), pd.to_numeric(pd.Series(np.asarray(parsed[column], dtype=object)), errors='coerce').to_numpy(dtype=np.float64), ATTRIBUTE_DECIMALS))
+        else:
+            present = expected.notna().to_numpy() & (expected.astype(str) != '').to_numpy()
+            mismatched = present & (expected.astype(str).to_numpy(dtype=object) != np.asarray(parsed[column], dtype=object).astype(str))
+            if mismatched.any():
+                problems.append(f"{aircraft_id}: {column} differs in {int(mismatched.sum())} samples.")
+    for name, expected, actual, decimals in checks:
+        present = ~np.isnan(expected)
+        # Half a unit of the last written digit, plus float32 rounding of the parsed tables.
+        tolerance = 0.5 * 10.0 ** -decimals + np.abs(expected) * 1e-6
+        mismatched = present & ~(np.abs(expected - actual) <= tolerance)
+        if mismatched.any():
+            problems.append(f"{aircraft_id}: {name} differs in {int(mismatched.sum())} samples.")
+    return problems
+
+def csv_to_acmi(input_path, output_path, object_id=None, verify=False, chunk_rows=CHUNK_ROWS):
+    """
+    Converts a CSV file (in Tacview's detailed format, or a flight table of this pipeline)
+    to a delta-encoded .acmi track, streaming it in chunks. Tables without an Id column are
+    written as one object: object_id, or the table's file name (e.g. '102.csv').
+    Returns True on success.
     """
     if not os.path.exists(input_path):
         print(f"Error: Input file not found at '{input_path}'")
-        return
-
-    df = pd.read_csv(input_path)
-    
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w') as f:
-        # Write header
-        f.write("FileType=text/acmi/tacview\n")
-        f.write("FileVersion=2.2\n")
-        
-        # Set a reference time based on the first entry if available
-        first_iso_time = df['ISO time'].iloc[0] if 'ISO time' in df.columns and not df.empty else "2023-01-01T00:00:00Z"
-        f.write(f"0,ReferenceTime={first_iso_time}\n")
-
-        # Group by the 'Relative Time' or 'Unix time' column
-        time_col = 'Relative Time' if 'Relative Time' in df.columns else 'Unix time'
-
-        for timestamp, group in df.groupby(time_col):
-            f.write(f"#{timestamp}\n")
-            for _, row in group.iterrows():
-                # Create the kinematic data string
-                kinematic_data = '|'.join(map(str, [
-                    row.get('Longitude', ''),
-                    row.get('Latitude', ''),
-                    row.get('Altitude', ''),
-                    row.get('Roll', ''),
-                    row.get('Pitch', ''),
-                    row.get('Yaw', '')
-                ]))
-                
-                # Create the attribute string
-                attributes = [
-                    f"Type={row.get('Type', '')}",
-                    f"Name={row.get('Name', '')}",
-                    f"TAS={row.get('TAS', '')}",
-                    f"G={row.get('G', '') if pd.notna(row.get('G')) else ''}",
-                    f"VS={row.get('VS', '') if pd.notna(row.get('VS')) else ''}",
-                    f"AOA={row.get('AOA', '') if pd.notna(row.get('AOA')) else ''}",
-                    f"Color={row.get('Color', '')}",
-                    f"Coalition={row.get('Coalition', '')}",
-                    f"Country={row.get('Country', '')}",
-                    f"Pilot={row.get('Pilot', '')}",
-                ]
-                attribute_str = ",".join(filter(None, attributes))
-                
-                object_id = row.get('Id', '0')
-                f.write(f"{object_id},T={kinematic_data},{attribute_str}\n")
-
-    print(f"Successfully converted {input_path} to {output_path}")
+        return False
+
+    columns = pd.read_csv(input_path, nrows=0).columns
+    time_column, t_columns, attributes = csv_layout(columns)
+    if time_column is None:
+        print(f"Error: '{input_path}' has no time column ({', '.join(TIME_COLUMNS)}).")
+        return False
+    if 'Id' not in columns:
+        object_id = (object_id or os.path.splitext(os.path.basename(input_path))[0]).lower()
+        if not OBJECT_ID_PATTERN.match(object_id):
+            print(f"Error: '{input_path}' has no Id column; name the object with --object-id (a hexadecimal ACMI id).")
+            return False
+    else:
+        object_id = None
+    integer_ids = object_id is None and has_integer_ids(input_path, time_column)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    try:
+        writer = write_acmi(iter_csv_chunks(input_path, chunk_rows), output_path, time_column, t_columns, attributes, object_id, integer_ids)
+    except UnsortedInputError:
+        print(f"'{input_path}' is not sorted by '{time_column}'; reading it whole to sort it.")
+        writer = write_acmi(iter_sorted_chunks(input_path, time_column, chunk_rows), output_path, time_column, t_columns, attributes, object_id, integer_ids)
+    except ValueError as e:
+        print(f"Error: Could not convert '{input_path}': {e}")
+        return False
+    if writer is None:
+        print(f"Error: '{input_path}' has no rows.")
+        return False
+    elapsed = time.perf_counter() - started
+    print(f"Successfully converted {input_path} to {output_path} ({writer.lines:,} lines, {os.path.getsize(output_path) / 1e6:.1f} MB in {elapsed:.2f}s).")
+
+    if verify:
+        problems = verify_round_trip(input_path, output_path, object_id, chunk_rows, integer_ids)
+        if problems:
+            print("Round trip through acmi_converter.py FAILED:\n  " + "\n  ".join(problems[:20]))
+            return False
+        print("Round trip through acmi_converter.py OK: every aircraft sample matches the CSV.")
+    return True
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Convert a detailed flight CSV to a basic ACMI file.")
+    parser = argparse.ArgumentParser(description="Convert a detailed flight CSV to a delta-encoded ACMI file.")
     parser.add_argument("input_csv", help="Path to the input CSV file.")
-    parser.add_argument("output_acmi", help="Path to save the output .acmi file.")
+    parser.add_argument("output_acmi", help="Path to save the output .acmi file (.zip.acmi writes a zip archive).")
+    parser.add_argument("--object-id", help="ACMI object id (hexadecimal) for a CSV without an Id column (default: the file name).")
+    parser.add_argument("--verify", action="store_true", help="Parse the written track with acmi_converter.py and check it against the CSV.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help=f"CSV rows converted at a time (default: {CHUNK_ROWS}).")
     args = parser.parse_args()
-    csv_to_acmi(args.input_csv, args.output_acmi)
\ No newline at end of file
+    if not csv_to_acmi(args.input_csv, args.output_acmi, args.object_id, args.verify, args.chunk_rows):
+        exit(1)
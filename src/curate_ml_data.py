@@ -2,8 +2,111 @@ import pandas as pd
 import numpy as np
 import os
 import argparse
+from storage import TABLE_FORMATS, DEFAULT_FORMAT, list_tables, read_table, table_path, write_table
+from executor import run_per_aircraft
+from schema import NO_LABEL, label_codes, labels_from_codes
 
-def curate_data(input_dir, output_dir_base, padding_seconds):
+# --- Clip extraction ---
+# Every maneuver block is padded in time and the padded windows are located with a binary
+# search on the sorted Time column. Overlapping windows are merged before any row is copied,
+# so each curated row is sliced exactly once and no deduplication pass is needed.
+# The clip index lists every clip with its label, its maneuver and padded time bounds and its
+# half-open [Start_Row, End_Row) range in the curated table.
+CLIP_INDEX_DIR = 'clips'
+CLIP_INDEX_COLUMNS = ['Clip_Id', 'Maneuver_Label', 'Start_Time', 'End_Time', 'Clip_Start_Time', 'Clip_End_Time', 'Start_Row', 'End_Row']
+
+def clip_index_dir(curated_dir):
+    """Directory holding the per-aircraft clip index tables of a curated data folder."""
+    return os.path.join(curated_dir, CLIP_INDEX_DIR)
+
+def maneuver_blocks(df):
+    """
+    Positions of the first and last row of every maneuver block and its label. A block is a
+    run of labeled rows with the same label; unlabeled rows in between do not split it.
+    Blocks are found on the label codes; the labels come back as a categorical.
+    """
+    codes, vocabulary = label_codes(df['Maneuver_Label'])
+    unlabeled = np.array([label == NO_LABEL for label in vocabulary] + [True])  # the extra entry is code -1
+    rows = np.flatnonzero(~unlabeled[codes])
+    block_codes = codes[rows]
+    is_first = np.ones(len(rows), dtype=bool)
+    is_first[1:] = block_codes[1:] != block_codes[:-1]
+    first = np.flatnonzero(is_first)
+    last = np.append(first[1:], len(rows))[:len(first)] - 1
+    return rows[first], rows[last], labels_from_codes(block_codes[first], vocabulary)
+
+def merge_intervals(starts, ends):
+    """
+    Merges half-open [start, end) intervals. Returns the merged intervals in order and the
+    index of the merged interval that contains each input interval.
+    """
+    by_start = np.argsort(starts, kind='stable')
+    sorted_starts, sorted_ends = starts[by_start], ends[by_start]
+    reach = np.maximum.accumulate(sorted_ends)
+    is_new = np.ones(len(starts), dtype=bool)
+    is_new[1:] = sorted_starts[1:] > reach[:-1]
+    firsts = np.flatnonzero(is_new)
+    membership = np.empty(len(starts), dtype=np.int64)
+    membership[by_start] = np.cumsum(is_new) - 1
+    return sorted_starts[firsts], np.maximum.reduceat(sorted_ends, firsts), membership
+
+def extract_maneuver_clips(df, padding_seconds):
+    """
+    Extracts the padded maneuver clips from one aircraft's labeled data.
+    Returns (curated_df, clip_index); both are None when there is nothing to keep.
+    """
+    if df.empty or 'Maneuver_Label' not in df.columns:
+        return None, None
+
+    first_rows, last_rows, block_labels = maneuver_blocks(df)
+    if len(first_rows) == 0:
+        return None, None
+
+    times = df['Time'].to_numpy(dtype=np.float64)
+    order = None if df['Time'].is_monotonic_increasing else np.argsort(times, kind='stable')
+    sorted_times = times if order is None else times[order]
+    start_times, end_times = times[first_rows], times[last_rows]
+    clip_start_times, clip_end_times = start_times - padding_seconds, end_times + padding_seconds
+
+    # Positions in sorted_times of the rows inside [clip start, clip end]; empty if a bound is NaN.
+    lo = np.searchsorted(sorted_times, clip_start_times, side='left')
+    hi = np.searchsorted(sorted_times, clip_end_times, side='right')
+    hi = np.where(np.isnan(clip_start_times) | np.isnan(clip_end_times), lo, np.maximum(hi, lo))
+
+    merged_lo, merged_hi, membership = merge_intervals(lo, hi)
+    lengths = merged_hi - merged_lo
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.repeat(merged_lo - offsets, lengths) + np.arange(lengths.sum())
+    curated_df = df.iloc[positions if order is None else order[positions]].reset_index(drop=True)
+
+    start_rows = offsets[membership] + lo - merged_lo[membership]
+    clip_index = pd.DataFrame({
+        'Clip_Id': np.arange(len(first_rows)),
+        'Maneuver_Label': block_labels,
+        'Start_Time': start_times,
+        'End_Time': end_times,
+        'Clip_Start_Time': clip_start_times,
+        'Clip_End_Time': clip_end_times,
+        'Start_Row': start_rows,
+        'End_Row': start_rows + hi - lo,
+    }, columns=CLIP_INDEX_COLUMNS)
+    return curated_df, clip_index
+
+def _curate_file(aircraft_id, input_path, output_dir, padding_seconds, fmt):
+    """
+    Executor task: read, curate and write one aircraft.
+    Returns (status, clip_count) with status 'saved', 'no_maneuvers' or 'skipped'.
+    """
+    df = read_table(input_path)
+    curated_df, clip_index = extract_maneuver_clips(df, padding_seconds)
+    if curated_df is None:
+        has_labels = not df.empty and 'Maneuver_Label' in df.columns
+        return ('no_maneuvers' if has_labels else 'skipped'), 0
+    write_table(curated_df, table_path(output_dir, aircraft_id, fmt))
+    write_table(clip_index, table_path(clip_index_dir(output_dir), aircraft_id, fmt))
+    return 'saved', len(clip_index)
+
+def curate_data(input_dir, output_dir_base, padding_seconds, fmt=DEFAULT_FORMAT, workers=1):
     """
     Scans labeled data, extracts clips of meaningful maneuvers with padding,
     and saves them to a new, curated directory for ML training.
@@ -18,58 +121,39 @@ def curate_data(input_dir, output_dir_base, padding_seconds):
     output_dir = os.path.join(output_dir_base, curated_folder_name)
 
     print(f"Curated data for ML will be saved in: {output_dir}")
-    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(clip_index_dir(output_dir), exist_ok=True)
 
     total_clips_extracted = 0
     processed_file_count = 0
 
-    for filename in os.listdir(input_dir):
-        if not filename.endswith(".csv"):
-            continue
-
-        input_path = os.path.join(input_dir, filename)
+    tables = list_tables(input_dir)
+    jobs = ((aircraft_id, (input_path, output_dir, padding_seconds, fmt)) for aircraft_id, input_path in tables)
+    file_names = {aircraft_id: os.path.basename(input_path) for aircraft_id, input_path in tables}
+    for aircraft_id, result, error in run_per_aircraft(_curate_file, jobs, workers):
+        filename = file_names[aircraft_id]
         print(f"Processing {filename}...")
+        if error:
+            print(f"Error processing file {filename}: {error}")
+            continue
 
-        try:
-            df = pd.read_csv(input_path)
-            if df.empty or 'Maneuver_Label' not in df.columns:
-                continue
-            
-            maneuvers = df[df['Maneuver_Label'].notna() & (df['Maneuver_Label'] != '')].copy()
-            
-            if maneuvers.empty:
-                print(f"  -> No maneuvers found in {filename}. Skipping.")
-                continue
-
-
-            maneuvers['block'] = (maneuvers['Maneuver_Label'] != maneuvers['Maneuver_Label'].shift()).cumsum()
-            all_clips = []
-            
-            for _, block in maneuvers.groupby('block'):
-                start_time, end_time = block['Time'].iloc[0], block['Time'].iloc[-1]
-                padded_start_time, padded_end_time = start_time - padding_seconds, end_time + padding_seconds
-                clip = df[(df['Time'] >= padded_start_time) & (df['Time'] <= padded_end_time)]
-                all_clips.append(clip)
-                total_clips_extracted += 1
-
-            if not all_clips: continue
-
-            curated_df = pd.concat(all_clips).drop_duplicates().sort_values(by='Time').reset_index(drop=True)
-            output_path = os.path.join(output_dir, filename)
-            curated_df.to_csv(output_path, index=False)
+        status, clip_count = result
+        if status == 'no_maneuvers':
+            print(f"  -> No maneuvers found in {filename}. Skipping.")
+        elif status == 'saved':
+            total_clips_extracted += clip_count
             processed_file_count += 1
-            print(f"  -> Extracted {len(all_clips)} clips. Saved curated file.")
-
-        except Exception as e:
-            print(f"Error processing file {filename}: {e}")
+            print(f"  -> Extracted {clip_count} clips. Saved curated file.")
 
     print("\nData curation complete.")
     print(f"Processed {processed_file_count} files and extracted a total of {total_clips_extracted} maneuver clips.")
+    print(f"Clip index tables saved in: {clip_index_dir(output_dir)}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Curate labeled flight data to extract meaningful maneuver clips for ML training.")
     parser.add_argument("input_dir", help="Directory containing the labeled data folders (e.g., '..._Labeled/').")
     parser.add_argument("output_dir", help="Base directory to save the new curated data folder.")
     parser.add_argument("--padding", type=float, default=5.0, help="Seconds of padding to add before and after each maneuver clip.")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=DEFAULT_FORMAT, help="Storage format of the output tables.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of aircraft processed in parallel (0 = all cores).")
     args = parser.parse_args()
-    curate_data(args.input_dir, args.output_dir, args.padding)
\ No newline at end of file
+    curate_data(args.input_dir, args.output_dir, args.padding, args.format, args.workers)
\ No newline at end of file
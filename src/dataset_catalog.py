@@ -0,0 +1,240 @@
+import os
+import json
+import hashlib
+import queue
+import argparse
+import threading
+import numpy as np
+from window_dataset import WindowDataset
+
+# --- Multi-session dataset catalog ---
+# A catalog is a JSON file that registers the window datasets ("shards") of many sessions so
+# they can be trained on together. Shards stay where prepare_data_for_ml wrote them and are
+# opened memory-mapped; registering a new mission only appends an entry. Training streams
+# batches from the shards: windows are shuffled in chunks (shard, window range) and through a
+# bounded shuffle buffer, so memory use depends on the buffer size, never on the corpus size.
+
+CATALOG_VERSION = 1
+CHUNK_SIZE = 4096       # consecutive windows shuffled as one unit
+BUFFER_CHUNKS = 16      # chunks mixed together in the shuffle buffer
+PREFETCH_BATCHES = 8    # batches prepared ahead by the background thread
+
+class DatasetCatalog:
+    """Registry of window dataset shards sharing one window length and feature set."""
+
+    def __init__(self, catalog_path):
+        self.catalog_path = catalog_path
+        self.catalog = {'version': CATALOG_VERSION, 'sequence_length': None, 'stride': None, 'feature_cols': None, 'shards': {}}
+        if os.path.exists(catalog_path):
+            with open(catalog_path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+            if catalog.get('version') != CATALOG_VERSION:
+                raise ValueError(f"Unsupported catalog version {catalog.get('version')} in '{catalog_path}'.")
+            self.catalog = catalog
+
+    def save(self):
+        catalog_dir = os.path.dirname(self.catalog_path)
+        if catalog_dir:
+            os.makedirs(catalog_dir, exist_ok=True)
+        temp_path = self.catalog_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.catalog, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.catalog_path)
+
+    def _shard_path(self, entry):
+        return os.path.join(os.path.dirname(os.path.abspath(self.catalog_path)), entry['path'])
+
+    def add(self, dataset_path, name=None):
+        """Registers (or refreshes) a window dataset as a shard. Returns the shard name."""
+        dataset = WindowDataset.load(dataset_path)
+        name = name or os.path.basename(os.path.normpath(dataset_path))
+        shape = {'sequence_length': dataset.sequence_length, 'stride': dataset.stride, 'feature_cols': dataset.feature_cols}
+        others = set(self.catalog['shards']) - {name}
+        if others and any(self.catalog[key] != value for key, value in shape.items()):
+            raise ValueError(
+                f"Dataset '{dataset_path}' was prepared with sequence_length={dataset.sequence_length}, stride={dataset.stride}, "
+                f"but the catalog holds sequence_length={self.catalog['sequence_length']}, stride={self.catalog['stride']} "
+                f"(and its feature columns must match too)."
+            )
+        self.catalog.update(shape)
+        counts = np.bincount(np.asarray(dataset.label_codes), minlength=len(dataset.vocabulary))
+        label_counts = sorted((str(label), int(count)) for label, count in zip(dataset.label_names, counts) if count)
+        catalog_dir = os.path.dirname(os.path.abspath(self.catalog_path))
+        self.catalog['shards'][name] = {
+            'path': os.path.relpath(os.path.abspath(dataset_path), catalog_dir),
+            'windows': len(dataset),
+            'frames': len(dataset.features),
+            'label_counts': dict(label_counts),
+        }
+        self.save()
+        return name
+
+    def remove(self, name):
+        if self.catalog['shards'].pop(name, None) is None:
+            raise KeyError(f"No shard named '{name}' in the catalog.")
+        self.save()
+
+    @property
+    def shard_names(self):
+        return sorted(self.catalog['shards'])
+
+    @property
+    def sequence_length(self):
+        return self.catalog['sequence_length']
+
+    @property
+    def total_windows(self):
+        return sum(entry['windows'] for entry in self.catalog['shards'].values())
+
+    @property
+    def classes(self):
+        """Sorted label vocabulary over all shards (the order a LabelEncoder would use)."""
+        return self.classes_of(self.shard_names)
+
+    def classes_of(self, names):
+        """Sorted label vocabulary over the named shards."""
+        return np.array(sorted({label for name in names for label in self.catalog['shards'][name]['label_counts']}))
+
+    def fingerprints(self):
+        """
+        {shard name: digest} of every shard's registered counts and the size and modification
+        time of its files, so a re-prepared session gets a new digest.
+        """
+        fingerprints = {}
+        for name in self.shard_names:
+            entry = self.catalog['shards'][name]
+            shard_path = self._shard_path(entry)
+            files = []
+            if os.path.isdir(shard_path):
+                for filename in sorted(os.listdir(shard_path)):
+                    stat = os.stat(os.path.join(shard_path, filename))
+                    files.append([filename, stat.st_size, stat.st_mtime_ns])
+            description = {'windows': entry['windows'], 'frames': entry['frames'], 'label_counts': entry['label_counts'], 'files': files}
+            fingerprints[name] = hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+        return fingerprints
+
+    def open_shards(self, names=None):
+        """Opens the named shards (default: every shard) memory-mapped, in the given order."""
+        names = self.shard_names if names is None else names
+        return [WindowDataset.load(self._shard_path(self.catalog['shards'][name])) for name in names]
+
+    def chunks(self, chunk_size=CHUNK_SIZE, names=None):
+        """(shard_index, start, end) window ranges covering the named shards (default: every shard)."""
+        chunks = []
+        for shard_index, name in enumerate(self.shard_names if names is None else names):
+            windows = self.catalog['shards'][name]['windows']
+            chunks.extend((shard_index, start, min(start + chunk_size, windows)) for start in range(0, windows, chunk_size))
+        return np.array(chunks, dtype=np.int64).reshape(-1, 3)
+
+def split_chunks(chunks, validation_fraction=0.2, seed=42):
+    """
+    Splits chunks into training and validation sets. Whole chunks are held out, so validation
+    windows do not overlap the frames of neighbouring training windows except at chunk edges.
+    """
+    order = np.random.default_rng(seed).permutation(len(chunks))
+    n_validation = int(round(len(chunks) * validation_fraction))
+    if len(chunks) > 1:
+        n_validation = min(max(n_validation, 1), len(chunks) - 1)
+    return chunks[np.sort(order[n_validation:])], chunks[np.sort(order[:n_validation])]
+
+def iter_catalog_batches(shards, chunks, batch_size, shuffle=False, seed=None, buffer_chunks=BUFFER_CHUNKS):
+    """
+    Yields (windows, labels) batches over the given chunks. With shuffle the chunk order is
+    permuted and windows are mixed inside a buffer of buffer_chunks chunks; only the buffer's
+    window indices and the batch being built are ever held in memory.
+    """
+    rng = np.random.default_rng(seed)
+    if shuffle:
+        chunks = chunks[rng.permutation(len(chunks))]
+    carry = np.empty((0, 2), dtype=np.int64)
+    for first in range(0, len(chunks), buffer_chunks):
+        buffer = [np.column_stack([np.full(end - start, shard_index), np.arange(start, end)]) for shard_index, start, end in chunks[first:first + buffer_chunks]]
+        pending = np.concatenate([carry] + buffer)
+        if shuffle:
+            pending = pending[rng.permutation(len(pending))]
+        last_chunk = first + buffer_chunks >= len(chunks)
+        usable = len(pending) if last_chunk else len(pending) - len(pending) % batch_size
+        for start in range(0, usable, batch_size):
+            yield _gather(shards, pending[start:start + batch_size])
+        carry = pending[usable:]
+
+def _gather(shards, batch):
+    """Gathers the windows and labels of (shard_index, window_index) pairs, keeping their order."""
+    first = shards[batch[0, 0]]
+    windows = np.empty((len(batch), first.sequence_length, first.n_features), dtype=np.float32)
+    labels = np.empty(len(batch), dtype=object)
+    for shard_index in np.unique(batch[:, 0]):
+        rows = np.flatnonzero(batch[:, 0] == shard_index)
+        windows[rows] = shards[shard_index].windows(batch[rows, 1])
+        labels[rows] = shards[shard_index].window_labels(batch[rows, 1])
+    return windows, labels
+
+def prefetch(iterable, depth=PREFETCH_BATCHES):
+    """Runs iterable in a background thread, keeping up to depth items ready."""
+    items = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Gives up once the consumer has gone away, so an abandoned producer never blocks forever.
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item): return
+        except Exception as e:
+            put(e)
+            return
+        put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done: return
+            if isinstance(item, Exception): raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def describe(catalog):
+    print(f"Catalog '{catalog.catalog_path}': {len(catalog.shard_names)} shards, {catalog.total_windows} windows of {catalog.sequence_length} steps.")
+    for name in catalog.shard_names:
+        entry = catalog.catalog['shards'][name]
+        print(f"- {name}: {entry['windows']} windows, {entry['frames']} frames ({entry['path']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage a catalog of window datasets for multi-session training.")
+    parser.add_argument("catalog", help="Path of the catalog JSON file (created if missing).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_parser = subparsers.add_parser("add", help="Register one or more window datasets.")
+    add_parser.add_argument("datasets", nargs='+', help="Window dataset directories (e.g., 'output/ml_data/Run-a1b2c3_dataset').")
+    remove_parser = subparsers.add_parser("remove", help="Unregister shards by name.")
+    remove_parser.add_argument("names", nargs='+', help="Shard names as shown by 'list'.")
+    subparsers.add_parser("list", help="Show the registered shards.")
+    args = parser.parse_args()
+
+    catalog = DatasetCatalog(args.catalog)
+    if args.command == "add":
+        for dataset_path in args.datasets:
+            try:
+                print(f"Registered shard '{catalog.add(dataset_path)}'.")
+            except (OSError, ValueError) as e:
+                print(f"Error: Could not register '{dataset_path}': {e}")
+    elif args.command == "remove":
+        for name in args.names:
+            try:
+                catalog.remove(name)
+                print(f"Removed shard '{name}'.")
+            except KeyError as e:
+                print(f"Error: {e.args[0]}")
+    describe(catalog)
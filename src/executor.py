@@ -0,0 +1,52 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# --- Shared per-aircraft executor ---
+# Every table stage does the same thing for each aircraft independently: read a table,
+# compute, write a table. run_per_aircraft fans that work out over a process pool so
+# reading, computing and writing of different aircraft overlap, while keeping at most
+# max_pending tasks (and their results) in flight. Results always come back in job order
+# and a failing aircraft only produces an error entry, never aborts the stage.
+
+def resolve_workers(workers):
+    """0 (or None) means one worker per available core."""
+    return workers or os.cpu_count() or 1
+
+def _call_task(task, aircraft_id, args):
+    try:
+        return task(aircraft_id, *args), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+def _collect(aircraft_id, future):
+    try:
+        result, error = future.result()
+    except Exception as e:
+        # The worker process itself died (e.g. out of memory); only this aircraft is lost.
+        result, error = None, f"worker failed: {e}"
+    return aircraft_id, result, error
+
+def run_per_aircraft(task, jobs, workers=1, max_pending=None):
+    """
+    Runs task(aircraft_id, *args) for every (aircraft_id, args) in jobs and yields
+    (aircraft_id, result, error) in job order; error is None on success. task must be a
+    module-level function so it can be sent to worker processes. With workers <= 1 the
+    jobs run in this process, one after the other.
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1:
+        for aircraft_id, args in jobs:
+            result, error = _call_task(task, aircraft_id, args)
+            yield aircraft_id, result, error
+        return
+
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for aircraft_id, args in jobs:
+            pending.append((aircraft_id, executor.submit(_call_task, task, aircraft_id, args)))
+            while len(pending) >= max_pending:
+                yield _collect(*pending.popleft())
+        while pending:
+            yield _collect(*pending.popleft())
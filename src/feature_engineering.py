@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 import os
 import argparse
+from storage import TABLE_FORMATS, DEFAULT_FORMAT, list_tables, read_table, table_path, write_table
+from executor import run_per_aircraft
+from schema import aircraft_code, compact_floats
 
 # --- CONSTANTS and calculation functions remain the same ---
 FEET_TO_M = 0.3048
@@ -42,7 +45,63 @@ def calculate_performance_features(df):
     df['SpecificPower'] = df['SpecificEnergy'].diff() / df['TimeDelta']
     return df
 
-def feature_engineering(input_dir, output_dir_base):
+FEATURE_COLUMNS = ['Id', 'Time', 'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw', 'TAS', 'Speed_ms', 'VS_ms', 'G_Normal', 'G_Axial', 'G_Lateral', 'RollRate', 'PitchRate', 'YawRate', 'TurnRate', 'SpecificEnergy', 'SpecificPower']
+CSV_FLOAT_FORMAT = '%.4f'
+
+# Every feature of a sample depends on at most the two samples before it (G and specific
+# power differentiate velocities that are themselves differences), which is what lets
+# live_ingest.py update features incrementally from a short history.
+FEATURE_LOOKBACK_ROWS = 2
+
+def clean_aircraft_samples(df, aircraft_id):
+    """
+    Sets the integer Id, coerces the numeric columns to float64 (the calculations run in full
+    precision; the converter stores float32) and drops samples without a full position and
+    attitude (in place).
+    """
+    df['Id'] = aircraft_code(aircraft_id)
+    numeric_cols = ['Time', 'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw', 'TAS', 'VS']
+    for col in numeric_cols:
+        # The converter already emits typed float columns; only coerce what didn't parse as numeric.
+        if col not in df.columns: df[col] = np.nan
+        elif not pd.api.types.is_numeric_dtype(df[col]): df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif df[col].dtype != np.float64: df[col] = df[col].astype(np.float64)
+    df.dropna(subset=['Time', 'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw'], inplace=True)
+    return df
+
+def compute_features(df):
+    """Runs the feature calculations on cleaned samples, sorted by time. The first row has no derivatives."""
+    processed_df = calculate_rates_and_time(df)
+    processed_df['Roll'], processed_df['Pitch'], processed_df['Yaw'] = np.radians(processed_df['Roll']), np.radians(processed_df['Pitch']), np.radians(processed_df['Yaw'])
+    processed_df = calculate_velocity_from_position(processed_df)
+    processed_df = calculate_g_force(processed_df)
+    processed_df = calculate_performance_features(processed_df)
+    processed_df['Roll'], processed_df['Pitch'], processed_df['Yaw'] = np.degrees(processed_df['Roll']), np.degrees(processed_df['Pitch']), np.degrees(processed_df['Yaw'])
+    return processed_df
+
+def engineer_aircraft_features(df, aircraft_id):
+    """
+    Calculates the flight dynamics features for one aircraft's partitioned samples.
+    Returns None when there are too few valid samples to differentiate.
+    """
+    if df.empty or len(df) < 3: return None
+    clean_aircraft_samples(df, aircraft_id)
+    if df.empty or len(df) < 3: return None
+
+    processed_df = compute_features(df).iloc[1:].reset_index(drop=True)
+    if processed_df.empty: return None
+
+    return compact_floats(processed_df.reindex(columns=FEATURE_COLUMNS))
+
+def _engineer_file(aircraft_id, input_path, output_dir, fmt):
+    """Executor task: read, engineer and write one aircraft. Returns whether a table was written."""
+    df = read_table(input_path, low_memory=False)
+    final_df = engineer_aircraft_features(df, aircraft_id)
+    if final_df is None: return False
+    write_table(final_df, table_path(output_dir, aircraft_id, fmt), float_format=CSV_FLOAT_FORMAT)
+    return True
+
+def feature_engineering(input_dir, output_dir_base, fmt=DEFAULT_FORMAT, workers=1):
     # --- MODIFIED: No longer looks for 'Aircraft' subdirectory ---
     if not os.path.isdir(input_dir):
         print(f"Error: Input directory not found: '{input_dir}'.")
@@ -57,40 +116,22 @@ def feature_engineering(input_dir, output_dir_base):
     processed_file_count = 0
     print(f"Starting feature engineering for files in '{input_dir}'...")
     
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".csv"):
-            try:
-                df = pd.read_csv(os.path.join(input_dir, filename), low_memory=False)
-                if df.empty or len(df) < 3: continue
-                df['Id'] = os.path.splitext(filename)[0]
-                numeric_cols = ['Time', 'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw', 'TAS', 'VS']
-                for col in numeric_cols:
-                    if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce')
-                    else: df[col] = np.nan
-                df.dropna(subset=['Time', 'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw'], inplace=True)
-                if df.empty or len(df) < 3: continue
-                
-                processed_df = calculate_rates_and_time(df)
-                processed_df['Roll'], processed_df['Pitch'], processed_df['Yaw'] = np.radians(processed_df['Roll']), np.radians(processed_df['Pitch']), np.radians(processed_df['Yaw'])
-                processed_df = calculate_velocity_from_position(processed_df)
-                processed_df = calculate_g_force(processed_df)
-                processed_df = calculate_performance_features(processed_df)
-                processed_df['Roll'], processed_df['Pitch'], processed_df['Yaw'] = np.degrees(processed_df['Roll']), np.degrees(processed_df['Pitch']), np.degrees(processed_df['Yaw'])
-                processed_df = processed_df.iloc[1:].reset_index(drop=True)
-                if processed_df.empty: continue
-
-                columns_to_keep = ['Id', 'Time', 'Longitude', 'Latitude', 'Altitude', 'Roll', 'Pitch', 'Yaw', 'TAS', 'Speed_ms', 'VS_ms', 'G_Normal', 'G_Axial', 'G_Lateral', 'RollRate', 'PitchRate', 'YawRate', 'TurnRate', 'SpecificEnergy', 'SpecificPower']
-                final_df = processed_df.reindex(columns=columns_to_keep)
-                final_df.to_csv(os.path.join(aircraft_output_dir, filename), index=False, float_format='%.4f')
-                processed_file_count += 1
-            except Exception as e:
-                print(f"Error processing file {filename}: {e}")
-        
+    tables = list_tables(input_dir)
+    jobs = ((aircraft_id, (input_path, aircraft_output_dir, fmt)) for aircraft_id, input_path in tables)
+    file_names = {aircraft_id: os.path.basename(input_path) for aircraft_id, input_path in tables}
+    for aircraft_id, processed, error in run_per_aircraft(_engineer_file, jobs, workers):
+        if error:
+            print(f"Error processing file {file_names[aircraft_id]}: {error}")
+        elif processed:
+            processed_file_count += 1
+    
     print(f"\nFeature engineering complete. Processed {processed_file_count} aircraft files.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Calculate features from partitioned aircraft data.")
     parser.add_argument("input_dir", help="Directory containing partitioned data (e.g., '..._Partitioned/').")
     parser.add_argument("output_dir", help="Base directory to save the new processed data folder.")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=DEFAULT_FORMAT, help="Storage format of the output tables.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of aircraft processed in parallel (0 = all cores).")
     args = parser.parse_args()
-    feature_engineering(args.input_dir, args.output_dir)
\ No newline at end of file
+    feature_engineering(args.input_dir, args.output_dir, args.format, args.workers)
\ No newline at end of file
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from predict_maneuvers import PREDICT_BATCH_SIZE, encoder_path_for, load_predictor, open_sequences
+
+# --- Warm local inference server ---
+# Loading TensorFlow and a Keras model takes seconds, far longer than predicting a session.
+# The server keeps recently used models loaded and answers predictions over localhost HTTP:
+#   POST /predict  {"model": "models/x.h5", "dataset": "output/ml_data/Run-a1b2c3_dataset"}
+#                  or {"model": ..., "windows": [[[...]]]} with (n, sequence_length, n_features) windows
+#   GET  /stats    request/window counters, throughput, p50/p99 latency, cached models
+#   GET  /health
+# Requests arriving together are micro-batched: one thread drains the queue for up to
+# --max-wait-ms and predicts the windows of all waiting requests for the same model in
+# single predict calls of up to --max-batch windows.
+
+DEFAULT_PORT = 8765
+CACHE_SIZE = 4
+MAX_WAIT_MS = 5.0
+LATENCY_SAMPLES = 10000  # latencies kept for the percentiles
+
+class ModelCache:
+    """
+    LRU cache of (model, encoder) pairs keyed by model path and the mtimes of both files.
+    Entries are futures: a model is loaded outside the lock, so requests for cached models
+    never wait on a load, and concurrent requests for the same new model share one load.
+    """
+
+    def __init__(self, capacity=CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(model_path):
+        model_path = os.path.abspath(model_path)
+        return model_path, os.path.getmtime(model_path), os.path.getmtime(encoder_path_for(model_path))
+
+    def get(self, model_path):
+        """The loaded predictor for model_path, reloading it if either file changed on disk."""
+        key = self.key(model_path)  # raises OSError if the model or its encoder is missing
+        with self.lock:
+            entry = self.entries.get(key)
+            loading = entry is None
+            if not loading:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            else:
+                self.misses += 1
+                # A retrained model replaces its stale entry instead of waiting to be evicted.
+                for stale in [cached for cached in self.entries if cached[0] == key[0]]:
+                    del self.entries[stale]
+                entry = self.entries[key] = Future()
+                while len(self.entries) > self.capacity:
+                    evicted, _ = self.entries.popitem(last=False)
+                    print(f"Evicted model '{evicted[0]}' from the cache.")
+        if loading:
+            # Only the request that created the entry loads the model; the others wait on it.
+            print(f"Loading model '{key[0]}'...")
+            try:
+                entry.set_result(load_predictor(key[0]))
+            except Exception as e:
+                with self.lock:
+                    # A failed load is not cached, so the next request tries again.
+                    if self.entries.get(key) is entry:
+                        del self.entries[key]
+                entry.set_exception(e)
+        return entry.result()
+
+    def paths(self):
+        with self.lock:
+            return [key[0] for key, entry in self.entries.items() if entry.done() and entry.exception() is None]
+
+class ServerStats:
+    """Thread-safe request counters and a window of recent latencies."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = self.windows = self.batches = self.batched_windows = self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record_request(self, windows, latency):
+        with self.lock:
+            self.requests += 1
+            self.windows += windows
+            self.latencies.append(latency)
+
+    def record_batch(self, windows):
+        with self.lock:
+            self.batches += 1
+            self.batched_windows += windows
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            uptime = time.perf_counter() - self.started
+            latencies = np.array(self.latencies)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (None, None)
+            return {
+                'uptime_s': round(uptime, 3),
+                'requests': self.requests,
+                'errors': self.errors,
+                'windows': self.windows,
+                'predict_calls': self.batches,
+                'mean_windows_per_call': round(self.batched_windows / self.batches, 2) if self.batches else None,
+                'requests_per_s': round(self.requests / uptime, 3),
+                'windows_per_s': round(self.windows / uptime, 3),
+                'latency_p50_ms': None if p50 is None else round(float(p50), 3),
+                'latency_p99_ms': None if p99 is None else round(float(p99), 3),
+            }
+
+class PredictionRequest:
+    """Windows to predict with one loaded model, from a window dataset or an in-memory array."""
+
+    def __init__(self, predictor, dataset=None, sequences=None):
+        self.predictor = predictor
+        self.dataset, self.sequences = dataset, sequences
+        self.parts = []
+        self.error = None
+        self.done = threading.Event()
+
+    def __len__(self):
+        return len(self.dataset) if self.dataset is not None else len(self.sequences)
+
+    def take(self, start, end):
+        if self.dataset is not None:
+            return self.dataset.windows(np.arange(start, end))
+        return self.sequences[start:end]
+
+class MicroBatcher:
+    """Single prediction thread combining the windows of concurrent requests into shared predict calls."""
+
+    def __init__(self, stats, max_batch=PREDICT_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.stats = stats
+        self.max_batch, self.max_wait = max_batch, max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def predict(self, request):
+        """Queues the request and blocks until its class indices are ready."""
+        self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return np.concatenate(request.parts) if request.parts else np.empty(0, dtype=np.int64)
+
+    def _collect(self):
+        """Blocks for one request, then gathers whatever else arrives within max_wait."""
+        pending = [self.requests.get()]
+        windows = len(pending[0])
+        deadline = time.perf_counter() + self.max_wait
+        while windows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0: break
+            try:
+                pending.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+            windows += len(pending[-1])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            groups = OrderedDict()
+            for request in pending:
+                groups.setdefault(id(request.predictor[0]), []).append(request)
+            for requests in groups.values():
+                try:
+                    self._predict_group(requests)
+                except Exception as e:
+                    for request in requests: request.error = e
+                for request in requests: request.done.set()
+
+    def _predict_group(self, requests):
+        """Cuts the requests' windows into slices and predicts them max_batch windows per call."""
+        model = requests[0].predictor[0]
+        slices, size = [], 0
+        for request in requests:
+            for start in range(0, len(request), self.max_batch):
+                end = min(start + self.max_batch, len(request))
+                if size + end - start > self.max_batch:
+                    self._predict_slices(model, slices)
+                    slices, size = [], 0
+                slices.append((request, start, end))
+                size += end - start
+        if slices:
+            self._predict_slices(model, slices)
+
+    def _predict_slices(self, model, slices):
+        windows = np.concatenate([request.take(start, end) for request, start, end in slices])
+        encoded = np.argmax(model.predict_on_batch(windows), axis=1)
+        self.stats.record_batch(len(windows))
+        offset = 0
+        for request, start, end in slices:
+            request.parts.append(encoded[offset:offset + end - start])
+            offset += end - start
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache_size=CACHE_SIZE, max_batch=PREDICT_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        super().__init__(address, RequestHandler)
+        self.cache = ModelCache(cache_size)
+        self.stats = ServerStats()
+        self.batcher = MicroBatcher(self.stats, max_batch, max_wait_ms)
+
+    def handle_predict(self, body):
+        """Runs one /predict request. Returns (status, response)."""
+        if not isinstance(body, dict) or 'model' not in body or ('dataset' in body) == ('windows' in body):
+            return 400, {'error': "Expected a JSON object with 'model' and either 'dataset' or 'windows'."}
+        try:
+            predictor = self.cache.get(body['model'])
+        except OSError as e:
+            return 404, {'error': f"Model or encoder not found: {e}"}
+        model, encoder = predictor
+        sequence_length, n_features = model.input_shape[1], model.input_shape[2]
+        if 'dataset' in body:
+            try:
+                dataset, sequences = open_sequences(body['dataset'], sequence_length)
+            except (OSError, ValueError) as e:
+                return 404, {'error': f"Could not open '{body['dataset']}': {e}"}
+        else:
+            dataset, sequences = None, np.asarray(body['windows'], dtype=np.float32)
+        data_shape = sequences.shape[1:] if dataset is None else (dataset.sequence_length, dataset.n_features)
+        if len(data_shape) != 2 or (sequence_length and data_shape[0] != sequence_length) or data_shape[1] != n_features:
+            return 400, {'error': f"Windows of shape {tuple(data_shape)} do not match the model input ({sequence_length}, {n_features})."}
+        labels = encoder.inverse_transform(self.batcher.predict(PredictionRequest(predictor, dataset, sequences))).tolist()
+        return 200, {'labels': labels, 'counts': dict(Counter(labels))}
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            stats = self.server.stats.snapshot()
+            stats.update(cached_models=self.server.cache.paths(), cache_hits=self.server.cache.hits, cache_misses=self.server.cache.misses)
+            self._reply(200, stats)
+        elif self.path == '/health':
+            self._reply(200, {'status': 'ok'})
+        else:
+            self._reply(404, {'error': f"Unknown path '{self.path}'."})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._reply(404, {'error': f"Unknown path '{self.path}'."})
+            return
+        started = time.perf_counter()
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            status, payload = self.server.handle_predict(body)
+        except ValueError as e:
+            status, payload = 400, {'error': f"Invalid request: {e}"}
+        except Exception as e:
+            status, payload = 500, {'error': str(e) or type(e).__name__}
+        latency = time.perf_counter() - started
+        if status == 200:
+            self.server.stats.record_request(len(payload['labels']), latency)
+            payload['latency_ms'] = round(latency * 1000, 3)
+        else:
+            self.server.stats.record_error()
+        self._reply(status, payload)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown the console under load
+
+def serve(host, port, cache_size=CACHE_SIZE, max_batch=PREDICT_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, preload=()):
+    server = InferenceServer((host, port), cache_size, max_batch, max_wait_ms)
+    for model_path in preload:
+        try:
+            server.cache.get(model_path)
+        except OSError as e:
+            print(f"Error: Could not preload '{model_path}': {e}")
+    print(f"Inference server listening on http://{host}:{server.server_address[1]} (Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve maneuver predictions from models kept loaded in memory.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: localhost only).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT}).")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help=f"Number of models kept loaded (default: {CACHE_SIZE}).")
+    parser.add_argument("--max-batch", type=int, default=PREDICT_BATCH_SIZE, help=f"Maximum windows per predict call (default: {PREDICT_BATCH_SIZE}).")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help=f"How long to wait for more requests to batch together (default: {MAX_WAIT_MS}).")
+    parser.add_argument("--preload", nargs='*', default=[], help="Models (.h5) to load at startup.")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.cache_size, args.max_batch, args.max_wait_ms, args.preload)
@@ -0,0 +1,241 @@
+import os
+import time
+import socket
+import argparse
+from array import array
+import numpy as np
+import pandas as pd
+from acmi_converter import AcmiParser, ObjectTrack, ZIP_MAGIC, GZIP_MAGIC, ZSTD_MAGIC
+from feature_engineering import FEET_TO_M, FEATURE_COLUMNS, FEATURE_LOOKBACK_ROWS, CSV_FLOAT_FORMAT, clean_aircraft_samples, compute_features
+from schema import FFP_DTYPE, compact_floats
+from maneuver_recognition import classify_ffp_codes, load_ffp_thresholds, resolve_ffp_thresholds
+
+# --- Live-tail ingest ---
+# Follows a track while it is being recorded: a growing .acmi file, or ACMI text streamed over
+# a TCP socket as a stand-in for a real-time telemetry feed. Every block of new lines is
+# parsed on its own and only the new samples go through the feature calculations and the FFP
+# classifier, so the work per update is proportional to what arrived, never to the track.
+# Between blocks the session keeps, per aircraft, only:
+#   - the last value of every ACMI field (the format only sends fields that changed), and
+#   - the last FEATURE_LOOKBACK_ROWS cleaned samples the feature derivatives need,
+# so memory stays constant however long the session runs. The features and FFP labels are
+# the same as the batch pipeline's for the same samples.
+
+READ_SIZE = 256 << 10      # bytes taken per update; bounds the latency of catching up
+POLL_INTERVAL = 0.5        # seconds between checks of a file that did not grow
+LATENCY_SAMPLES = 10000    # update latencies kept for the percentiles
+
+def _last_state(track):
+    """One-row track holding the last value of every field of track, to seed the next block."""
+    state = ObjectTrack()
+    state.times.append(track.times[-1])
+    for key, (_, values) in track.kinematics.items():
+        state.kinematics[key] = (array('q', [0]), array('d', [values[-1]]))
+    for key, (_, values) in track.attributes.items():
+        state.attributes[key] = (array('q', [0]), [values[-1]])
+    return state
+
+class LiveAircraft:
+    """Incremental features and FFP labels of one aircraft."""
+
+    def __init__(self, aircraft_id, ffp_thresholds):
+        self.aircraft_id = aircraft_id
+        self.ffp_thresholds = ffp_thresholds
+        self.history = None   # cleaned samples kept for the derivatives of the next ones
+        self.started = False  # whether the first (derivative-less) sample has been dropped
+        self.rows = self.late_samples = 0
+        self.ffp_label, self.ffp_since = None, None
+
+    def update(self, samples):
+        """Features (with FFP_Label) of the new samples, or None if none can be computed yet."""
+        samples = clean_aircraft_samples(samples, self.aircraft_id).sort_values(by='Time', kind='stable')
+        if self.history is not None and len(self.history):
+            late = samples['Time'].to_numpy() < self.history['Time'].iloc[-1]
+            if late.any():
+                # Samples older than what was already processed cannot be inserted retroactively.
+                self.late_samples += int(late.sum())
+                samples = samples[~late]
+        combined = samples if self.history is None else pd.concat([self.history, samples], ignore_index=True)
+        if not self.started and len(combined) < 3:
+            self.history = combined  # the batch pipeline also ignores aircraft with fewer than 3 samples
+            return None
+        if samples.empty:
+            return None
+        features = compute_features(combined.reset_index(drop=True))
+        features = features.iloc[1:] if not self.started else features.iloc[len(self.history):]
+        self.started = True
+        self.history = combined.iloc[-FEATURE_LOOKBACK_ROWS:].reset_index(drop=True)
+
+        features = compact_floats(features.reindex(columns=FEATURE_COLUMNS).reset_index(drop=True))
+        codes = classify_ffp_codes(features, self.ffp_thresholds)
+        features['FFP_Label'] = pd.Categorical.from_codes(codes, dtype=FFP_DTYPE)
+        self.rows += len(features)
+        changes = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        label = FFP_DTYPE.categories[codes[-1]]
+        if len(changes):
+            self.ffp_since = features['Time'].iloc[changes[-1]]
+        elif label != self.ffp_label:
+            self.ffp_since = features['Time'].iloc[0]
+        self.ffp_label = label
+        return features
+
+class LiveSession:
+    """Parser and per-aircraft state carried from one block of ACMI lines to the next."""
+
+    def __init__(self, ffp_thresholds=None):
+        self.ffp_thresholds = resolve_ffp_thresholds(ffp_thresholds)
+        self.parser = AcmiParser()
+        self.states = {}  # object id -> one-row track with the last value of every field
+        self.aircraft = {}
+        self.pending = b''
+        self.latencies = []
+        self.blocks = self.bytes = self.rows = 0
+
+    def feed(self, data):
+        """
+        Processes a block of raw ACMI bytes (a trailing partial line is kept for the next
+        block). Returns {aircraft_id: features DataFrame} for the aircraft with new rows.
+        """
+        started = time.perf_counter()
+        data = self.pending + data
+        cut = data.rfind(b'\n') + 1
+        self.pending, data = data[cut:], data[:cut]
+        self.bytes += len(data)
+
+        # Each block gets fresh tracks seeded with the previous state; only the parser's
+        # object registry, clock and column layout carry over.
+        parser = self.parser
+        parser.tracks = dict(self.states)
+        parser.feed(data.splitlines())
+        kinematic_headers, attribute_keys = parser.header()
+
+        updates = {}
+        for object_id, track in parser.tracks.items():
+            seeded = object_id in self.states
+            if len(track) == int(seeded): continue
+            samples = track.to_frame(kinematic_headers, attribute_keys).iloc[int(seeded):].reset_index(drop=True)
+            self.states[object_id] = _last_state(track)
+            aircraft = self.aircraft.get(object_id)
+            if aircraft is None:
+                aircraft = self.aircraft[object_id] = LiveAircraft(object_id, self.ffp_thresholds)
+            features = aircraft.update(samples)
+            if features is not None:
+                updates[object_id] = features
+                self.rows += len(features)
+        parser.tracks = {}
+
+        self.blocks += 1
+        self.latencies.append(time.perf_counter() - started)
+        del self.latencies[:-LATENCY_SAMPLES]
+        return updates
+
+    def flush(self):
+        """Processes a final line that was not terminated by a newline."""
+        return self.feed(b'\n') if self.pending else {}
+
+    def latency_report(self):
+        latencies = np.array(self.latencies) * 1000
+        if not len(latencies):
+            return "No updates processed."
+        p50, p99 = np.percentile(latencies, [50, 99])
+        return (f"{self.blocks} updates, {self.bytes / 1e6:.1f} MB, {self.rows} feature rows from {len(self.aircraft)} aircraft; "
+                f"update latency p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {latencies.max():.1f} ms.")
+
+# --- Sources: blocks of raw bytes as they arrive ---
+
+def tail_file(path, idle_timeout=None, poll_interval=POLL_INTERVAL, read_size=READ_SIZE):
+    """Yields new bytes of a growing file; stops after idle_timeout seconds without growth (never if None)."""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+        if magic.startswith((ZIP_MAGIC, GZIP_MAGIC, ZSTD_MAGIC)):
+            raise ValueError("Compressed tracks cannot be followed while they are written; record a plain .acmi file.")
+        f.seek(0)
+        idle_since = time.monotonic()
+        while True:
+            data = f.read(read_size)
+            if data:
+                idle_since = time.monotonic()
+                yield data
+                continue
+            if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                return
+            time.sleep(poll_interval)
+
+def read_socket(host, port, read_size=READ_SIZE):
+    """Yields bytes received from a TCP feed of ACMI text until the sender closes the connection."""
+    with socket.create_connection((host, port)) as connection:
+        while True:
+            data = connection.recv(read_size)
+            if not data:
+                return
+            yield data
+
+# --- Output ---
+
+def append_features(output_dir, aircraft_id, features):
+    path = os.path.join(output_dir, f"{aircraft_id}.csv")
+    features.to_csv(path, mode='a', header=not os.path.exists(path), index=False, float_format=CSV_FLOAT_FORMAT)
+
+def print_status(session, updates):
+    for aircraft_id, features in updates.items():
+        aircraft = session.aircraft[aircraft_id]
+        last = features.iloc[-1]
+        print(f"  {aircraft_id}: t={last['Time']:.1f}s  {aircraft.ffp_label} for {last['Time'] - aircraft.ffp_since:.1f}s  "
+              f"G={last['G_Normal']:.2f}  Speed={last['Speed_ms']:.0f} m/s  Alt={last['Altitude'] * FEET_TO_M:.0f} m")
+
+def live_ingest(blocks, output_dir=None, ffp_thresholds=None, quiet=False):
+    """Runs a live session over an iterable of byte blocks."""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Appending live features to '{output_dir}'.")
+    session = LiveSession(ffp_thresholds)
+    try:
+        for data in blocks:
+            updates = session.feed(data)
+            if output_dir:
+                for aircraft_id, features in updates.items():
+                    append_features(output_dir, aircraft_id, features)
+            if updates and not quiet:
+                print(f"[t={session.parser.current_time:.1f}s] {sum(len(f) for f in updates.values())} new samples")
+                print_status(session, updates)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    for aircraft_id, features in session.flush().items():
+        if output_dir: append_features(output_dir, aircraft_id, features)
+    late = sum(aircraft.late_samples for aircraft in session.aircraft.values())
+    if late:
+        print(f"Warning: Ignored {late} samples that arrived out of time order.")
+    print(session.latency_report())
+    return session
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow a track while it is recorded and compute features and FFP labels incrementally.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="Growing .acmi file to follow.")
+    source.add_argument("--tcp", metavar="HOST:PORT", help="TCP feed of ACMI text to read (e.g., '127.0.0.1:42674').")
+    parser.add_argument("--output-dir", help="Directory to append per-aircraft feature tables (CSV) to.")
+    parser.add_argument("--idle-timeout", type=float, default=None, help="Stop following a file after this many seconds without new data (default: follow until Ctrl+C).")
+    parser.add_argument("--ffp-thresholds", help="JSON file overriding FFP classification thresholds.")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary.")
+    args = parser.parse_args()
+
+    thresholds = None
+    if args.ffp_thresholds:
+        try:
+            thresholds = load_ffp_thresholds(args.ffp_thresholds)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not load FFP thresholds: {e}")
+            exit(1)
+    if args.file:
+        if not os.path.exists(args.file):
+            print(f"Error: Input file '{args.file}' not found.")
+            exit(1)
+        blocks = tail_file(args.file, args.idle_timeout)
+    else:
+        host, _, port = args.tcp.rpartition(':')
+        blocks = read_socket(host or '127.0.0.1', int(port))
+    try:
+        live_ingest(blocks, args.output_dir, thresholds, args.quiet)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        exit(1)
@@ -2,10 +2,48 @@ import pandas as pd
 import numpy as np
 import argparse
 import os
+import json
+from collections import deque
+from storage import TABLE_FORMATS, DEFAULT_FORMAT, list_tables, read_table, table_path, write_table
+from executor import run_per_aircraft
+from schema import FFP_LABELS, FFP_DTYPE, aircraft_name, label_codes, labels_from_codes, maneuver_vocabulary
 
-# All functions (get_ffp_label, ffp_recognition, maneuver_recognition, recognize_complex_maneuvers) are unchanged.
-def get_ffp_label(row):
-    roll_thresh, pitch_thresh, vs_thresh, g_thresh_high, roll_rate_thresh, pitch_rate_thresh, turn_rate_thresh, ps_thresh, inverted_thresh, nose_high_thresh, nose_low_thresh = 10, 10, 2.032, 1.1, 5, 5, 3, 10, 135, 45, -45
+# --- Fundamental Flight Phase (FFP) classification ---
+# Default thresholds: roll/pitch/inverted/nose angles in degrees, vs in m/s, g in G,
+# roll/pitch/turn rates in deg/s, specific power in m/s.
+FFP_THRESHOLDS = {
+    'roll': 10, 'pitch': 10, 'vs': 2.032, 'g_high': 1.1, 'roll_rate': 5, 'pitch_rate': 5,
+    'turn_rate': 3, 'ps': 10, 'inverted': 135, 'nose_high': 45, 'nose_low': -45,
+}
+# FFP_LABELS (schema.py) is in rule order; the last label is the fallback when no rule matches.
+FFP_CODES = {label: code for code, label in enumerate(FFP_LABELS)}
+# Column -> value used when the column is missing altogether (NaNs inside a column count as 0).
+FFP_INPUTS = {'G_Normal': 1.0, 'RollRate': 0.0, 'PitchRate': 0.0, 'Roll': 0.0, 'Pitch': 0.0, 'VS_ms': 0.0, 'TurnRate': 0.0, 'SpecificPower': 0.0}
+
+def resolve_ffp_thresholds(thresholds=None):
+    """Returns the default thresholds updated with the given overrides, rejecting unknown names."""
+    resolved = dict(FFP_THRESHOLDS)
+    for name, value in (thresholds or {}).items():
+        if name not in FFP_THRESHOLDS:
+            raise ValueError(f"Unknown FFP threshold '{name}'. Choose from: {', '.join(FFP_THRESHOLDS)}")
+        resolved[name] = float(value)
+    return resolved
+
+def load_ffp_thresholds(path):
+    """Reads threshold overrides from a JSON object such as {"roll": 15, "g_high": 1.2}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError("expected a JSON object of threshold names and values")
+    return resolve_ffp_thresholds(overrides)
+
+def get_ffp_label(row, thresholds=None):
+    """
+    Row-wise reference classifier; classify_ffp gives the same labels for a whole table at once.
+    thresholds must be a complete dict (see resolve_ffp_thresholds); None uses the defaults.
+    """
+    t = FFP_THRESHOLDS if thresholds is None else thresholds
+    roll_thresh, pitch_thresh, vs_thresh, g_thresh_high, roll_rate_thresh, pitch_rate_thresh, turn_rate_thresh, ps_thresh, inverted_thresh, nose_high_thresh, nose_low_thresh = t['roll'], t['pitch'], t['vs'], t['g_high'], t['roll_rate'], t['pitch_rate'], t['turn_rate'], t['ps'], t['inverted'], t['nose_high'], t['nose_low']
     g_normal, roll_rate, pitch_rate, roll, pitch, vs, turn_rate, specific_power = row.get('G_Normal', 1.0), row.get('RollRate', 0.0), row.get('PitchRate', 0.0), row.get('Roll', 0.0), row.get('Pitch', 0.0), row.get('VS_ms', 0.0), row.get('TurnRate', 0.0), row.get('SpecificPower', 0.0)
     if abs(roll) > inverted_thresh: return "Inverted_Flight"
     if pitch > nose_high_thresh: return "Nose_High_Climb"
@@ -21,43 +59,307 @@ def get_ffp_label(row):
     if abs(roll_rate) > roll_rate_thresh: return "Roll_Motion"
     if abs(pitch_rate) > pitch_rate_thresh: return "Pitch_Motion"
     return "Undefined"
-def ffp_recognition(df):
-    print("Performing FFP recognition..."); df['FFP_Label'] = df.fillna(0).apply(get_ffp_label, axis=1); return df
-def maneuver_recognition(df):
-    print("Performing simple maneuver recognition..."); df['Maneuver_Label'] = ''
-    maneuver_definitions = {'Sustained_Turn': {'core_ffp': 'Level_Turn', 'min_duration': 3.0}, 'Chandelle': {'core_ffp': 'Climbing_Turn', 'min_duration': 3.0}}
-    for _, group in df.groupby('Id'):
-        group['ffp_block'] = (group['FFP_Label'] != group['FFP_Label'].shift()).cumsum()
-        for _, block in group.groupby('ffp_block'):
-            ffp_label = block['FFP_Label'].iloc[0]
-            for maneuver_name, params in maneuver_definitions.items():
-                if ffp_label == params['core_ffp'] and (block['Time'].iloc[-1] - block['Time'].iloc[0]) >= params['min_duration']: df.loc[block.index, 'Maneuver_Label'] = maneuver_name
+
+def _ffp_input(df, column):
+    if column not in df.columns:
+        return np.full(len(df), FFP_INPUTS[column], dtype=np.float64)
+    values = df[column].to_numpy(dtype=np.float64)
+    return np.where(np.isnan(values), 0.0, values)
+
+def classify_ffp_codes(df, thresholds=None):
+    """
+    Vectorized get_ffp_label: evaluates every rule on whole columns and lets np.select pick
+    the first matching rule per row, which keeps the precedence of the if-cascade above.
+    Returns the int8 codes of the labels (indices into FFP_LABELS).
+    """
+    t = resolve_ffp_thresholds(thresholds)
+    g_normal, roll_rate, pitch_rate, roll, pitch, vs, turn_rate, specific_power = (_ffp_input(df, column) for column in FFP_INPUTS)
+    abs_roll, abs_vs = np.abs(roll), np.abs(vs)
+    turning = (abs_roll >= t['roll']) & (g_normal >= t['g_high']) & (np.abs(turn_rate) > t['turn_rate'])
+    wings_level = abs_roll < t['roll']
+    conditions = [
+        abs_roll > t['inverted'],
+        pitch > t['nose_high'],
+        pitch < t['nose_low'],
+        turning & (abs_vs < t['vs']),
+        turning & (vs > t['vs']),
+        turning,
+        wings_level & (abs_vs < t['vs']),
+        wings_level & ((specific_power > t['ps']) | (vs > t['vs'])),
+        wings_level,
+        np.abs(roll_rate) > t['roll_rate'],
+        np.abs(pitch_rate) > t['pitch_rate'],
+    ]
+    return np.select(conditions, np.arange(len(FFP_LABELS) - 1, dtype=np.int8), default=len(FFP_LABELS) - 1).astype(np.int8)
+
+def classify_ffp(df, thresholds=None):
+    """classify_ffp_codes as an object array of labels."""
+    return np.asarray(FFP_LABELS, dtype=object)[classify_ffp_codes(df, thresholds)]
+
+def ffp_recognition(df, thresholds=None):
+    print("Performing FFP recognition..."); df['FFP_Label'] = pd.Categorical.from_codes(classify_ffp_codes(df, thresholds), dtype=FFP_DTYPE); return df
+def ffp_recognition_rowwise(df, thresholds=None):
+    """Original per-row implementation, kept as the reference for classify_ffp."""
+    df['FFP_Label'] = df.fillna(0).apply(get_ffp_label, axis=1, thresholds=resolve_ffp_thresholds(thresholds)); return df
+# --- FFP block table ---
+# Maneuvers are defined on runs of identical FFP labels ("blocks"), so the recognizers work on a
+# run-length encoded table with one row per block instead of on the raw rows.
+
+def ffp_block_table(df):
+    """
+    Run-length encodes FFP_Label per aircraft in a single pass. Returns (blocks, row_order):
+    row_order lists the row positions of df grouped by Id (rows without an Id are left out, as
+    in groupby('Id')), and blocks has one row per run with Id, FFP_Label, FFP_Code (index into
+    FFP_LABELS, -1 if unknown), Start_Row/End_Row (half-open range into row_order) and
+    Start_Time/End_Time (Time of the block's first and last row). Runs are found by comparing
+    the label codes and integer Ids, not strings.
+    """
+    positions = list(df.groupby('Id').indices.values())
+    row_order = np.concatenate(positions) if positions else np.empty(0, dtype=np.intp)
+    codes = label_codes(df['FFP_Label'], FFP_LABELS)[0][row_order]
+    ids = df['Id'].to_numpy()[row_order]
+    times = df['Time'].to_numpy(dtype=np.float64)[row_order]
+
+    is_start = np.ones(len(row_order), dtype=bool)
+    is_start[1:] = (codes[1:] != codes[:-1]) | (ids[1:] != ids[:-1])
+    starts = np.flatnonzero(is_start)
+    ends = np.append(starts[1:], len(row_order))
+    block_codes = codes[starts]
+    blocks = pd.DataFrame({
+        'Id': ids[starts],
+        'FFP_Label': labels_from_codes(block_codes, FFP_LABELS),
+        'FFP_Code': block_codes.astype(np.int64),
+        'Start_Row': starts,
+        'End_Row': ends,
+        'Start_Time': times[starts],
+        'End_Time': times[ends - 1],
+    })
+    return blocks, row_order
+
+def _expand_blocks(blocks, row_order, block_values, row_count, fill):
+    """Broadcasts one value (e.g. a label code) per block to every row of df it covers."""
+    row_values = np.full(row_count, fill, dtype=block_values.dtype)
+    row_values[row_order] = np.repeat(block_values, (blocks['End_Row'] - blocks['Start_Row']).to_numpy())
+    return row_values
+
+# --- Maneuver library ---
+# Simple maneuvers are one sufficiently long block of a core FFP. Complex maneuvers are sequences
+# of FFP blocks whose total duration lies within [min_total_duration, max_total_duration]; when
+# matches of different maneuvers overlap, the one with the higher 'priority' (default 0) wins and
+# ties go to the maneuver defined later.
+MANEUVER_DEFINITIONS = {'Sustained_Turn': {'core_ffp': 'Level_Turn', 'min_duration': 3.0}, 'Chandelle': {'core_ffp': 'Climbing_Turn', 'min_duration': 3.0}}
+COMPLEX_MANEUVER_PATTERNS = {'Split_S': {'sequence': ['Roll_Motion', 'Inverted_Flight', 'Nose_Low_Dive', 'Pitch_Motion'], 'min_total_duration': 4.0, 'max_total_duration': 20.0}, 'Immelmann': {'sequence': ['Pitch_Motion', 'Nose_High_Climb', 'Roll_Motion'], 'min_total_duration': 4.0, 'max_total_duration': 20.0}, 'Aileron_Roll': {'sequence': ['Roll_Motion', 'Inverted_Flight', 'Roll_Motion'], 'min_total_duration': 2.0, 'max_total_duration': 8.0}}
+
+def _ffp_code(label, maneuver_name):
+    if label not in FFP_CODES:
+        raise ValueError(f"Maneuver '{maneuver_name}' uses unknown FFP label '{label}'. Choose from: {', '.join(FFP_LABELS)}")
+    return FFP_CODES[label]
+
+class ManeuverLibrary:
+    """
+    The simple maneuver definitions plus every complex pattern compiled into one Aho-Corasick
+    automaton over FFP codes, so an aircraft's block sequence is scanned once no matter how many
+    patterns there are.
+    """
+
+    # Symbol used for block labels outside FFP_LABELS; no pattern contains it.
+    OTHER_SYMBOL = len(FFP_LABELS)
+
+    def __init__(self, maneuvers=None, complex_maneuvers=None):
+        self.maneuvers = dict(MANEUVER_DEFINITIONS if maneuvers is None else maneuvers)
+        self.complex_maneuvers = dict(COMPLEX_MANEUVER_PATTERNS if complex_maneuvers is None else complex_maneuvers)
+        for maneuver_name, params in self.maneuvers.items():
+            _ffp_code(params['core_ffp'], maneuver_name)
+        # Maneuver labels are stored as codes into this vocabulary (schema.py).
+        self.vocabulary = maneuver_vocabulary(list(self.maneuvers) + list(self.complex_maneuvers))
+        self.codes = {name: code for code, name in enumerate(self.vocabulary)}
+        self._compile()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a JSON file with a "maneuvers" and/or a "complex_maneuvers" object in the format of
+        MANEUVER_DEFINITIONS / COMPLEX_MANEUVER_PATTERNS. A missing section keeps the defaults.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict) or set(config) - {'maneuvers', 'complex_maneuvers'}:
+            raise ValueError("expected a JSON object with 'maneuvers' and/or 'complex_maneuvers'")
+        try:
+            return cls(config.get('maneuvers'), config.get('complex_maneuvers'))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"malformed maneuver definition ({type(e).__name__}: {e})") from e
+
+    def _compile(self):
+        self.pattern_names = list(self.complex_maneuvers)
+        patterns = [params['sequence'] for params in self.complex_maneuvers.values()]
+        self.pattern_lengths = np.array([len(sequence) for sequence in patterns], dtype=np.int64)
+        self.min_durations = np.array([params.get('min_total_duration', 0) for params in self.complex_maneuvers.values()], dtype=np.float64)
+        self.max_durations = np.array([params.get('max_total_duration', float('inf')) for params in self.complex_maneuvers.values()], dtype=np.float64)
+        priorities = [params.get('priority', 0) for params in self.complex_maneuvers.values()]
+        # Matches are written in ascending (priority, definition order), so later writes win.
+        self.apply_rank = np.empty(len(patterns), dtype=np.int64)
+        self.apply_rank[np.argsort(priorities, kind='stable')] = np.arange(len(patterns))
+
+        # Trie over the FFP codes of every pattern.
+        alphabet = self.OTHER_SYMBOL + 1
+        transitions, outputs = [[-1] * alphabet], [[]]
+        for pattern_id, (maneuver_name, sequence) in enumerate(zip(self.pattern_names, patterns)):
+            if not sequence:
+                raise ValueError(f"Maneuver '{maneuver_name}' has an empty FFP sequence.")
+            state = 0
+            for label in sequence:
+                code = _ffp_code(label, maneuver_name)
+                if transitions[state][code] == -1:
+                    transitions[state][code] = len(transitions)
+                    transitions.append([-1] * alphabet)
+                    outputs.append([])
+                state = transitions[state][code]
+            outputs[state].append(pattern_id)
+
+        # Breadth-first failure links, folded into the transition table so scanning is one lookup per block.
+        fail = [0] * len(transitions)
+        queue = deque()
+        for code in range(alphabet):
+            child = transitions[0][code]
+            if child == -1:
+                transitions[0][code] = 0
+            else:
+                queue.append(child)
+        while queue:
+            state = queue.popleft()
+            for code in range(alphabet):
+                child = transitions[state][code]
+                if child == -1:
+                    transitions[state][code] = transitions[fail[state]][code]
+                else:
+                    fail[child] = transitions[fail[state]][code]
+                    outputs[child] = outputs[child] + outputs[fail[child]]
+                    queue.append(child)
+        self._transitions = transitions
+        self._outputs = [tuple(pattern_ids) for pattern_ids in outputs]
+
+    def find_complex(self, codes, start_times, end_times):
+        """
+        Scans one aircraft's block codes once and returns (pattern_ids, offsets) of every match that
+        satisfies its duration limits, ordered by pattern definition and then by offset.
+        """
+        transitions, outputs = self._transitions, self._outputs
+        match_ends, match_ids = [], []
+        state = 0
+        for position, code in enumerate(np.where(codes < 0, self.OTHER_SYMBOL, codes).tolist()):
+            state = transitions[state][code]
+            for pattern_id in outputs[state]:
+                match_ends.append(position)
+                match_ids.append(pattern_id)
+        match_ends = np.array(match_ends, dtype=np.int64)
+        match_ids = np.array(match_ids, dtype=np.int64)
+        offsets = match_ends - self.pattern_lengths[match_ids] + 1
+        total_durations = end_times[match_ends] - start_times[offsets]
+        in_range = (self.min_durations[match_ids] <= total_durations) & (total_durations <= self.max_durations[match_ids])
+        match_ids, offsets = match_ids[in_range], offsets[in_range]
+        order = np.lexsort((offsets, match_ids))
+        return match_ids[order], offsets[order]
+
+_DEFAULT_LIBRARY = None
+
+def default_library():
+    """The built-in maneuver definitions, compiled once per process."""
+    global _DEFAULT_LIBRARY
+    if _DEFAULT_LIBRARY is None:
+        _DEFAULT_LIBRARY = ManeuverLibrary()
+    return _DEFAULT_LIBRARY
+
+# --- Simple and complex maneuver recognition (both on the block table) ---
+
+def maneuver_recognition(df, block_table=None, library=None):
+    """Labels every block whose FFP is a maneuver's core FFP and that lasts at least its min_duration."""
+    print("Performing simple maneuver recognition...")
+    library = library or default_library()
+    blocks, row_order = block_table if block_table is not None else ffp_block_table(df)
+    durations = (blocks['End_Time'] - blocks['Start_Time']).to_numpy()
+    ffp_codes = blocks['FFP_Code'].to_numpy()
+    block_maneuvers = np.zeros(len(blocks), dtype=np.int16)  # code 0: no maneuver
+    for maneuver_name, params in library.maneuvers.items():
+        block_maneuvers[(ffp_codes == FFP_CODES[params['core_ffp']]) & (durations >= params['min_duration'])] = library.codes[maneuver_name]
+    df['Maneuver_Label'] = labels_from_codes(_expand_blocks(blocks, row_order, block_maneuvers, len(df), 0), library.vocabulary)
     return df
-def recognize_complex_maneuvers(df):
+
+def recognize_complex_maneuvers(df, block_table=None, library=None):
+    """
+    Finds the library's complex FFP sequences among each aircraft's blocks, ignoring Undefined
+    blocks, and labels the matched blocks following the library's overlap priority.
+    """
     print("Performing complex maneuver recognition...")
-    complex_maneuver_patterns = {'Split_S': {'sequence': ['Roll_Motion', 'Inverted_Flight', 'Nose_Low_Dive', 'Pitch_Motion'], 'min_total_duration': 4.0, 'max_total_duration': 20.0}, 'Immelmann': {'sequence': ['Pitch_Motion', 'Nose_High_Climb', 'Roll_Motion'], 'min_total_duration': 4.0, 'max_total_duration': 20.0}, 'Aileron_Roll': {'sequence': ['Roll_Motion', 'Inverted_Flight', 'Roll_Motion'], 'min_total_duration': 2.0, 'max_total_duration': 8.0}}
-    for aircraft_id, group in df.groupby('Id'):
-        ffp_blocks = group.groupby((group['FFP_Label'] != group['FFP_Label'].shift()).cumsum()); ffp_sequence_info = []
-        for _, block in ffp_blocks:
-            if not block.empty and block['FFP_Label'].iloc[0] != "Undefined": ffp_sequence_info.append({'label': block['FFP_Label'].iloc[0], 'start_time': block['Time'].iloc[0], 'end_time': block['Time'].iloc[-1], 'indices': block.index})
-        num_blocks = len(ffp_sequence_info)
-        for maneuver_name, params in complex_maneuver_patterns.items():
-            pattern_len = len(params['sequence'])
-            if num_blocks < pattern_len: continue
-            for i in range(num_blocks - pattern_len + 1):
-                if [ffp_sequence_info[j]['label'] for j in range(i, i + pattern_len)] == params['sequence']:
-                    total_duration = ffp_sequence_info[i + pattern_len - 1]['end_time'] - ffp_sequence_info[i]['start_time']
-                    if params.get('min_total_duration', 0) <= total_duration <= params.get('max_total_duration', float('inf')):
-                        print(f"Found '{maneuver_name}' for aircraft {aircraft_id}!"); all_indices = []
-                        for j in range(i, i + pattern_len): all_indices.extend(ffp_sequence_info[j]['indices'])
-                        df.loc[all_indices, 'Maneuver_Label'] = maneuver_name
+    library = library or default_library()
+    blocks, row_order = block_table if block_table is not None else ffp_block_table(df)
+    block_maneuvers = np.zeros(len(blocks), dtype=np.int16)
+    matched = np.zeros(len(blocks), dtype=bool)
+    ids = blocks['Id'].to_numpy()
+    defined = np.flatnonzero(blocks['FFP_Code'].to_numpy() != FFP_CODES["Undefined"])
+    aircraft_starts = np.flatnonzero(np.r_[True, ids[defined][1:] != ids[defined][:-1]]) if len(defined) else []
+    for aircraft_blocks in np.split(defined, aircraft_starts[1:]):
+        if not len(aircraft_blocks): continue
+        codes = blocks['FFP_Code'].to_numpy()[aircraft_blocks]
+        start_times, end_times = blocks['Start_Time'].to_numpy()[aircraft_blocks], blocks['End_Time'].to_numpy()[aircraft_blocks]
+        pattern_ids, offsets = library.find_complex(codes, start_times, end_times)
+        for pattern_id in pattern_ids: print(f"Found '{library.pattern_names[pattern_id]}' for aircraft {aircraft_name(ids[aircraft_blocks[0]])}!")
+        for match in np.lexsort((offsets, library.apply_rank[pattern_ids])):
+            covered = aircraft_blocks[offsets[match]:offsets[match] + library.pattern_lengths[pattern_ids[match]]]
+            block_maneuvers[covered] = library.codes[library.pattern_names[pattern_ids[match]]]
+            matched[covered] = True
+
+    matched_rows = _expand_blocks(blocks, row_order, matched, len(df), False)
+    new_labels = _expand_blocks(blocks, row_order, block_maneuvers, len(df), 0)
+    if 'Maneuver_Label' in df.columns:
+        # Labels set outside this library (e.g. by another one) extend the vocabulary.
+        existing = df['Maneuver_Label']
+        present = existing.cat.categories if isinstance(existing.dtype, pd.CategoricalDtype) else existing.dropna().unique()
+        vocabulary = maneuver_vocabulary(list(library.vocabulary) + list(present))
+        labels = label_codes(existing, vocabulary)[0].astype(np.int16)
+    else:
+        vocabulary = library.vocabulary
+        labels = np.full(len(df), -1, dtype=np.int16)  # missing, as before any labeling
+    library_codes = np.array([vocabulary.index(name) for name in library.vocabulary], dtype=np.int16)
+    labels[matched_rows] = library_codes[new_labels[matched_rows]]
+    df['Maneuver_Label'] = labels_from_codes(labels, vocabulary)
     return df
 
-def main(input_dir, output_dir_base):
+def label_aircraft(df, ffp_thresholds=None, library=None):
+    """Applies the FFP labels and the simple and complex maneuver labels to one aircraft's data."""
+    ffp_df = ffp_recognition(df, ffp_thresholds)
+    block_table = ffp_block_table(ffp_df)
+    maneuver_df = maneuver_recognition(ffp_df, block_table, library)
+    return recognize_complex_maneuvers(maneuver_df, block_table, library)
+
+def _label_file(aircraft_id, input_path, output_dir, fmt, ffp_thresholds=None, library=None):
+    """Executor task: read, label and write one aircraft. Returns whether a table was written."""
+    df = read_table(input_path)
+    if df.empty: return False
+    write_table(label_aircraft(df, ffp_thresholds, library), table_path(output_dir, aircraft_id, fmt))
+    return True
+
+def main(input_dir, output_dir_base, fmt=DEFAULT_FORMAT, workers=1, ffp_thresholds_path=None, library_path=None):
     if not os.path.isdir(input_dir):
         print(f"Error: Input directory not found: '{input_dir}'.")
         return
         
+    ffp_thresholds = None
+    if ffp_thresholds_path:
+        try:
+            ffp_thresholds = load_ffp_thresholds(ffp_thresholds_path)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not load FFP thresholds from '{ffp_thresholds_path}': {e}")
+            return
+    library = None
+    if library_path:
+        try:
+            library = ManeuverLibrary.from_file(library_path)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not load maneuver library from '{library_path}': {e}")
+            return
+        print(f"Loaded {len(library.maneuvers)} simple and {len(library.complex_maneuvers)} complex maneuver definitions.")
+
     base_folder_name = os.path.basename(input_dir.rstrip('/\\'))
     labeled_folder_name = base_folder_name.replace('_Processed', '_Labeled')
     output_dir = os.path.join(output_dir_base, labeled_folder_name)
@@ -66,20 +368,14 @@ def main(input_dir, output_dir_base):
     os.makedirs(output_dir, exist_ok=True)
     
     file_count = 0
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".csv"):
-            input_path = os.path.join(input_dir, filename)
-            print(f"Processing {filename}...")
-            
-            df = pd.read_csv(input_path)
-            if df.empty: continue
-
-            ffp_df = ffp_recognition(df)
-            maneuver_df = maneuver_recognition(ffp_df)
-            final_df = recognize_complex_maneuvers(maneuver_df)
-            
-            output_path = os.path.join(output_dir, filename)
-            final_df.to_csv(output_path, index=False)
+    tables = list_tables(input_dir)
+    jobs = ((aircraft_id, (input_path, output_dir, fmt, ffp_thresholds, library)) for aircraft_id, input_path in tables)
+    file_names = {aircraft_id: os.path.basename(input_path) for aircraft_id, input_path in tables}
+    for aircraft_id, labeled, error in run_per_aircraft(_label_file, jobs, workers):
+        print(f"Processing {file_names[aircraft_id]}...")
+        if error:
+            print(f"Error processing file {file_names[aircraft_id]}: {error}")
+        elif labeled:
             file_count += 1
             
     print(f"\nLabeling complete. Processed and saved {file_count} files.")
@@ -88,5 +384,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Apply FFP and maneuver labels to processed flight data.")
     parser.add_argument("input_dir", help="Directory containing processed data (e.g., '..._Processed/').")
     parser.add_argument("output_dir", help="Base directory to save the new labeled data folder.")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=DEFAULT_FORMAT, help="Storage format of the output tables.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of aircraft processed in parallel (0 = all cores).")
+    parser.add_argument("--ffp-thresholds", help="JSON file overriding FFP classification thresholds (e.g. {\"roll\": 15}).")
+    parser.add_argument("--maneuver-library", help="JSON file with 'maneuvers' and/or 'complex_maneuvers' definitions replacing the built-in ones.")
     args = parser.parse_args()
-    main(args.input_dir, args.output_dir)
\ No newline at end of file
+    main(args.input_dir, args.output_dir, args.format, args.workers, args.ffp_thresholds, args.maneuver_library)
\ No newline at end of file
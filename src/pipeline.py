@@ -0,0 +1,196 @@
+import os
+import traceback
+from contextlib import nullcontext
+from storage import DEFAULT_FORMAT, read_tables, write_tables
+from feature_engineering import CSV_FLOAT_FORMAT
+from executor import run_per_aircraft
+from window_dataset import WindowDataset
+from run_metrics import data_rows, measured_task
+
+# --- In-process pipeline engine ---
+# Runs the pipeline steps as plain function calls inside one interpreter. Each step takes
+# the previous step's output in memory ({aircraft_id: DataFrame} for the table stages,
+# a WindowDataset for the ML dataset) instead of reading it back from disk. A step
+# only loads its input from disk when the run starts at it (--start-step/--single-step),
+# and only writes its output when checkpointing is on or it is the last step of the run.
+# The clip index, the window dataset and the trained model are always written since they
+# are artifacts.
+
+class StepError(Exception):
+    """Raised when a step cannot produce any output."""
+
+class NoDataError(StepError):
+    """Raised when a step ran but found nothing to produce output from (no aircraft, no sequences)."""
+
+def map_aircraft(frames, task, description, workers=1, *task_args, metrics=None):
+    """
+    Runs task(aircraft_id, df, *task_args) for every aircraft on the shared per-aircraft
+    executor, keeping the input order and skipping aircraft whose result is None. An
+    exception only drops that aircraft, mirroring the per-file error handling of the scripts.
+    With a RunMetrics, every aircraft's usage is recorded in its running step.
+    """
+    results = {}
+    if metrics is None:
+        runner, jobs = task, ((aircraft_id, (df,) + task_args) for aircraft_id, df in frames.items())
+    else:
+        runner, jobs = measured_task, ((aircraft_id, (task, df) + task_args) for aircraft_id, df in frames.items())
+    for aircraft_id, result, error in run_per_aircraft(runner, jobs, workers):
+        if error:
+            print(f"Error {description} aircraft {aircraft_id}: {error}")
+            continue
+        if metrics is not None:
+            result, usage = result
+            metrics.record_aircraft(aircraft_id, usage)
+        if result is not None:
+            results[aircraft_id] = result
+    return results
+
+def _require_tables(frames, step_description):
+    if not frames:
+        raise NoDataError(f"No aircraft data left after {step_description}.")
+    return frames
+
+# --- Per-aircraft tasks (module level so they can run in worker processes) ---
+
+def _feature_task(aircraft_id, df):
+    from feature_engineering import engineer_aircraft_features
+    return engineer_aircraft_features(df, aircraft_id)
+
+def _recog_task(aircraft_id, df, ffp_thresholds, library):
+    from maneuver_recognition import label_aircraft
+    return label_aircraft(df, ffp_thresholds, library)
+
+def _curate_task(aircraft_id, df, padding_seconds):
+    from curate_ml_data import extract_maneuver_clips
+    return extract_maneuver_clips(df, padding_seconds)
+
+def _prepare_task(aircraft_id, df):
+    from prepare_data_for_ml import aircraft_frames
+    return (aircraft_id,) + aircraft_frames(df)
+
+# --- Step implementations: run(paths, options, data) -> data ---
+
+def _run_convert(paths, options, _):
+    from acmi_converter import read_acmi_frames
+    frames = read_acmi_frames(paths['input_file'], workers=options.get('workers', 1))
+    if frames is None:
+        raise StepError(f"Could not convert '{paths['input_file']}'.")
+    return _require_tables(frames, "ACMI conversion")
+
+def _run_feature(paths, options, frames):
+    processed = map_aircraft(frames, _feature_task, "engineering features for", options.get('workers', 1), metrics=options.get('metrics'))
+    print(f"\nFeature engineering complete. Processed {len(processed)} aircraft.")
+    return _require_tables(processed, "feature engineering")
+
+def _run_recog(paths, options, frames):
+    from maneuver_recognition import ManeuverLibrary, load_ffp_thresholds
+    ffp_thresholds, library = None, None
+    try:
+        if options.get('ffp_thresholds'):
+            ffp_thresholds = load_ffp_thresholds(options['ffp_thresholds'])
+        if options.get('maneuver_library'):
+            library = ManeuverLibrary.from_file(options['maneuver_library'])
+    except (OSError, ValueError) as e:
+        raise StepError(f"Could not load the recognition configuration: {e}") from e
+    labeled = map_aircraft(frames, _recog_task, "labeling", options.get('workers', 1), ffp_thresholds, library, metrics=options.get('metrics'))
+    print(f"\nLabeling complete. Labeled {len(labeled)} aircraft.")
+    return _require_tables(labeled, "maneuver recognition")
+
+def _run_curate(paths, options, frames):
+    from curate_ml_data import clip_index_dir
+    results = map_aircraft(frames, _curate_task, "curating", options.get('workers', 1), options.get('padding', 5.0), metrics=options.get('metrics'))
+    curated = {aircraft_id: curated_df for aircraft_id, (curated_df, _) in results.items() if curated_df is not None}
+    clip_indexes = {aircraft_id: clip_index for aircraft_id, (_, clip_index) in results.items() if clip_index is not None}
+    clip_count = sum(len(clip_index) for clip_index in clip_indexes.values())
+    write_tables(clip_indexes, clip_index_dir(paths['curated_dir']), options.get('format', DEFAULT_FORMAT))
+    print(f"\nData curation complete. Extracted {clip_count} maneuver clips from {len(curated)} aircraft.")
+    return _require_tables(curated, "curation (no maneuvers found)")
+
+def _run_prepare(paths, options, frames):
+    from prepare_data_for_ml import build_window_dataset
+    results = map_aircraft(frames, _prepare_task, "building sequences for", options.get('workers', 1), metrics=options.get('metrics'))
+    dataset = build_window_dataset(results.values(), options.get('sequence_length', 20), options.get('stride', 1))
+    if dataset is None:
+        raise NoDataError("No sequences were created. Check data length and sequence length.")
+    return dataset
+
+def _run_train(paths, options, dataset):
+    # Imported here so that runs without the train step never load TensorFlow.
+    from train_lstm import EPOCHS, train_model, train_from_catalog
+    epochs, warm_start, exports = options.get('epochs') or EPOCHS, options.get('warm_start'), options.get('exports') or ()
+    if options.get('catalog'):
+        # The session's dataset was registered in the catalog after 'prepare'; train on all of it.
+        train_from_catalog(options['catalog'], paths['model_path'], epochs, exports, warm_start=warm_start)
+    else:
+        train_model(dataset, paths['model_path'], exports, epochs=epochs, warm_start=warm_start)
+    return None
+
+# --- Loading a step's input from disk / saving its output ---
+
+def _table_loader(dir_key):
+    def load(paths, options):
+        directory = paths[dir_key]
+        if not os.path.isdir(directory):
+            raise StepError(f"Input directory not found: '{directory}'. Run the previous step first.")
+        return read_tables(directory, low_memory=False)
+    return load
+
+def _table_saver(dir_key, float_format=None):
+    def save(paths, options, frames):
+        write_tables(frames, paths[dir_key], options.get('format', DEFAULT_FORMAT), float_format=float_format)
+        print(f"Saved {len(frames)} tables to '{paths[dir_key]}'.")
+    return save
+
+def _load_dataset(paths, options):
+    if options.get('catalog'):
+        return None  # training reads every session of the catalog
+    if not os.path.isdir(paths['dataset_path']):
+        raise StepError("Input window dataset not found. Run the 'prepare' step first.")
+    return WindowDataset.load(paths['dataset_path'])
+
+def _save_dataset(paths, options, dataset):
+    from prepare_data_for_ml import save_window_dataset
+    save_window_dataset(dataset, paths['dataset_path'])
+
+STEP_FUNCTIONS = {
+    'convert': {'run': _run_convert, 'load': None, 'save': _table_saver('partitioned_dir')},
+    'feature': {'run': _run_feature, 'load': _table_loader('partitioned_dir'), 'save': _table_saver('processed_dir', float_format=CSV_FLOAT_FORMAT)},
+    'recog': {'run': _run_recog, 'load': _table_loader('processed_dir'), 'save': _table_saver('labeled_dir')},
+    'curate': {'run': _run_curate, 'load': _table_loader('labeled_dir'), 'save': _table_saver('curated_dir')},
+    'prepare': {'run': _run_prepare, 'load': _table_loader('curated_dir'), 'save': _save_dataset, 'always_save': True},
+    'train': {'run': _run_train, 'load': _load_dataset, 'save': None, 'writes_output': True},
+}
+
+def run_steps(steps, paths, options, on_step_complete=None):
+    """
+    Runs the given pipeline steps (dicts with 'name' and 'short_name', in order) in this
+    process. Returns the last step's output. Raises StepError if a step fails.
+    on_step_complete(step, saved) is called after each step; saved tells whether its
+    output was written to disk. options['metrics'] (a RunMetrics) records every step.
+    """
+    data = None
+    metrics = options.get('metrics')
+    for position, step in enumerate(steps):
+        functions = STEP_FUNCTIONS[step['short_name']]
+        print(f"\n{'='*20}\n[RUNNING] {step['name']}\n{'='*20}")
+        try:
+            with metrics.step(step['short_name']) if metrics is not None else nullcontext({}) as record:
+                if position == 0 and functions['load'] is not None:
+                    data = functions['load'](paths, options)
+                record['rows_in'] = data_rows(data)
+                data = functions['run'](paths, options, data)
+                record['rows_out'] = data_rows(data)
+                is_last = position == len(steps) - 1
+                saved = functions.get('writes_output', False)
+                if functions['save'] is not None and (functions.get('always_save') or options.get('checkpoint') or is_last):
+                    functions['save'](paths, options, data)
+                    saved = True
+        except StepError:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            raise StepError(f"{step['name']} failed: {e}") from e
+        print(f"[SUCCESS] {step['name']} completed.")
+        if on_step_complete is not None:
+            on_step_complete(step, saved)
+    return data
@@ -1,49 +1,187 @@
 import numpy as np
-from tensorflow.keras.models import load_model
+import pandas as pd
 import argparse
-import joblib
+import json
 import os
+import urllib.error
+import urllib.request
 from collections import Counter
+from acmi_converter import ACMI_SUFFIXES
+from storage import TABLE_FORMATS, DEFAULT_FORMAT, read_table, read_tables, table_name, table_path, write_table
+from prepare_data_for_ml import FEATURE_COLS, aircraft_frames
+from window_dataset import NO_MANEUVER, WindowDataset
+from schema import aircraft_name
+from tflite_backend import BACKENDS, DEFAULT_BACKEND, load_model_backend, model_artifact_path
 
-def predict_maneuvers(model_path, sequences_path):
-    """Loads a trained model and predicts maneuvers on new sequence data."""
-    
-    # --- 1. Find the corresponding encoder file ---
-    encoder_path = model_path.replace('.h5', '_encoder.joblib')
-    if not os.path.exists(model_path) or not os.path.exists(encoder_path):
-        print(f"Error: Model ('{model_path}') or Encoder ('{encoder_path}') not found.")
+PREDICT_BATCH_SIZE = 1024
+
+def encoder_path_for(model_path):
+    """Path of the LabelEncoder saved next to a model by train_lstm.save_model."""
+    return model_path.replace('.h5', '_encoder.joblib')
+
+def load_predictor(model_path, backend=DEFAULT_BACKEND):
+    """Loads a trained model with the given backend (see tflite_backend.py) and its LabelEncoder."""
+    # Imported here so that --server clients never pay for loading TensorFlow.
+    import joblib
+    return load_model_backend(model_path, backend), joblib.load(encoder_path_for(model_path))
+
+def missing_model_files(model_path, backend=DEFAULT_BACKEND):
+    """Prints an error and returns True if the model artifact of the backend or the encoder is missing."""
+    artifact_path, encoder_path = model_artifact_path(model_path, backend), encoder_path_for(model_path)
+    if os.path.exists(artifact_path) and os.path.exists(encoder_path):
+        return False
+    print(f"Error: Model ('{artifact_path}') or Encoder ('{encoder_path}') not found.")
+    if backend != 'keras':
+        print(f"Export it with: python src/tflite_backend.py {model_path} --backend {backend}")
+    else:
         print("Please ensure you have trained the model first.")
-        return
+    return True
+
+def open_sequences(sequences_path, model_length=None):
+    """
+    Opens the data to predict on. Returns (dataset, sequences): a window dataset re-indexed to
+    the model's window length, or the dense sequences of a legacy .npy file.
+    """
+    if sequences_path.endswith('.npy'):
+        # Dense sequence arrays written by older versions of the pipeline.
+        return None, np.load(sequences_path)
+    dataset = WindowDataset.load(sequences_path)
+    if model_length and model_length != dataset.sequence_length:
+        print(f"Re-indexing the dataset with the model's {model_length}-step windows.")
+        dataset = dataset.with_window(model_length)
+    return dataset, None
+
+def predict_encoded(model, dataset):
+    """Class index of every window, predicting batch by batch from the window dataset."""
+    predictions = [np.argmax(model.predict_on_batch(windows), axis=1) for _, windows in dataset.iter_batches(PREDICT_BATCH_SIZE)]
+    return np.concatenate(predictions) if predictions else np.empty(0, dtype=np.int64)
+
+def predict_probabilities(model, dataset):
+    """Class probabilities of every window, predicting batch by batch from the window dataset."""
+    predictions = [np.asarray(model.predict_on_batch(windows)) for _, windows in dataset.iter_batches(PREDICT_BATCH_SIZE)]
+    return np.concatenate(predictions)
+
+# --- Predicting straight from a track ---
+# A raw recording (or processed feature tables) is parsed, featurized and windowed in memory
+# and every window of every aircraft is predicted, one window per timestep. Each timestep then
+# gets the mean probabilities of all the windows that cover it, and runs of the same winning
+# label become maneuver segments with start and end times.
+
+def load_track_features(input_path):
+    """
+    {aircraft_id: feature DataFrame} of a raw ACMI recording (features are engineered in
+    memory), of one processed feature table, or of a directory of them. None on error.
+    """
+    from acmi_converter import read_acmi_frames
+    from feature_engineering import engineer_aircraft_features
+    if os.path.isdir(input_path):
+        return read_tables(input_path)
+    if input_path.lower().endswith(ACMI_SUFFIXES):
+        frames = read_acmi_frames(input_path)
+        if frames is None:
+            return None
+        features = {aircraft_id: engineer_aircraft_features(df, aircraft_id) for aircraft_id, df in frames.items()}
+        return {aircraft_id: df for aircraft_id, df in features.items() if df is not None}
+    name = table_name(os.path.basename(input_path))
+    if name is None or not os.path.exists(input_path):
+        print(f"Error: '{input_path}' is not an ACMI recording or a feature table.")
+        return None
+    return {name: read_table(input_path)}
+
+def timestep_probabilities(window_probabilities, window_starts, sequence_length, n_frames):
+    """
+    Mean class probabilities of the windows covering every frame. Every window adds its
+    probabilities where it starts and removes them where it ends, so one cumulative sum gives
+    the per-frame totals. Returns (probabilities, coverage); uncovered frames get zeros.
+    """
+    deltas = np.zeros((n_frames + 1, window_probabilities.shape[1]))
+    coverage = np.zeros(n_frames + 1, dtype=np.int64)
+    deltas[window_starts] += window_probabilities
+    deltas[window_starts + sequence_length] -= window_probabilities
+    coverage[window_starts] += 1
+    coverage[window_starts + sequence_length] -= 1
+    coverage = np.cumsum(coverage)[:-1]
+    return np.cumsum(deltas, axis=0)[:-1] / np.maximum(coverage, 1)[:, None], coverage
+
+def maneuver_segments(timesteps):
+    """Runs of the same predicted maneuver per aircraft, with their time span and mean confidence."""
+    ids, labels = timesteps['Id'].to_numpy(), timesteps['Predicted_Maneuver'].to_numpy(dtype=str)
+    is_first = np.ones(len(timesteps), dtype=bool)
+    is_first[1:] = (labels[1:] != labels[:-1]) | (ids[1:] != ids[:-1])
+    first = np.flatnonzero(is_first)
+    last = np.append(first[1:], len(timesteps))[:len(first)] - 1
+    confidence = np.add.reduceat(timesteps['Confidence'].to_numpy(), first) / (last - first + 1) if len(first) else np.empty(0)
+    times = timesteps['Time'].to_numpy()
+    segments = pd.DataFrame({
+        'Id': ids[first],
+        'Maneuver': labels[first],
+        'Start_Time': times[first],
+        'End_Time': times[last],
+        'Duration': times[last] - times[first],
+        'Timesteps': last - first + 1,
+        'Confidence': confidence,
+    })
+    return segments[(segments['Maneuver'] != '') & (segments['Maneuver'] != NO_MANEUVER)].reset_index(drop=True)
+
+def predict_track(model_path, input_path, output_dir=None, fmt=DEFAULT_FORMAT, backend=DEFAULT_BACKEND):
+    """Labels every timestep of a track in one in-memory pass. Returns (timesteps, segments)."""
+    if missing_model_files(model_path, backend):
+        return None
+
+    features = load_track_features(input_path)
+    if features is None:
+        return None
+    if not features:
+        print(f"Error: No aircraft data could be read from '{input_path}'.")
+        return None
 
-    # --- 2. Load the model, encoder, and new data ---
     print("Loading model and encoder...")
-    model = load_model(model_path)
-    encoder = joblib.load(encoder_path)
-    
-    print(f"Loading new sequences from '{sequences_path}'...")
-    new_sequences = np.load(sequences_path)
+    model, encoder = load_predictor(model_path, backend)
+    sequence_length = model.input_shape[1]
+    dataset = WindowDataset.from_segments([(aircraft_id,) + aircraft_frames(df) for aircraft_id, df in features.items()],
+                                          sequence_length, feature_cols=FEATURE_COLS)
+    if len(dataset) == 0:
+        print(f"Error: Every aircraft has fewer samples than the model's {sequence_length}-step window.")
+        return None
 
-    # --- 3. Make Predictions ---
-    print("Predicting maneuvers...")
-    predictions_prob = model.predict(new_sequences)
-    # The output is a probability for each class, so we take the one with the highest probability
-    predictions_encoded = np.argmax(predictions_prob, axis=1)
+    print(f"Predicting {len(dataset)} windows over {len(dataset.features)} timesteps of {len(features)} aircraft...")
+    probabilities, coverage = timestep_probabilities(predict_probabilities(model, dataset), dataset.window_starts, sequence_length, len(dataset.features))
+    labels = encoder.inverse_transform(np.argmax(probabilities, axis=1)).astype(str)
+    covered = coverage > 0
+    timesteps = pd.DataFrame({
+        'Id': np.concatenate([df['Id'].to_numpy() for df in features.values()]),
+        'Time': np.concatenate([df['Time'].to_numpy(dtype=np.float64) for df in features.values()]),
+        'Predicted_Maneuver': np.where(covered, labels, ''),
+        'Confidence': np.where(covered, probabilities.max(axis=1), np.nan),
+    })
+    segments = maneuver_segments(timesteps)
 
-    # --- 4. Decode Predictions back to Text Labels ---
-    # Convert the numeric predictions (0, 1, 2...) back to strings ('Split_S', 'Level_Turn'...)
-    predicted_labels = encoder.inverse_transform(predictions_encoded)
+    print("\n--- Maneuver Segments ---")
+    if segments.empty:
+        print("No maneuvers were identified.")
+    for segment in segments.itertuples():
+        print(f"- {aircraft_name(segment.Id)} {segment.Maneuver}: {segment.Start_Time:.1f}s - {segment.End_Time:.1f}s "
+              f"({segment.Duration:.1f}s, confidence {segment.Confidence:.2f})")
 
-    # --- 5. Display the Results ---
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        name = os.path.basename(os.path.normpath(input_path)).split('.')[0]
+        write_table(timesteps, table_path(output_dir, f"{name}_timesteps", fmt))
+        write_table(segments, table_path(output_dir, f"{name}_segments", fmt))
+        print(f"Per-timestep labels and maneuver segments saved to '{output_dir}'.")
+    return timesteps, segments
+
+def print_prediction_summary(predicted_labels):
     print("\n--- Prediction Results ---")
     print(f"Total sequences analyzed: {len(predicted_labels)}")
-    
+
     # Count the occurrences of each maneuver found
     maneuver_counts = Counter(predicted_labels)
-    
+
     if not maneuver_counts:
         print("No maneuvers were identified.")
         return
-        
+
     print("\nSummary of maneuvers found:")
     # Sort for consistent display
     for maneuver, count in sorted(maneuver_counts.items()):
@@ -51,9 +189,73 @@ def predict_maneuvers(model_path, sequences_path):
         if maneuver != 'No_Maneuver':
             print(f"- {maneuver}: {count} sequences")
 
+def predict_with_server(server_url, model_path, sequences_path):
+    """Sends the prediction to a running inference_server.py, which keeps the model loaded."""
+    request = urllib.request.Request(
+        server_url.rstrip('/') + '/predict',
+        data=json.dumps({'model': os.path.abspath(model_path), 'dataset': os.path.abspath(sequences_path)}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        print(f"Error: The inference server rejected the request: {json.load(e).get('error', e.reason)}")
+        return
+    except OSError as e:
+        print(f"Error: Could not reach the inference server at '{server_url}': {e}")
+        return
+    print_prediction_summary(result['labels'])
+
+def predict_maneuvers(model_path, sequences_path, backend=DEFAULT_BACKEND):
+    """Loads a trained model and predicts maneuvers on new sequence data."""
+
+    # --- 1. Find the model artifact and the corresponding encoder file ---
+    if missing_model_files(model_path, backend):
+        return
+
+    # --- 2. Load the model, encoder, and new data ---
+    print(f"Loading model ({backend}) and encoder...")
+    model, encoder = load_predictor(model_path, backend)
+
+    print(f"Loading new sequences from '{sequences_path}'...")
+    dataset, new_sequences = open_sequences(sequences_path, model.input_shape[1])
+
+    # --- 3. Make Predictions ---
+    print("Predicting maneuvers...")
+    if dataset is None:
+        predictions_prob = model.predict(new_sequences)
+        # The output is a probability for each class, so we take the one with the highest probability
+        predictions_encoded = np.argmax(predictions_prob, axis=1)
+    else:
+        predictions_encoded = predict_encoded(model, dataset)
+
+    # --- 4. Decode Predictions back to Text Labels ---
+    # Convert the numeric predictions (0, 1, 2...) back to strings ('Split_S', 'Level_Turn'...)
+    predicted_labels = encoder.inverse_transform(predictions_encoded)
+
+    # --- 5. Display the Results ---
+    print_prediction_summary(predicted_labels)
+
+def is_window_data(path):
+    """Whether path is a window dataset directory or a dense sequences .npy file."""
+    return path.endswith('.npy') or os.path.exists(os.path.join(path, 'meta.json'))
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Predict maneuvers on new data using a trained LSTM model.")
     parser.add_argument("model_path", help="Path to the trained Keras model (.h5).")
-    parser.add_argument("sequences_path", help="Path to the new, unlabeled sequences to predict on (.npy).")
+    parser.add_argument("input_path", help="Window dataset (or dense sequences .npy) to summarize, or a raw track (.acmi, .zip.acmi) or processed feature table(s) to label timestep by timestep.")
+    parser.add_argument("--server", help="URL of a running inference_server.py (e.g., 'http://127.0.0.1:8765') to predict with instead of loading the model here.")
+    parser.add_argument("--output-dir", help="Directory to save the per-timestep labels and maneuver segments of a track to.")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=DEFAULT_FORMAT, help="Storage format of the saved tables.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND, help="Inference backend: the Keras model, or its exported TFLite (optionally int8) artifact.")
     args = parser.parse_args()
-    predict_maneuvers(args.model_path, args.sequences_path)
\ No newline at end of file
+    if not is_window_data(args.input_path):
+        if args.server:
+            print("Error: --server only predicts on window datasets; predict tracks without it.")
+        else:
+            predict_track(args.model_path, args.input_path, args.output_dir, args.format, args.backend)
+    elif args.server:
+        predict_with_server(args.server, args.model_path, args.input_path)
+    else:
+        predict_maneuvers(args.model_path, args.input_path, args.backend)
@@ -2,61 +2,93 @@ import pandas as pd
 import numpy as np
 import os
 import argparse
+from storage import list_tables, read_table
+from executor import run_per_aircraft
+from schema import MANEUVER_LABELS, NO_LABEL, as_maneuver_labels, labels_from_codes
+from window_dataset import WindowDataset, dataset_size_report, window_mode_labels
 
-def create_sequences_from_df(df, sequence_length, feature_cols):
-    """Creates sequences and labels from a single aircraft's DataFrame."""
-    sequences, labels = [], []
+FEATURE_COLS = ['Roll', 'Pitch', 'Yaw', 'Speed_ms', 'Altitude', 'VS_ms', 'G_Normal', 'G_Axial', 'G_Lateral', 'RollRate', 'PitchRate', 'YawRate', 'TurnRate', 'SpecificEnergy', 'SpecificPower']
+
+def aircraft_frames(df, feature_cols=FEATURE_COLS):
+    """
+    Returns the float32 feature matrix and the per-frame maneuver labels of one aircraft, as a
+    categorical in the schema.py vocabulary (missing labels count as '', no maneuver).
+    """
     for col in feature_cols:
         if col not in df.columns: df[col] = 0
     df[feature_cols] = df[feature_cols].apply(pd.to_numeric, errors='coerce').fillna(0)
-    values, maneuver_labels = df[feature_cols].values, df['Maneuver_Label'].values
-    for i in range(len(df) - sequence_length + 1):
-        sequences.append(values[i:i+sequence_length])
-        window_labels = [l for l in maneuver_labels[i:i+sequence_length] if l and l != '']
-        
-        if window_labels:
-            label = max(set(window_labels), key=window_labels.count)
-        else:
-            label = 'No_Maneuver'
-        labels.append(label)
-        
-    return np.array(sequences), np.array(labels)
+    values = df[feature_cols].to_numpy(dtype=np.float32)
+    if 'Maneuver_Label' not in df.columns:
+        return values, labels_from_codes(np.zeros(len(df), dtype=np.int8), MANEUVER_LABELS)  # unlabeled data to predict on
+    # Unlabeled rows are '' in binary formats but NaN after a CSV round trip; treat both the same.
+    labels = as_maneuver_labels(df['Maneuver_Label'])
+    return values, labels.fillna(NO_LABEL)
+
+def create_sequences_from_df(df, sequence_length, feature_cols, stride=1):
+    """
+    Creates dense sequences and labels from a single aircraft's DataFrame: one window every
+    stride rows. The sequences are a read-only sliding-window view of the feature matrix.
+    """
+    values, maneuver_labels = aircraft_frames(df, feature_cols)
+    if stride < 1:
+        raise ValueError(f"stride must be at least 1, got {stride}")
+    if len(df) < sequence_length:
+        return np.array([]), np.array([])
+    window_starts = np.arange(0, len(df) - sequence_length + 1, stride)
+    # sliding_window_view puts the window axis last: (windows, features, time) -> (windows, time, features).
+    sequences = np.lib.stride_tricks.sliding_window_view(values, sequence_length, axis=0)[::stride].transpose(0, 2, 1)
+    return sequences, window_mode_labels(maneuver_labels, window_starts, sequence_length)
 
-def main(input_dir, output_sequences_path, output_labels_path, sequence_length):
+def build_window_dataset(parts, sequence_length, stride=1, feature_cols=FEATURE_COLS):
+    """
+    Builds the window dataset from (aircraft_id, features, frame_labels) parts, skipping None
+    entries. Returns None when no aircraft is long enough for a single window.
+    """
+    parts = [part for part in parts if part is not None and len(part[1]) > 0]
+    if not parts:
+        return None
+    dataset = WindowDataset.from_segments(parts, sequence_length, stride, feature_cols)
+    return dataset if len(dataset) > 0 else None
+
+def save_window_dataset(dataset, output_path):
+    dataset.save(output_path)
+    stored_bytes, dense_bytes = dataset_size_report(dataset)
+    print(f"\nML data preparation complete. {len(dataset)} windows of {dataset.sequence_length} steps over {len(dataset.features)} frames x {dataset.n_features} features.")
+    print(f"Stored {stored_bytes / 1e6:.1f} MB instead of {dense_bytes / 1e6:.1f} MB of dense sequences.")
+    print(f"Dataset saved to '{output_path}'")
+
+def _frames_file(aircraft_id, input_path):
+    """Executor task: read one aircraft and return (aircraft_id, features, frame_labels)."""
+    return (aircraft_id,) + aircraft_frames(read_table(input_path))
+
+def main(input_dir, output_dataset_path, sequence_length, workers=1, stride=1):
     """Loads labeled data from a directory and prepares it for ML."""
     if not os.path.isdir(input_dir):
         print(f"Error: Input directory not found '{input_dir}'.")
         print("Please ensure you have run the curation script first.")
         return
 
-    feature_cols = ['Roll', 'Pitch', 'Yaw', 'Speed_ms', 'Altitude', 'VS_ms', 'G_Normal', 'G_Axial', 'G_Lateral', 'RollRate', 'PitchRate', 'YawRate', 'TurnRate', 'SpecificEnergy', 'SpecificPower']
-    all_sequences, all_labels = [], []
     print(f"Loading and creating sequences from files in '{input_dir}'...")
-
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".csv"):
-            df = pd.read_csv(os.path.join(input_dir, filename))
-            if len(df) >= sequence_length:
-                sequences, labels = create_sequences_from_df(df, sequence_length, feature_cols)
-                if len(sequences) > 0:
-                    all_sequences.append(sequences); all_labels.append(labels)
+    jobs = ((aircraft_id, (input_path,)) for aircraft_id, input_path in list_tables(input_dir))
+    parts = []
+    for aircraft_id, result, error in run_per_aircraft(_frames_file, jobs, workers):
+        if error:
+            print(f"Error processing aircraft {aircraft_id}: {error}")
+        else:
+            parts.append(result)
+    dataset = build_window_dataset(parts, sequence_length, stride)
             
-    if not all_sequences:
+    if dataset is None:
         print("No sequences were created. Check data length and sequence length."); return
         
-    final_sequences, final_labels = np.concatenate(all_sequences), np.concatenate(all_labels)
-    os.makedirs(os.path.dirname(output_sequences_path), exist_ok=True)
-    os.makedirs(os.path.dirname(output_labels_path), exist_ok=True)
-    np.save(output_sequences_path, final_sequences)
-    np.save(output_labels_path, final_labels)
-    print(f"\nML data preparation complete. Shapes: {final_sequences.shape}, {final_labels.shape}")
-    print(f"Data saved to '{output_sequences_path}' and '{output_labels_path}'")
+    save_window_dataset(dataset, output_dataset_path)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Prepare labeled flight data for ML training.")
     parser.add_argument("input_dir", help="Directory containing the curated data folders (e.g., '..._Curated_For_ML/').")
-    parser.add_argument("output_sequences", help="Path to save the output sequences (.npy).")
-    parser.add_argument("output_labels", help="Path to save the output labels (.npy).")
+    parser.add_argument("output_dataset", help="Directory to save the window dataset to (e.g., 'output/ml_data/Run-a1b2c3_dataset').")
     parser.add_argument("--sequence_length", type=int, default=20, help="The number of time steps for each sequence.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of aircraft processed in parallel (0 = all cores).")
+    parser.add_argument("--stride", type=int, default=1, help="Number of time steps between the starts of consecutive sequences.")
     args = parser.parse_args()
-    main(args.input_dir, args.output_sequences, args.output_labels, args.sequence_length)
\ No newline at end of file
+    main(args.input_dir, args.output_dataset, args.sequence_length, args.workers, args.stride)
\ No newline at end of file
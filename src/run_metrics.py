@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows: no CPU time of children and no peak RSS
+    resource = None
+
+# --- Run metrics ---
+# Instrumentation for pipeline runs. Every step, and every aircraft a step processes, gets:
+#   wall_s, cpu_s         wall clock and CPU time (CPU includes finished worker processes)
+#   rows_in, rows_out     table rows (or dataset frames) consumed and produced
+#   rows_per_s            rows_in (rows_out for the first step) per wall second
+#   bytes_read/written    bytes through read/write calls (files, and pipes to worker processes)
+#   peak_rss_mb           peak resident memory while it ran
+# Byte counts come from /proc/self/io and per-step peaks rely on resetting the kernel's
+# high-water mark through /proc/self/clear_refs, so both are only available on Linux; on other
+# systems they are null (peak_rss_mb then is the process's peak so far). Steps that run in
+# other processes also get worker_peak_rss_mb; for --engine subprocess, where every step is a
+# separate script, that is the highest peak of the step processes so far and the byte counts
+# only cover the pipeline process itself.
+#
+# run_pipeline.py writes the metrics to <output_dir>/<session>_metrics.json. With --profile
+# every step also runs under cProfile (<step>.prof, for pstats/snakeviz) or a sampling
+# profiler (<step>.folded, collapsed stacks for flamegraph.pl/speedscope) in
+# <output_dir>/<session>_profiles/. Profiles only cover the main process: with --workers the
+# per-aircraft work of a step happens in the worker processes.
+
+METRICS_VERSION = 1
+PROFILERS = ('cprofile', 'sample')
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+def _io_counters():
+    try:
+        with open('/proc/self/io', 'r') as f:
+            counters = dict(line.split(':') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def _peak_rss_mb(who=None):
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3  # bytes on macOS, KiB elsewhere
+
+def children_peak_rss_mb():
+    """Highest peak RSS of the finished child processes of this process."""
+    return _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def data_rows(data):
+    """Rows of a step's input/output: table rows of {aircraft_id: DataFrame}, frames of a WindowDataset."""
+    if isinstance(data, dict):
+        return sum(len(df) for df in data.values() if hasattr(df, '__len__'))
+    if hasattr(data, 'features') and hasattr(data, 'window_starts'):
+        return len(data.features)
+    return None
+
+class Usage:
+    """Resource counters between start() and stop() in the current process."""
+
+    def start(self):
+        _reset_peak_rss()
+        self.pid = os.getpid()
+        self.wall, self.cpu, self.children_cpu = time.perf_counter(), time.process_time(), _children_cpu()
+        self.bytes_read, self.bytes_written = _io_counters()
+        return self
+
+    def stop(self):
+        bytes_read, bytes_written = _io_counters()
+        return {
+            'wall_s': time.perf_counter() - self.wall,
+            'cpu_s': time.process_time() - self.cpu + _children_cpu() - self.children_cpu,
+            'bytes_read': None if bytes_read is None else bytes_read - self.bytes_read,
+            'bytes_written': None if bytes_written is None else bytes_written - self.bytes_written,
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+
+def measured_task(aircraft_id, task, df, *args):
+    """
+    Executor task wrapping task(aircraft_id, df, *args): returns (result, usage of this
+    aircraft), measured in whichever process ran it.
+    """
+    usage = Usage().start()
+    result = task(aircraft_id, df, *args)
+    metrics = usage.stop()
+    metrics['rows_in'] = len(df)
+    metrics['pid'] = usage.pid
+    return result, metrics
+
+class StackSampler:
+    """Samples the stack of a thread from a background thread and counts the collapsed stacks."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def _run(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame is not None:
+                names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def enable(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(threading.get_ident(),), daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump_stats(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class RunMetrics:
+    """Collects the metrics of one pipeline run and writes them as JSON."""
+
+    def __init__(self, run_info=None, profiler=None, profile_dir=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}'. Choose from: {', '.join(PROFILERS)}")
+        self.run = dict(run_info or {}, started_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+        self.profiler, self.profile_dir = profiler, profile_dir
+        self.steps = []
+        self.started = time.perf_counter()
+        self.current = None
+
+    @contextmanager
+    def step(self, short_name, rows_in=None):
+        """Measures the body as one step; the yielded dict takes rows_out and other counts."""
+        record = {'step': short_name, 'status': 'running', 'rows_in': rows_in, 'rows_out': None, 'aircraft': {}}
+        self.steps.append(record)
+        self.current = record
+        profiler = self._start_profiler()
+        usage = Usage().start()
+        try:
+            yield record
+            record['status'] = 'ok'
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            record.update(usage.stop())
+            same_process = [entry['peak_rss_mb'] for entry in record['aircraft'].values() if entry['pid'] == usage.pid and entry['peak_rss_mb'] is not None]
+            if record['peak_rss_mb'] is not None and same_process:
+                # Each aircraft restarted the high-water mark; the step's peak is the highest of them.
+                record['peak_rss_mb'] = max([record['peak_rss_mb']] + same_process)
+            if profiler is not None:
+                profiler.disable()
+                record['profile'] = self._dump_profile(profiler, short_name)
+            in_workers = [entry for entry in record['aircraft'].values() if entry['pid'] != usage.pid]
+            if in_workers:
+                # The I/O of worker processes is only visible in their own counters.
+                for key in ('bytes_read', 'bytes_written'):
+                    if record[key] is not None:
+                        record[key] += sum(entry[key] or 0 for entry in in_workers)
+                record['worker_peak_rss_mb'] = max(entry['peak_rss_mb'] or 0 for entry in in_workers) if resource is not None else None
+            rows = record['rows_in'] if record['rows_in'] is not None else record['rows_out']
+            record['rows_per_s'] = rows / record['wall_s'] if record['status'] == 'ok' and rows is not None and record['wall_s'] > 0 else None
+            self.current = None
+
+    def record_aircraft(self, aircraft_id, metrics):
+        """Adds one aircraft's usage (from measured_task) to the running step."""
+        if self.current is None:
+            return
+        metrics['rows_per_s'] = metrics['rows_in'] / metrics['wall_s'] if metrics['wall_s'] > 0 else None
+        self.current['aircraft'][str(aircraft_id)] = metrics
+
+    def _start_profiler(self):
+        if self.profiler is None:
+            return None
+        if self.profiler == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+        else:
+            profiler = StackSampler()
+        profiler.enable()
+        return profiler
+
+    def _dump_profile(self, profiler, short_name):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{short_name}.{'prof' if self.profiler == 'cprofile' else 'folded'}")
+        profiler.dump_stats(path)
+        return path
+
+    def to_dict(self):
+        return {
+            'version': METRICS_VERSION,
+            'run': dict(self.run, wall_s=time.perf_counter() - self.started,
+                        peak_rss_mb=max([_peak_rss_mb() or 0] + [record.get('peak_rss_mb') or 0 for record in self.steps]) if resource is not None else None),
+            'steps': self.steps,
+        }
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self):
+        """One line per step for the end of a run."""
+        lines = []
+        for record in self.steps:
+            rate = f"{record['rows_per_s']:>12,.0f} rows/s" if record.get('rows_per_s') is not None else ' ' * 19
+            peak = f"{record['peak_rss_mb']:8.1f} MB" if record.get('peak_rss_mb') is not None else '       - MB'
+            workers = f" (workers {record['worker_peak_rss_mb']:.1f} MB)" if record.get('worker_peak_rss_mb') is not None else ''
+            lines.append(f"  {record['step']:<8} {record['status']:<6} {record['wall_s']:8.2f}s wall {record['cpu_s']:8.2f}s CPU {rate}  peak RSS {peak}{workers}")
+        return "\n".join(lines)
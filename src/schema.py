@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# --- Column schema of the per-aircraft tables ---
+# One set of column types from the converter to the window dataset:
+#   - Time and the positions (Longitude, Latitude and the flat-world U, V) stay float64, as
+#     does every *_Time column: they are differentiated or compared across the whole track,
+#     where float32 rounding would show up.
+#   - The other kinematics (Altitude, attitude, W) and the derived features of
+#     feature_engineering.py are float32. The feature calculations themselves still run in
+#     float64; only what is kept is float32.
+#   - Every other float column, e.g. a numeric ACMI attribute, stays float64: attributes can
+#     carry integer-like values (counts, ids) that float32 would round above 2**24.
+#   - FFP_Label and Maneuver_Label are categoricals, i.e. int8 codes into a fixed vocabulary.
+#   - Id is the integer value of the (hexadecimal) ACMI object id, e.g. '1a2' -> 418.
+# The vocabularies are append-only: new labels only ever go at the end, so a code means the
+# same label in every table, dataset and session.
+
+FLOAT_DTYPE = np.float32
+EXACT_COLUMNS = ('Time', 'Longitude', 'Latitude', 'U', 'V')
+COMPACT_COLUMNS = frozenset((
+    'Altitude', 'Roll', 'Pitch', 'Yaw', 'W',
+    'TAS', 'Speed_ms', 'VS_ms', 'G_Normal', 'G_Axial', 'G_Lateral', 'RollRate', 'PitchRate', 'YawRate',
+    'TurnRate', 'SpecificEnergy', 'SpecificPower',
+))
+ID_DTYPE = np.uint64
+
+# In FFP rule order (see maneuver_recognition.py); the last label is the fallback.
+FFP_LABELS = ("Inverted_Flight", "Nose_High_Climb", "Nose_Low_Dive", "Level_Turn", "Climbing_Turn", "Descending_Turn",
+              "Steady_Level_Flight", "Steady_Climb", "Steady_Descent", "Roll_Motion", "Pitch_Motion", "Undefined")
+FFP_DTYPE = pd.CategoricalDtype(FFP_LABELS)
+# Code 0 ('') marks rows that were checked but belong to no maneuver.
+NO_LABEL = ''
+MANEUVER_LABELS = (NO_LABEL, 'Sustained_Turn', 'Chandelle', 'Split_S', 'Immelmann', 'Aileron_Roll')
+
+def maneuver_vocabulary(names=()):
+    """MANEUVER_LABELS followed by the other given names (e.g. of a custom maneuver library), sorted."""
+    extra = sorted({str(name) for name in names if isinstance(name, str)} - set(MANEUVER_LABELS))
+    return MANEUVER_LABELS + tuple(extra)
+
+def maneuver_dtype(names=()):
+    return pd.CategoricalDtype(maneuver_vocabulary(names))
+
+def code_dtype(vocabulary):
+    """Smallest signed integer type holding every code of vocabulary and -1 (missing)."""
+    return np.int8 if len(vocabulary) <= np.iinfo(np.int8).max else np.int16
+
+def label_codes(values, vocabulary=None):
+    """
+    (codes, vocabulary) of a label column or array; missing values and labels outside the
+    given vocabulary are -1. Categoricals already in that vocabulary are not re-encoded.
+    Without a vocabulary, a categorical keeps its own and anything else gets a sorted one.
+    """
+    dtype = getattr(values, 'dtype', None)
+    if isinstance(dtype, pd.CategoricalDtype):
+        categorical = values.array if isinstance(values, pd.Series) else values
+        if vocabulary is None or tuple(categorical.categories) == tuple(vocabulary):
+            return np.asarray(categorical.codes), tuple(categorical.categories)
+        values = categorical
+    if vocabulary is None:
+        vocabulary = tuple(sorted(pd.unique(pd.Series(np.asarray(values, dtype=object)).dropna())))
+    codes = pd.Categorical(values, categories=vocabulary).codes
+    return codes.astype(code_dtype(vocabulary), copy=False), tuple(vocabulary)
+
+def labels_from_codes(codes, vocabulary):
+    """Categorical of codes into vocabulary (-1 = missing)."""
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(vocabulary))
+
+def as_maneuver_labels(values):
+    """Maneuver labels as a categorical over the maneuver vocabulary extended by the labels present."""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype) and tuple(values.dtype.categories[:len(MANEUVER_LABELS)]) == MANEUVER_LABELS:
+        return values
+    present = pd.unique(pd.Series(np.asarray(values, dtype=object)).dropna())
+    return pd.Categorical(np.asarray(values, dtype=object), dtype=maneuver_dtype(present))
+
+def aircraft_code(aircraft_id):
+    """Integer Id of an ACMI object id (hexadecimal, as in the table names)."""
+    try:
+        return ID_DTYPE(int(str(aircraft_id), 16))
+    except (ValueError, OverflowError):
+        raise ValueError(f"'{aircraft_id}' is not an ACMI object id (64-bit hexadecimal).") from None
+
+def aircraft_name(code):
+    """ACMI object id of an integer Id; other values (e.g. ids of older tables) are returned as text."""
+    return f"{int(code):x}" if isinstance(code, (int, np.integer)) else str(code)
+
+def aircraft_rows(ids, aircraft_id):
+    """Mask of the rows of an Id column that belong to aircraft_id (its ACMI object id)."""
+    if pd.api.types.is_integer_dtype(ids):
+        return ids == aircraft_code(aircraft_id)
+    return ids.astype(str) == str(aircraft_id)  # tables written before integer Ids
+
+def is_exact_column(column):
+    return column in EXACT_COLUMNS or str(column).endswith('_Time')
+
+def compact_floats(df):
+    """Casts the float64 kinematic and feature columns (COMPACT_COLUMNS) to float32 (in place). Returns df."""
+    for column in df.columns:
+        if column in COMPACT_COLUMNS and df[column].dtype == np.float64:
+            df[column] = df[column].astype(FLOAT_DTYPE)
+    return df
+
+def apply_schema(df):
+    """
+    Restores the schema types of a table read back from disk (in place): CSV files and tables
+    of older sessions come back with float64 and string columns. Returns df.
+    """
+    compact_floats(df)
+    if 'FFP_Label' in df.columns and df['FFP_Label'].dtype != FFP_DTYPE:
+        df['FFP_Label'] = df['FFP_Label'].astype(object).astype(FFP_DTYPE)
+    if 'Maneuver_Label' in df.columns:
+        df['Maneuver_Label'] = as_maneuver_labels(df['Maneuver_Label'])
+    return df
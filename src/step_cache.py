@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+
+# --- Content-addressed cache for pipeline steps ---
+# Every step gets a key derived from the key of the step before it (the first step uses the
+# input file's content hash), the step's own parameters and a hash of the source files that
+# implement it. A step whose recorded key matches and whose outputs still exist is up to
+# date and can be skipped; changing anything upstream changes every downstream key, so
+# invalidation cascades without any extra bookkeeping.
+
+CACHE_VERSION = 1
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+HASH_BLOCK_SIZE = 1 << 20
+
+# sources: files whose code determines the step's output
+# params: option names (from the run options) that change the step's output
+# param_files: params naming a config file; the file's content is hashed rather than its path
+# outputs: path_context keys of everything the step writes
+STEP_SPECS = {
+    'convert': {'sources': ['acmi_converter.py', 'schema.py', 'storage.py'], 'params': ['format'], 'outputs': ['partitioned_dir']},
+    'feature': {'sources': ['feature_engineering.py', 'schema.py', 'storage.py'], 'params': ['format'], 'outputs': ['processed_dir']},
+    'recog': {'sources': ['maneuver_recognition.py', 'schema.py', 'storage.py'], 'params': ['format'], 'param_files': ['ffp_thresholds', 'maneuver_library'], 'outputs': ['labeled_dir']},
+    'curate': {'sources': ['curate_ml_data.py', 'schema.py', 'storage.py'], 'params': ['format', 'padding'], 'outputs': ['curated_dir']},
+    'prepare': {'sources': ['prepare_data_for_ml.py', 'window_dataset.py', 'schema.py', 'storage.py'], 'params': ['sequence_length', 'stride'], 'outputs': ['dataset_path']},
+    'train': {'sources': ['train_lstm.py', 'window_dataset.py', 'schema.py', 'dataset_catalog.py', 'tflite_backend.py'], 'params': ['epochs', 'exports'], 'param_files': ['catalog', 'warm_start'], 'outputs': ['model_path', 'encoder_path']},
+}
+
+def _sha256_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def code_version(step_name):
+    """Hash of the source files implementing a step."""
+    hasher = hashlib.sha256()
+    for filename in STEP_SPECS[step_name]['sources']:
+        hasher.update(filename.encode('utf-8'))
+        hasher.update(_sha256_file(os.path.join(SRC_DIR, filename)).encode('utf-8'))
+    return hasher.hexdigest()
+
+class StepCache:
+    """Keeps the manifest of step keys and outputs for one session in a JSON file."""
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.manifest = {'version': CACHE_VERSION, 'input': {}, 'steps': {}}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == CACHE_VERSION:
+                    self.manifest = manifest
+            except (OSError, ValueError):
+                print(f"Warning: Ignoring unreadable cache manifest '{manifest_path}'.")
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.manifest_path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def input_digest(self, input_path):
+        """
+        Content hash of the input file. The digest is remembered together with the file's size
+        and modification time, so an unchanged multi-GB track is only hashed once.
+        """
+        stat = os.stat(input_path)
+        known = self.manifest['input']
+        if known.get('path') == os.path.abspath(input_path) and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+            return known['sha256']
+        digest = _sha256_file(input_path)
+        self.manifest['input'] = {'path': os.path.abspath(input_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def step_keys(self, step_names, input_path, options):
+        """Computes the chained cache key of every step, in pipeline order."""
+        keys = {}
+        upstream = self.input_digest(input_path)
+        for step_name in step_names:
+            spec = STEP_SPECS[step_name]
+            description = {
+                'version': CACHE_VERSION,
+                'step': step_name,
+                'upstream': upstream,
+                'params': {name: options.get(name) for name in spec['params']},
+                'param_files': {name: _sha256_file(options[name]) if options.get(name) and os.path.exists(options[name]) else None for name in spec.get('param_files', [])},
+                'code': code_version(step_name),
+            }
+            upstream = hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+            keys[step_name] = upstream
+        return keys
+
+    def is_fresh(self, step_name, key, path_context):
+        """True if the step was last recorded with this key and all of its outputs still exist."""
+        entry = self.manifest['steps'].get(step_name)
+        if not entry or entry.get('key') != key:
+            return False
+        return all(os.path.exists(path_context[output]) for output in STEP_SPECS[step_name]['outputs'])
+
+    def record(self, step_name, key, path_context):
+        self.manifest['steps'][step_name] = {
+            'key': key,
+            'outputs': [path_context[output] for output in STEP_SPECS[step_name]['outputs']],
+        }
+        self.save()
+
+    def forget(self, step_name):
+        """Drops a step whose outputs were not (re)written, so stale files are never trusted."""
+        if self.manifest['steps'].pop(step_name, None) is not None:
+            self.save()
+
+def skip_fresh_steps(steps, cache, step_keys, path_context):
+    """
+    Drops the leading steps that don't need to run: everything up to and including the last
+    step whose cached outputs are up to date. The first remaining step loads its input from
+    that step's outputs.
+    """
+    last_fresh = None
+    for i, step in enumerate(steps):
+        if cache.is_fresh(step["short_name"], step_keys[step["short_name"]], path_context):
+            last_fresh = i
+    if last_fresh is None:
+        return steps
+    for step in steps[:last_fresh + 1]:
+        print(f"[CACHED] {step['name']} is up to date, skipping.")
+    return steps[last_fresh + 1:]
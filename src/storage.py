@@ -0,0 +1,99 @@
+import pandas as pd
+import os
+import argparse
+from schema import apply_schema
+
+# --- Supported on-disk formats for the per-aircraft tables passed between pipeline stages ---
+# CSV is the original, human-readable format. Parquet and Feather keep column dtypes
+# (float32, categoricals) intact, are compressed, and skip text parsing entirely. Whatever the
+# format, tables are read back with the column types of schema.py.
+TABLE_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+DEFAULT_FORMAT = 'csv'
+COMPRESSION = 'zstd'
+
+def table_path(directory, name, fmt=DEFAULT_FORMAT):
+    """Returns the path of table 'name' (an aircraft id) stored in directory with the given format."""
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format '{fmt}'. Choose from: {', '.join(TABLE_FORMATS)}")
+    return os.path.join(directory, name + TABLE_FORMATS[fmt])
+
+def table_name(filename):
+    """Returns the table name for a supported file name, or None if the extension is not a table format."""
+    for extension in TABLE_FORMATS.values():
+        if filename.endswith(extension):
+            return filename[:-len(extension)]
+    return None
+
+def list_tables(directory):
+    """
+    Lists (name, path) for every table in directory, whatever its format, sorted by name. A
+    table stored in several formats (e.g. CSVs left by an earlier --format csv run next to new
+    Parquet files) is listed once, as its most recently written file; the others are reported.
+    """
+    newest, stale = {}, []
+    for filename in sorted(os.listdir(directory)):
+        name = table_name(filename)
+        if name is None:
+            continue
+        path = os.path.join(directory, filename)
+        if name in newest:
+            older, path = sorted((newest[name], path), key=os.path.getmtime)
+            stale.append(older)
+        newest[name] = path
+    if stale:
+        print(f"Warning: Ignoring {len(stale)} stale tables in '{directory}' with a newer file in another format "
+              f"(e.g. '{os.path.basename(stale[0])}'); delete them to silence this warning.")
+    return sorted(newest.items())
+
+def read_table(path, **csv_kwargs):
+    """Reads a table written by write_table. Extra keyword arguments only apply to CSV files."""
+    if path.endswith(TABLE_FORMATS['parquet']):
+        return apply_schema(pd.read_parquet(path))
+    if path.endswith(TABLE_FORMATS['feather']):
+        return apply_schema(pd.read_feather(path))
+    return apply_schema(pd.read_csv(path, **csv_kwargs))
+
+def write_table(df, path, float_format=None):
+    """
+    Writes df to path in the format implied by its extension. float_format only applies
+    to CSV; binary formats always store full precision.
+    """
+    if path.endswith(TABLE_FORMATS['parquet']):
+        df.to_parquet(path, index=False, compression=COMPRESSION)
+    elif path.endswith(TABLE_FORMATS['feather']):
+        df.reset_index(drop=True).to_feather(path, compression=COMPRESSION)
+    else:
+        df.to_csv(path, index=False, float_format=float_format)
+
+def read_tables(directory, **csv_kwargs):
+    """Reads every table in directory into {name: DataFrame}, ordered by name."""
+    return {name: read_table(path, **csv_kwargs) for name, path in list_tables(directory)}
+
+def write_tables(frames, directory, fmt=DEFAULT_FORMAT, float_format=None):
+    """Writes {name: DataFrame} into directory, one table per entry."""
+    os.makedirs(directory, exist_ok=True)
+    for name, df in frames.items():
+        write_table(df, table_path(directory, name, fmt), float_format=float_format)
+
+def export_csv(input_dir, output_dir):
+    """Exports every table in input_dir (any format) to CSV files in output_dir."""
+    if not os.path.isdir(input_dir):
+        print(f"Error: Input directory not found: '{input_dir}'.")
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    exported = 0
+    for name, path in list_tables(input_dir):
+        write_table(read_table(path), table_path(output_dir, name, 'csv'))
+        exported += 1
+    print(f"Exported {exported} tables from '{input_dir}' to CSV in '{output_dir}'.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a directory of pipeline tables (Parquet/Feather/CSV) to CSV.")
+    parser.add_argument("input_dir", help="Directory containing the tables to export (e.g., '..._Labeled/').")
+    parser.add_argument("output_dir", help="Directory to write the CSV files to.")
+    args = parser.parse_args()
+    export_csv(args.input_dir, args.output_dir)
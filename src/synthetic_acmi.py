@@ -0,0 +1,144 @@
+import os
+import argparse
+import zipfile
+import numpy as np
+
+# --- Synthetic Tacview tracks ---
+# Writes a deterministic .acmi track (same seed, same bytes) of any number of aircraft flying
+# straight legs between scripted maneuvers, for benchmarks and for checking the recognizers
+# without downloading real recordings. Each maneuver is an attitude profile (roll and pitch
+# keyframes, linearly interpolated) shaped so the FFP blocks it produces match the built-in
+# maneuver definitions in maneuver_recognition.py:
+#   Sustained_Turn   coordinated 60 degree bank, about 360 deg -> Level_Turn
+#   Split_S          roll inverted, pull through, roll out    -> Roll_Motion, Inverted_Flight, Nose_Low_Dive, Pitch_Motion
+#   Immelmann        pull up past vertical, roll out on top   -> Pitch_Motion, Nose_High_Climb, Roll_Motion
+#   Aileron_Roll     full roll                                -> Roll_Motion, Inverted_Flight, Roll_Motion
+# Only the sustained turn curves the flight path; the aerobatic figures are flown as attitude
+# changes along a straight, level path, and jump across the Euler angle singularity at the
+# vertical the way recorded attitudes do.
+
+G = 9.80665
+EARTH_RADIUS_M = 6371000
+KNOTS_TO_MS = 0.514444
+
+# Keyframes (seconds from the maneuver start, roll deg, pitch deg). Two keyframes at (almost)
+# the same time make the attitude jump between samples.
+MANEUVER_PROFILES = {
+    'Sustained_Turn': [(0, 0, 0), (1, 0, 0), (2, 60, 0), (62, 60, 0), (63, 0, 0), (64, 0, 0)],
+    'Split_S': [(0, 0, 0), (1, 0, 0), (3, 150, 0), (3.4, 180, 0), (6, 180, -50), (6.001, 30, -60), (8, 30, -46), (11, 30, -5), (12, 0, 0), (13, 0, 0)],
+    'Immelmann': [(0, 0, 0), (1, 0, 0), (1.5, 15, 0), (2, 15, 0), (6, 15, 46), (8, 15, 85), (8.5, 15, 85), (8.501, 130, 40), (11, 0, 0), (12, 0, 0)],
+    'Aileron_Roll': [(0, 0, 0), (1, 0, 0), (4, 360, 0), (5, 360, 0)],
+}
+# Maneuvers flown as coordinated turns: the heading follows the bank angle. G_Normal only
+# reaches the turn threshold over part of the compass (feature_engineering.py resolves the
+# acceleration without the heading), which is why the sustained turn goes most of the way round.
+COORDINATED_MANEUVERS = {'Sustained_Turn'}
+
+DEFAULT_RATE = 10.0            # samples per second
+STRAIGHT_LEG_SECONDS = (8, 15) # range of the straight legs between maneuvers
+SPEED_MS = (140, 220)
+ALTITUDE_FT = (10000, 25000)
+
+def _maneuver_attitude(name, rate):
+    """Roll and pitch samples (deg) of one maneuver at the given sample rate."""
+    keyframes = np.array(MANEUVER_PROFILES[name], dtype=np.float64)
+    times = np.arange(0, keyframes[-1, 0], 1.0 / rate)
+    return np.interp(times, keyframes[:, 0], keyframes[:, 1]), np.interp(times, keyframes[:, 0], keyframes[:, 2])
+
+def flight_program(rng, duration, rate, maneuvers):
+    """
+    Roll, pitch and coordinated-turn flag per sample: straight legs of random length between
+    the maneuvers, taken in turn starting at a random one. Also returns the flown maneuvers
+    as (name, start sample) pairs.
+    """
+    n_samples = int(round(duration * rate))
+    rolls, pitches, coordinated, flown = [], [], [], []
+    length, turn = 0, int(rng.integers(len(maneuvers)))
+    while length < n_samples:
+        leg = int(rng.uniform(*STRAIGHT_LEG_SECONDS) * rate)
+        rolls.append(np.zeros(leg)); pitches.append(np.zeros(leg)); coordinated.append(np.zeros(leg, dtype=bool))
+        length += leg
+        name = maneuvers[turn % len(maneuvers)]
+        turn += 1
+        roll, pitch = _maneuver_attitude(name, rate)
+        if length + len(roll) <= n_samples:
+            flown.append((name, length))
+        rolls.append(roll); pitches.append(pitch); coordinated.append(np.full(len(roll), name in COORDINATED_MANEUVERS))
+        length += len(roll)
+    return np.concatenate(rolls)[:n_samples], np.concatenate(pitches)[:n_samples], np.concatenate(coordinated)[:n_samples], flown
+
+def synthesize_aircraft(rng, duration, rate, maneuvers):
+    """Time-ordered (lon, lat, alt ft, roll, pitch, heading) samples, TAS in knots and flown maneuvers of one aircraft."""
+    roll, pitch, coordinated, flown = flight_program(rng, duration, rate, maneuvers)
+    speed = rng.uniform(*SPEED_MS)
+    dt = 1.0 / rate
+    turn_rate = np.where(coordinated, np.degrees(G * np.tan(np.radians(roll)) / speed), 0.0)
+    heading = (rng.uniform(0, 360) + np.cumsum(turn_rate * dt)) % 360
+    lat0, lon0 = rng.uniform(35, 37), rng.uniform(-116, -114)
+    course = np.radians(heading)
+    lat = lat0 + np.degrees(np.cumsum(speed * np.cos(course) * dt) / EARTH_RADIUS_M)
+    lon = lon0 + np.degrees(np.cumsum(speed * np.sin(course) * dt) / (EARTH_RADIUS_M * np.cos(np.radians(lat))))
+    alt = np.full(len(roll), rng.uniform(*ALTITUDE_FT))
+    roll = (roll + 180) % 360 - 180
+    return np.column_stack([lon, lat, alt, roll, pitch, heading]), speed / KNOTS_TO_MS, flown
+
+def synthesize_track(aircraft=4, duration=600.0, rate=DEFAULT_RATE, seed=0, maneuvers=tuple(MANEUVER_PROFILES)):
+    """
+    Generates the ACMI lines (str, without newlines) of a synthetic track. Returns (lines,
+    flown) where flown maps each aircraft id to its (maneuver, start time) pairs.
+    """
+    rng = np.random.default_rng(seed)
+    ids = [f"{index + 101:x}" for index in range(aircraft)]
+    samples, speeds, flown = [], [], {}
+    for aircraft_id in ids:
+        values, tas, maneuvers_flown = synthesize_aircraft(rng, duration, rate, list(maneuvers))
+        samples.append(values); speeds.append(tas)
+        flown[aircraft_id] = [(name, start / rate) for name, start in maneuvers_flown]
+
+    lines = ["FileType=text/acmi/tacview", "FileVersion=2.2", "0,ReferenceTime=2024-01-01T10:00:00Z", "0,Title=CLOUDSENSE synthetic track"]
+    samples = [values.tolist() for values in samples]
+    for frame in range(len(samples[0]) if samples else 0):
+        lines.append(f"#{frame / rate:.2f}")
+        for index, aircraft_id in enumerate(ids):
+            lon, lat, alt, roll, pitch, heading = samples[index][frame]
+            line = f"{aircraft_id},T={lon:.7f}|{lat:.7f}|{alt:.1f}|{roll:.1f}|{pitch:.1f}|{heading:.1f}"
+            if frame == 0:
+                # Attributes that never change are only sent once, as in recorded tracks.
+                line += f",Type=Air+FixedWing,Name=F-16C_50,Pilot=Synthetic {index + 1},Coalition=Enemies,Color=Red,TAS={speeds[index]:.1f}"
+            lines.append(line)
+    return lines, flown
+
+def write_track(lines, output_path):
+    """Writes the lines as a plain .acmi file, or zipped when output_path ends in .zip.acmi."""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    text = "\n".join(lines) + "\n"
+    if output_path.lower().endswith('.zip.acmi'):
+        member_name = os.path.basename(output_path)[:-len('.zip.acmi')] + '.txt.acmi'
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr(member_name, text)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic Tacview track with scripted maneuvers.")
+    parser.add_argument("output_path", help="Path of the .acmi (or .zip.acmi) file to write.")
+    parser.add_argument("--aircraft", type=int, default=4, help="Number of aircraft.")
+    parser.add_argument("--duration", type=float, default=600.0, help="Track length in seconds.")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Samples per second per aircraft.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same track.")
+    parser.add_argument("--maneuvers", nargs='+', choices=list(MANEUVER_PROFILES), default=list(MANEUVER_PROFILES), help="Maneuvers to fly, in turn (default: all).")
+    args = parser.parse_args()
+    if args.aircraft < 1 or args.duration <= 0 or args.rate <= 0:
+        print("Error: --aircraft, --duration and --rate must be positive.")
+    else:
+        lines, flown = synthesize_track(args.aircraft, args.duration, args.rate, args.seed, args.maneuvers)
+        write_track(lines, args.output_path)
+        counts = {}
+        for maneuvers in flown.values():
+            for name, _ in maneuvers:
+                counts[name] = counts.get(name, 0) + 1
+        print(f"Wrote {args.aircraft} aircraft x {args.duration:g}s at {args.rate:g} Hz ({len(lines)} lines) to '{args.output_path}'.")
+        print("Scripted maneuvers: " + ", ".join(f"{name} x{count}" for name, count in counts.items()))
@@ -0,0 +1,102 @@
+import os
+import argparse
+import numpy as np
+
+# --- TFLite CPU inference backend ---
+# Every Keras predict call carries a lot of fixed framework overhead, which dominates on CPU-only
+# debrief machines. A trained model can be exported next to its .h5 as a TFLite flatbuffer,
+# optionally with dynamic-range int8 quantization of the weights, and run with the TFLite
+# interpreter, which uses the XNNPACK CPU kernels by default. The standalone 'tflite_runtime'
+# package is used when installed, so prediction does not need the full TensorFlow.
+#
+#   backend       artifact
+#   keras         Run-a1b2c3_lstm_model.h5
+#   tflite        Run-a1b2c3_lstm_model.tflite
+#   tflite-int8   Run-a1b2c3_lstm_model_int8.tflite
+
+BACKENDS = ('keras', 'tflite', 'tflite-int8')
+DEFAULT_BACKEND = 'keras'
+TFLITE_BATCH_SIZE = 256
+
+def model_artifact_path(model_path, backend=DEFAULT_BACKEND):
+    """File the given backend loads for the model trained to model_path (.h5)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    if backend == 'keras':
+        return model_path
+    return model_path.replace('.h5', '_int8.tflite' if backend == 'tflite-int8' else '.tflite')
+
+def convert_to_tflite(model, quantize=False):
+    """Converts a Keras model to a TFLite flatbuffer (bytes)."""
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]  # int8 weights, float activations
+    try:
+        return converter.convert()
+    except Exception as e:
+        # Keras LSTMs normally map to the fused TFLite LSTM kernel; fall back to TF ops otherwise.
+        print(f"Warning: Builtin-only conversion failed ({e}); retrying with TensorFlow ops, which the lightweight runtime cannot run.")
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        converter._experimental_lower_tensor_list_ops = False
+        return converter.convert()
+
+def export_tflite(model, model_path, backend='tflite'):
+    """Writes the TFLite artifact of a Keras model next to model_path. Returns its path."""
+    artifact_path = model_artifact_path(model_path, backend)
+    with open(artifact_path, 'wb') as f:
+        f.write(convert_to_tflite(model, quantize=backend == 'tflite-int8'))
+    print(f"Exported {backend} model to {artifact_path} ({os.path.getsize(artifact_path) / 1e6:.2f} MB)")
+    return artifact_path
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+class TFLitePredictor:
+    """Runs a TFLite model behind the predict_on_batch/predict/input_shape interface of a Keras model."""
+
+    def __init__(self, artifact_path, num_threads=None):
+        self.interpreter = _interpreter_class()(model_path=artifact_path, num_threads=num_threads or os.cpu_count())
+        self.input, = self.interpreter.get_input_details()
+        self.output = self.interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(size) for size in self.input['shape'][1:])
+        self.batch_size = None
+
+    def predict_on_batch(self, windows):
+        windows = np.ascontiguousarray(windows, dtype=self.input['dtype'])
+        if len(windows) != self.batch_size:
+            # Tensors are sized for one batch size; reallocating only happens when it changes.
+            self.interpreter.resize_tensor_input(self.input['index'], windows.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(windows)
+        self.interpreter.set_tensor(self.input['index'], windows)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output['index'])
+
+    def predict(self, windows, batch_size=TFLITE_BATCH_SIZE):
+        return np.concatenate([self.predict_on_batch(windows[start:start + batch_size]) for start in range(0, len(windows), batch_size)])
+
+def load_model_backend(model_path, backend=DEFAULT_BACKEND):
+    """Loads the model trained to model_path with the given backend."""
+    if backend == 'keras':
+        from tensorflow.keras.models import load_model
+        return load_model(model_path)
+    return TFLitePredictor(model_artifact_path(model_path, backend))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained Keras model (.h5) for the TFLite CPU backend.")
+    parser.add_argument("model_path", help="Path to the trained Keras model (.h5).")
+    parser.add_argument("--backend", nargs='+', choices=BACKENDS[1:], default=['tflite'], help="Artifacts to export (default: tflite).")
+    args = parser.parse_args()
+    if not os.path.exists(args.model_path):
+        print(f"Error: Model '{args.model_path}' not found.")
+    else:
+        from tensorflow.keras.models import load_model
+        model = load_model(args.model_path)
+        for backend in args.backend:
+            export_tflite(model, args.model_path, backend)
@@ -1,54 +1,241 @@
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
-from tensorflow.keras.utils import to_categorical
+import itertools
+import functools
 import os
+import json
+import shutil
+import hashlib
 import argparse
-import joblib
+from window_dataset import WindowDataset
+from dataset_catalog import DatasetCatalog, iter_catalog_batches, prefetch, split_chunks
+from tflite_backend import BACKENDS, export_tflite
 
-def train_lstm(sequences_path, labels_path, model_path):
-    """Trains an LSTM model and saves both the model and its label encoder."""
-    if not os.path.exists(sequences_path) or not os.path.exists(labels_path):
-        print("Error: Input sequence or label file not found.")
-        return
+BATCH_SIZE = 64
+EPOCHS = 20
+PATIENCE = 3                    # epochs without a lower validation loss before training stops
+FINE_TUNE_LEARNING_RATE = 1e-4  # a tenth of Adam's default: a warm-started model only needs adjusting
 
-    sequences = np.load(sequences_path)
-    labels = np.load(labels_path)
+# --- Checkpoints, early stopping and warm starts ---
+# After every epoch, training writes <model>_checkpoint/: the model with its optimizer state
+# (last.h5), the weights of the epoch with the lowest validation loss (best.weights.h5) and
+# state.json (epochs done, best loss, epochs since it improved, and a key of the data, labels
+# and base model). Started again after an interruption, training resumes from the checkpoint
+# if the key still matches and starts over otherwise. It stops once the validation loss has
+# not improved for PATIENCE epochs, and the saved model has the best epoch's weights. The
+# checkpoint is removed once the model is saved.
+#
+# A warm start (--warm-start base.h5) fine-tunes a trained model instead of building a new
+# one. Labels its LabelEncoder does not know are appended to it, so the known labels keep
+# their codes and the output layer only grows. On a catalog only the shards that are new or
+# changed since the base model was trained are used: every saved model records the shards it
+# has seen in <model>_training.json.
+#
+# TensorFlow, scikit-learn and joblib are only imported by the functions that use them, so
+# that 'train --help' and argument errors answer without loading them. The Keras classes
+# (WindowBatches, TrainingCheckpoint) are created from their mixins on first use by keras_class().
 
-    unique_labels = np.unique(labels)
-    print(f"Found {len(unique_labels)} unique labels: {unique_labels}")
+class WindowBatchesMixin:
+    """Feeds Keras batches of windows gathered from a WindowDataset only when each batch is requested."""
 
-    if len(unique_labels) <= 1:
-        print("Error: Cannot train model with only one class.")
-        return
+    def __init__(self, dataset, indices, targets, batch_size=BATCH_SIZE, shuffle=False, seed=42):
+        super().__init__()
+        self.dataset, self.indices, self.targets = dataset, np.asarray(indices), targets
+        self.batch_size, self.shuffle = batch_size, shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = np.arange(len(self.indices))
+        if shuffle: self.rng.shuffle(self.order)
 
-    # --- This is the encoder we need to save ---
-    encoder = LabelEncoder()
-    labels_encoded = encoder.fit_transform(labels)
-    labels_categorical = to_categorical(labels_encoded)
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        sequences, labels_categorical, test_size=0.2, random_state=42, stratify=labels_categorical
-    )
+    def __len__(self):
+        return (len(self.indices) + self.batch_size - 1) // self.batch_size
 
+    def __getitem__(self, batch_index):
+        batch = self.indices[self.order[batch_index * self.batch_size:(batch_index + 1) * self.batch_size]]
+        return self.dataset.windows(batch), self.targets[batch]
+
+    def on_epoch_end(self):
+        if self.shuffle: self.rng.shuffle(self.order)
+
+def catalog_input(shards, chunks, encoder, batch_size=BATCH_SIZE, shuffle=False, seed=42):
+    """
+    tf.data pipeline streaming one-hot labelled batches from catalog shards. Every pass (epoch)
+    draws a new shuffle, and a background thread keeps the next batches ready.
+    """
+    # Imported here so that the CLI starts without TensorFlow.
+    import tensorflow as tf
+    from tensorflow.keras.utils import to_categorical
+    epochs = itertools.count()
+    first = shards[0]
+    n_classes = len(encoder.classes_)
+
+    def generate():
+        batches = iter_catalog_batches(shards, chunks, batch_size, shuffle, seed + next(epochs))
+        for windows, labels in prefetch(batches):
+            yield windows, to_categorical(encoder.transform(labels.astype(str)), num_classes=n_classes)
+
+    signature = (tf.TensorSpec((None, first.sequence_length, first.n_features), tf.float32), tf.TensorSpec((None, n_classes), tf.float32))
+    return tf.data.Dataset.from_generator(generate, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+def build_model(sequence_length, n_features, n_classes):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
     model = Sequential([
-        Input(shape=(X_train.shape[1], X_train.shape[2])),
+        Input(shape=(sequence_length, n_features)),
         LSTM(64, return_sequences=True),
         Dropout(0.3),
         LSTM(32),
         Dropout(0.3),
-        Dense(y_train.shape[1], activation='softmax')
+        Dense(n_classes, activation='softmax')
     ])
 
     model.compile(loss='categorical_crossentropy', optimizer='adam', metrics=['accuracy'])
     model.summary()
+    return model
+
+def warm_start_model(base_model, n_classes):
+    """
+    The base model, recompiled for fine-tuning. If there are new classes, a copy of it whose
+    output layer has n_classes units, the first ones with the base model's weights.
+    """
+    from tensorflow.keras.optimizers import Adam
+    model = base_model
+    base_kernel, base_bias = base_model.layers[-1].get_weights()
+    if len(base_bias) != n_classes:
+        model = build_model(base_model.input_shape[1], base_model.input_shape[2], n_classes)
+        for layer, base_layer in zip(model.layers[:-1], base_model.layers[:-1]):
+            layer.set_weights(base_layer.get_weights())
+        kernel, bias = model.layers[-1].get_weights()
+        kernel[:, :len(base_bias)], bias[:len(base_bias)] = base_kernel, base_bias
+        model.layers[-1].set_weights([kernel, bias])
+    model.compile(loss='categorical_crossentropy', optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), metrics=['accuracy'])
+    return model
+
+def extend_encoder(encoder, labels):
+    """LabelEncoder with the labels encoder does not know appended (sorted); known labels keep their codes."""
+    from sklearn.preprocessing import LabelEncoder
+    new_labels = sorted(set(str(label) for label in labels) - set(str(label) for label in encoder.classes_))
+    extended = LabelEncoder()
+    extended.classes_ = np.array([str(label) for label in encoder.classes_] + new_labels)
+    if new_labels:
+        print(f"New labels for the base model: {new_labels}")
+    return extended
+
+def training_record_path(model_path):
+    return model_path.replace('.h5', '_training.json')
+
+def load_base_model(model_path):
+    """(model, encoder, training record) of a trained model to warm-start from, or None if it is missing."""
+    import joblib
+    from tensorflow.keras.models import load_model
+    encoder_path = model_path.replace('.h5', '_encoder.joblib')
+    if not os.path.exists(model_path) or not os.path.exists(encoder_path):
+        print(f"Error: Model ('{model_path}') or Encoder ('{encoder_path}') to warm-start from not found.")
+        return None
+    record = {'shards': {}}
+    if os.path.exists(training_record_path(model_path)):
+        with open(training_record_path(model_path), 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    return load_model(model_path), joblib.load(encoder_path), record
+
+def training_key(description, warm_start=None):
+    """Key of a training run: its data and labels, and the base model file (size and modification time)."""
+    if warm_start:
+        stat = os.stat(warm_start)
+        description = dict(description, warm_start=[os.path.abspath(warm_start), stat.st_size, stat.st_mtime_ns])
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class TrainingCheckpointMixin:
+    """
+    Saves the model, the best weights and the training state after every epoch, and stops
+    training once the validation loss has not improved for patience epochs.
+    """
+
+    def __init__(self, model_path, key, patience=PATIENCE):
+        super().__init__()
+        self.directory = model_path.replace('.h5', '_checkpoint')
+        self.last_path = os.path.join(self.directory, 'last.h5')
+        self.best_path = os.path.join(self.directory, 'best.weights.h5')
+        self.state_path = os.path.join(self.directory, 'state.json')
+        self.patience = patience
+        self.state = {'key': key, 'epoch': 0, 'best_loss': None, 'best_epoch': None, 'wait': 0}
+
+    def resume(self):
+        """Loads the checkpoint of an interrupted run with the same key. Returns its model, or None."""
+        if not os.path.exists(self.state_path) or not os.path.exists(self.last_path):
+            return None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('key') != self.state['key']:
+            print(f"Ignoring the checkpoint in '{self.directory}': it belongs to training on other data.")
+            return None
+        from tensorflow.keras.models import load_model
+        self.state = state
+        print(f"Resuming training after epoch {state['epoch']} from '{self.directory}'.")
+        return load_model(self.last_path)
+
+    @property
+    def epoch(self):
+        return self.state['epoch']
+
+    @property
+    def stopped(self):
+        return self.state['wait'] >= self.patience
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        loss = logs.get('val_loss', logs.get('loss'))
+        os.makedirs(self.directory, exist_ok=True)
+        if loss is not None and (self.state['best_loss'] is None or loss < self.state['best_loss']):
+            self.state.update(best_loss=float(loss), best_epoch=epoch + 1, wait=0)
+            self.model.save_weights(self.best_path)
+        else:
+            self.state['wait'] += 1
+        self.state['epoch'] = epoch + 1
+        self.model.save(self.last_path)
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp_path, self.state_path)
+        if self.stopped:
+            print(f"Early stopping: the validation loss has not improved for {self.patience} epochs.")
+            self.model.stop_training = True
+
+    def restore_best(self, model):
+        if self.state['best_epoch'] is not None and self.state['best_epoch'] != self.state['epoch'] and os.path.exists(self.best_path):
+            model.load_weights(self.best_path)
+            print(f"Restored the weights of epoch {self.state['best_epoch']} (validation loss {self.state['best_loss']:.4f}).")
 
-    print("Starting model training...")
-    model.fit(X_train, y_train, epochs=20, batch_size=64, validation_data=(X_test, y_test), verbose=2)
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
 
-    # --- Save the Model and the Encoder ---
+@functools.lru_cache(maxsize=None)
+def keras_class(name):
+    """The Keras class 'WindowBatches' (a Sequence) or 'TrainingCheckpoint' (a Callback), built from its mixin."""
+    from tensorflow.keras.callbacks import Callback
+    from tensorflow.keras.utils import Sequence
+    mixin, base = {'WindowBatches': (WindowBatchesMixin, Sequence), 'TrainingCheckpoint': (TrainingCheckpointMixin, Callback)}[name]
+    return type(name, (mixin, base), {'__doc__': mixin.__doc__})
+
+def fit_resumable(model, train_data, validation_data, model_path, key, epochs=EPOCHS, patience=PATIENCE, resume=True):
+    """
+    model.fit with a TrainingCheckpoint, continuing an interrupted run with the same key.
+    Returns the trained model (with the best epoch's weights) and the checkpoint.
+    """
+    checkpoint = keras_class('TrainingCheckpoint')(model_path, key, patience)
+    resumed = checkpoint.resume() if resume else None
+    if resumed is not None:
+        model = resumed
+    if checkpoint.epoch < epochs and not checkpoint.stopped:
+        print("Starting model training...")
+        model.fit(train_data, epochs=epochs, initial_epoch=checkpoint.epoch, validation_data=validation_data, verbose=2, callbacks=[checkpoint])
+    checkpoint.restore_best(model)
+    return model, checkpoint
+
+def save_model(model, encoder, model_path, exports=(), record=None):
+    """Saves the Keras model, the LabelEncoder, the training record and any exported inference artifacts next to it."""
+    import joblib
     model_dir = os.path.dirname(model_path)
     if model_dir:
         os.makedirs(model_dir, exist_ok=True)
@@ -62,11 +249,163 @@ def train_lstm(sequences_path, labels_path, model_path):
     joblib.dump(encoder, encoder_path)
     print(f"Label encoder saved to {encoder_path}")
 
+    # 3. Save what the model was trained on, for later warm starts
+    if record is not None:
+        with open(training_record_path(model_path), 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2, sort_keys=True)
+
+    # 4. Export the optimized CPU inference artifacts (see tflite_backend.py)
+    for backend in exports:
+        export_tflite(model, model_path, backend)
+
+def train_from_catalog(catalog_path, model_path, epochs=EPOCHS, exports=(), warm_start=None, patience=PATIENCE, resume=True):
+    """
+    Trains on every shard registered in a dataset catalog, or with a warm start fine-tunes the
+    base model on the shards it has not seen (or that changed since). Shards are memory-mapped
+    and batches are streamed, so peak memory is bounded by the shuffle buffer, not by the corpus size.
+    """
+    from sklearn.preprocessing import LabelEncoder
+    catalog = DatasetCatalog(catalog_path)
+    fingerprints = catalog.fingerprints()
+    names = catalog.shard_names
+    print(f"Catalog has {len(catalog.shard_names)} shards with {catalog.total_windows} windows.")
+    record = {'shards': {}}
+    if warm_start:
+        base = load_base_model(warm_start)
+        if base is None:
+            return
+        base_model, base_encoder, record = base
+        names = [name for name in names if record['shards'].get(name) != fingerprints[name]]
+        print(f"Fine-tuning '{warm_start}' on the {len(names)} new or changed shards.")
+        if not names:
+            print("Nothing to train on: the base model has seen every shard of the catalog.")
+            return
+
+    classes = catalog.classes_of(names)
+    print(f"Found {len(classes)} unique labels: {classes}")
+    shards = catalog.open_shards(names)
+    if warm_start:
+        if base_model.input_shape[1:] != (catalog.sequence_length, shards[0].n_features):
+            print(f"Error: The base model takes windows of shape {base_model.input_shape[1:]}, the catalog holds {(catalog.sequence_length, shards[0].n_features)}.")
+            return
+        encoder = extend_encoder(base_encoder, classes)
+        model = warm_start_model(base_model, len(encoder.classes_))
+    else:
+        if len(classes) <= 1:
+            print("Error: Cannot train model with only one class.")
+            return
+        encoder = LabelEncoder().fit(classes)
+        model = build_model(catalog.sequence_length, shards[0].n_features, len(classes))
+
+    train_chunks, validation_chunks = split_chunks(catalog.chunks(names=names))
+    key = training_key({'catalog': os.path.abspath(catalog_path), 'shards': {name: fingerprints[name] for name in names}, 'classes': encoder.classes_.tolist()}, warm_start)
+    model, checkpoint = fit_resumable(
+        model,
+        catalog_input(shards, train_chunks, encoder, shuffle=True),
+        catalog_input(shards, validation_chunks, encoder) if len(validation_chunks) else None,
+        model_path, key, epochs, patience, resume,
+    )
+    record = {
+        'shards': dict(record['shards'], **{name: fingerprints[name] for name in names}),
+        'classes': encoder.classes_.tolist(),
+        'base_model': warm_start,
+        'epochs': checkpoint.epoch,
+        'best_epoch': checkpoint.state['best_epoch'],
+    }
+    save_model(model, encoder, model_path, exports, record)
+    checkpoint.remove()
+
+def train_lstm(dataset_path, model_path, sequence_length=None, exports=(), epochs=EPOCHS, warm_start=None, patience=PATIENCE, resume=True):
+    """
+    Trains an LSTM model and saves both the model and its label encoder. dataset_path is a
+    window dataset directory or a dataset catalog (.json) of many of them.
+    """
+    if os.path.isfile(dataset_path):
+        if sequence_length:
+            print("Error: --sequence_length cannot be used with a catalog; its shards share the prepared length.")
+            return
+        train_from_catalog(dataset_path, model_path, epochs, exports, warm_start, patience, resume)
+        return
+    if not os.path.isdir(dataset_path):
+        print(f"Error: Window dataset not found at '{dataset_path}'.")
+        return
+
+    dataset = WindowDataset.load(dataset_path)
+    if sequence_length and sequence_length != dataset.sequence_length:
+        print(f"Re-indexing the dataset with {sequence_length}-step windows (prepared with {dataset.sequence_length}).")
+        dataset = dataset.with_window(sequence_length)
+    train_model(dataset, model_path, exports, epochs, warm_start, patience, resume)
+
+def train_model(dataset, model_path, exports=(), epochs=EPOCHS, warm_start=None, patience=PATIENCE, resume=True):
+    """
+    Trains the LSTM on a WindowDataset (or with a warm start fine-tunes the base model on it)
+    and saves the model and its label encoder. Windows are gathered batch by batch, so the
+    dense sequence array is never built.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+    from tensorflow.keras.utils import to_categorical
+    labels = dataset.labels
+    unique_labels = np.unique(labels)
+    print(f"Found {len(unique_labels)} unique labels: {unique_labels}")
+
+    if warm_start:
+        base = load_base_model(warm_start)
+        if base is None:
+            return
+        base_model, base_encoder, record = base
+        if base_model.input_shape[2] != dataset.n_features:
+            print(f"Error: The base model takes {base_model.input_shape[2]} features, the dataset has {dataset.n_features}.")
+            return
+        if base_model.input_shape[1] != dataset.sequence_length:
+            print(f"Re-indexing the dataset with the base model's {base_model.input_shape[1]}-step windows (prepared with {dataset.sequence_length}).")
+            dataset = dataset.with_window(base_model.input_shape[1])
+            labels = dataset.labels
+        encoder = extend_encoder(base_encoder, unique_labels)
+    elif len(unique_labels) <= 1:
+        print("Error: Cannot train model with only one class.")
+        return
+    else:
+        # --- This is the encoder we need to save ---
+        encoder = LabelEncoder().fit(labels)
+        record = {'shards': {}}
+
+    labels_encoded = encoder.transform(labels)
+    labels_categorical = to_categorical(labels_encoded, num_classes=len(encoder.classes_))
+    
+    # Splitting window indices gives the same partition as splitting the dense arrays did.
+    train_indices, test_indices = train_test_split(
+        np.arange(len(dataset)), test_size=0.2, random_state=42, stratify=labels_categorical
+    )
+
+    if warm_start:
+        model = warm_start_model(base_model, labels_categorical.shape[1])
+    else:
+        model = build_model(dataset.sequence_length, dataset.n_features, labels_categorical.shape[1])
+
+    WindowBatches = keras_class('WindowBatches')
+    train_batches = WindowBatches(dataset, train_indices, labels_categorical, shuffle=True)
+    test_batches = WindowBatches(dataset, test_indices, labels_categorical)
+    data_digest = hashlib.sha256(np.ascontiguousarray(dataset.window_starts).tobytes() + np.ascontiguousarray(dataset.label_codes).tobytes()).hexdigest()
+    key = training_key({'dataset': data_digest, 'frames': len(dataset.features), 'sequence_length': dataset.sequence_length, 'classes': encoder.classes_.tolist()}, warm_start)
+    model, checkpoint = fit_resumable(model, train_batches, test_batches, model_path, key, epochs, patience, resume)
+
+    # A single dataset is not a catalog shard; the record keeps the shards of the base model.
+    record = {'shards': record['shards'], 'classes': encoder.classes_.tolist(), 'base_model': warm_start,
+              'epochs': checkpoint.epoch, 'best_epoch': checkpoint.state['best_epoch']}
+    save_model(model, encoder, model_path, exports, record)
+    checkpoint.remove()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train an LSTM model.")
-    parser.add_argument("sequences_path", help="Path to the input sequences (.npy).")
-    parser.add_argument("labels_path", help="Path to the input labels (.npy).")
+    parser.add_argument("dataset_path", help="Path to the window dataset written by prepare_data_for_ml.py, or to a dataset catalog (.json).")
     parser.add_argument("model_path", help="Path to save the trained model (.h5).")
+    parser.add_argument("--sequence_length", type=int, help="Train on windows of this many time steps instead of the prepared length.")
+    parser.add_argument("--export", nargs='+', choices=BACKENDS[1:], default=[], help="Also export the trained model for these CPU inference backends (e.g., 'tflite tflite-int8').")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help=f"Maximum number of training epochs (default: {EPOCHS}).")
+    parser.add_argument("--patience", type=int, default=PATIENCE, help=f"Stop after this many epochs without a lower validation loss (default: {PATIENCE}).")
+    parser.add_argument("--warm-start", help="Trained model (.h5) to fine-tune instead of training from scratch; on a catalog only new or changed shards are used.")
+    parser.add_argument("--no-resume", action="store_true", help="Start over even if an interrupted run left a checkpoint next to model_path.")
     args = parser.parse_args()
-    train_lstm(args.sequences_path, args.labels_path, args.model_path)
\ No newline at end of file
+    train_lstm(args.dataset_path, args.model_path, args.sequence_length, args.export, args.epochs, args.warm_start, args.patience, not args.no_resume)
\ No newline at end of file
@@ -1,15 +1,18 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-import matplotlib.colors as mcolors
 import os
 import argparse
+from storage import read_table
+from schema import aircraft_name, aircraft_rows
 
 def plot_3d_flight_path(df, aircraft_id, output_path):
     """
     Plots the 3D flight path of a specific aircraft and saves it to a file.
     """
-    aircraft_df = df[df['Id'] == aircraft_id].copy()
+    # Imported here so that only plotting pays for loading matplotlib.
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D
+    import matplotlib.colors as mcolors
+
+    aircraft_df = df[aircraft_rows(df['Id'], aircraft_id)].copy()
 
     if aircraft_df.empty:
         print(f"No data found for aircraft ID: {aircraft_id}")
@@ -51,7 +54,7 @@ def plot_3d_flight_path(df, aircraft_id, output_path):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Visualize 3D flight path for a specific aircraft.")
-    parser.add_argument("input_csv", help="Path to the maneuver_labeled CSV file.")
+    parser.add_argument("input_csv", help="Path to the maneuver_labeled table (CSV, Parquet or Feather).")
     parser.add_argument("output_plot", help="Path to save the output plot (.png).")
     parser.add_argument("-id", "--aircraft_id", help="Specific aircraft ID to plot. If not provided, the aircraft with the most data points will be used.", default=None)
     args = parser.parse_args()
@@ -59,7 +62,7 @@ if __name__ == "__main__":
     if not os.path.exists(args.input_csv):
         print(f"Error: Input file not found at '{args.input_csv}'")
     else:
-        df = pd.read_csv(args.input_csv)
+        df = read_table(args.input_csv)
         
         aircraft_id_to_plot = args.aircraft_id
         if not aircraft_id_to_plot:
@@ -70,5 +73,5 @@ if __name__ == "__main__":
                 aircraft_id_to_plot = None
         
         if aircraft_id_to_plot:
-            # Convert aircraft ID to string to match pandas behavior
-            plot_3d_flight_path(df, str(aircraft_id_to_plot), args.output_plot)
\ No newline at end of file
+            # Ids are stored as integers; plots are titled with the ACMI object id.
+            plot_3d_flight_path(df, aircraft_name(aircraft_id_to_plot), args.output_plot)
\ No newline at end of file
@@ -0,0 +1,205 @@
+import os
+import json
+import numpy as np
+from schema import MANEUVER_LABELS, NO_LABEL, code_dtype, label_codes, maneuver_vocabulary
+
+# --- Index-based ("virtual") window datasets ---
+# A dense sequence array stores every frame sequence_length times. A window dataset stores the
+# per-frame feature matrix and labels once, plus where each aircraft's frames start and end;
+# windows are just start offsets into the feature matrix and are gathered on demand, one batch
+# at a time. Because the per-frame labels are kept, the window length and stride can be changed
+# without re-running the pipeline.
+#
+# Labels are stored as int8 codes into the maneuver vocabulary of schema.py (code 0, '', is
+# no maneuver; windows without a maneuver decode to 'No_Maneuver').
+#
+# On disk a dataset is a directory of plain .npy files (so features can be memory-mapped):
+#   features.npy       (frames, n_features) float32 per-frame feature matrix
+#   frame_codes.npy    (frames,) maneuver label code of each frame
+#   segments.npy       (aircraft, 2) half-open [start, end) frame range of every aircraft
+#   segment_ids.npy    (aircraft,) aircraft ids
+#   window_starts.npy  (windows,) start frame of every window
+#   label_codes.npy    (windows,) label code of every window
+#   meta.json          sequence_length, stride, feature_cols, vocabulary
+# Version 1 datasets (string labels in frame_labels.npy/labels.npy) are still loaded.
+
+DATASET_VERSION = 2
+DATASET_ARRAYS = ('features', 'frame_codes', 'segments', 'segment_ids', 'window_starts', 'label_codes')
+MAPPED_ARRAYS = ('features', 'frame_codes', 'window_starts', 'label_codes')
+NO_MANEUVER = 'No_Maneuver'
+
+def window_mode_codes(frame_codes, window_starts, sequence_length, vocabulary):
+    """
+    Code of the most frequent labeled frame code of every window [start, start +
+    sequence_length), or 0 (no maneuver) if a window has none. Window counts come from one
+    cumulative sum per label, so the cost is O(rows x labels) instead of O(windows x
+    sequence_length) Python work. Ties go to the alphabetically first label.
+    """
+    frame_codes = np.asarray(frame_codes)
+    best_counts = np.zeros(len(window_starts), dtype=np.int64)
+    best_codes = np.zeros(len(window_starts), dtype=code_dtype(vocabulary))
+    cumulative = np.zeros(len(frame_codes) + 1, dtype=np.int64)
+    present = np.unique(frame_codes)
+    for code in sorted(present[present > 0].tolist(), key=lambda code: vocabulary[code]):
+        np.cumsum(frame_codes == code, out=cumulative[1:])
+        counts = cumulative[window_starts + sequence_length] - cumulative[window_starts]
+        better = counts > best_counts
+        best_counts[better], best_codes[better] = counts[better], code
+    return best_codes
+
+def label_names(vocabulary):
+    """Window label of every code: the vocabulary with 'No_Maneuver' for no maneuver."""
+    return np.array([NO_MANEUVER if label == NO_LABEL else label for label in vocabulary])
+
+def _decode(names, codes):
+    labels = names[codes]
+    # Size the string dtype to the labels actually used, as np.array(list_of_labels) would.
+    return labels.astype(f"<U{max(np.char.str_len(labels).max(initial=0), 1)}")
+
+def frame_label_codes(parts_labels):
+    """
+    Codes of the per-frame labels of several aircraft (categoricals or strings, '' or missing
+    if none) in one shared maneuver vocabulary. Returns (codes per part, vocabulary).
+    """
+    encoded = [label_codes(labels) for labels in parts_labels]
+    vocabulary = maneuver_vocabulary(name for _, names in encoded for name in names)
+    remapped = []
+    for codes, names in encoded:
+        # Index -1 (missing) of the lookup table is the last entry: no maneuver.
+        lookup = np.array([vocabulary.index(name) for name in names] + [0], dtype=code_dtype(vocabulary))
+        remapped.append(lookup[codes])
+    return remapped, vocabulary
+
+def window_mode_labels(maneuver_labels, window_starts, sequence_length):
+    """
+    Most frequent non-empty label of every window [start, start + sequence_length), or
+    'No_Maneuver' if a window has none (window_mode_codes on labels).
+    """
+    (codes,), vocabulary = frame_label_codes([maneuver_labels])
+    return _decode(label_names(vocabulary), window_mode_codes(codes, window_starts, sequence_length, vocabulary))
+
+def window_starts_for(segments, sequence_length, stride=1):
+    """Start frame of every window that fits inside one segment, one every stride frames."""
+    if stride < 1:
+        raise ValueError(f"stride must be at least 1, got {stride}")
+    starts = [np.arange(start, end - sequence_length + 1, stride, dtype=np.int64) for start, end in segments]
+    return np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+class WindowDataset:
+    """Per-frame features and label codes plus a window index over them."""
+
+    def __init__(self, features, frame_codes, segments, segment_ids, sequence_length, stride=1, feature_cols=None, window_starts=None, label_codes=None, vocabulary=MANEUVER_LABELS):
+        self.features = features
+        self.frame_codes = frame_codes
+        self.vocabulary = tuple(vocabulary)
+        self.segments = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+        self.segment_ids = np.asarray(segment_ids)
+        self.sequence_length = int(sequence_length)
+        self.stride = int(stride)
+        self.feature_cols = list(feature_cols) if feature_cols is not None else None
+        self.window_starts = window_starts if window_starts is not None else window_starts_for(self.segments, self.sequence_length, self.stride)
+        self.label_codes = label_codes if label_codes is not None else window_mode_codes(frame_codes, self.window_starts, self.sequence_length, self.vocabulary)
+        self.label_names = label_names(self.vocabulary)
+
+    @classmethod
+    def from_segments(cls, parts, sequence_length, stride=1, feature_cols=None):
+        """Builds a dataset from (aircraft_id, features, frame_labels) parts, one per aircraft."""
+        parts = list(parts)
+        lengths = np.array([len(features) for _, features, _ in parts], dtype=np.int64)
+        ends = np.cumsum(lengths)
+        frame_codes, vocabulary = frame_label_codes([frame_labels for _, _, frame_labels in parts])
+        return cls(
+            np.concatenate([np.asarray(features, dtype=np.float32) for _, features, _ in parts]),
+            np.concatenate(frame_codes),
+            np.column_stack([ends - lengths, ends]),
+            np.array([str(aircraft_id) for aircraft_id, _, _ in parts]),
+            sequence_length, stride, feature_cols, vocabulary=vocabulary,
+        )
+
+    def __len__(self):
+        return len(self.window_starts)
+
+    @property
+    def n_features(self):
+        return self.features.shape[1]
+
+    @property
+    def labels(self):
+        """Label of every window, as strings."""
+        return _decode(self.label_names, self.label_codes)
+
+    @property
+    def frame_labels(self):
+        """Maneuver label of every frame, as strings ('' if none)."""
+        return _decode(np.array(self.vocabulary), self.frame_codes)
+
+    def window_labels(self, indices):
+        """Labels (strings) of the windows with the given indices."""
+        return self.label_names[self.label_codes[indices]]
+
+    def with_window(self, sequence_length, stride=None):
+        """The same frames indexed with another window length and/or stride; nothing is copied."""
+        return WindowDataset(self.features, self.frame_codes, self.segments, self.segment_ids, sequence_length,
+                             self.stride if stride is None else stride, self.feature_cols, vocabulary=self.vocabulary)
+
+    def windows(self, indices):
+        """Gathers the windows with the given indices into a (len(indices), sequence_length, n_features) array."""
+        frames = self.window_starts[indices][:, None] + np.arange(self.sequence_length)
+        return np.asarray(self.features[frames])
+
+    def iter_batches(self, batch_size, indices=None):
+        """Yields (indices, windows) batches in order, building each batch on the fly."""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            yield batch, self.windows(batch)
+
+    def dense(self):
+        """Materializes every window, i.e. the old (sequences, labels) arrays."""
+        return self.windows(np.arange(len(self))), self.labels
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in DATASET_ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        meta = {'version': DATASET_VERSION, 'sequence_length': self.sequence_length, 'stride': self.stride, 'feature_cols': self.feature_cols,
+                'vocabulary': list(self.vocabulary)}
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Loads a dataset saved with save(). By default the per-frame and per-window arrays are
+        memory-mapped, so opening a dataset costs almost no memory whatever its size.
+        """
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No window dataset found at '{path}'.")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') == 1:
+            return cls._load_v1(path, meta, mmap_mode)
+        if meta.get('version') != DATASET_VERSION:
+            raise ValueError(f"Unsupported window dataset version {meta.get('version')} in '{path}'.")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode if name in MAPPED_ARRAYS else None)
+                  for name in DATASET_ARRAYS}
+        return cls(arrays['features'], arrays['frame_codes'], arrays['segments'], arrays['segment_ids'],
+                   meta['sequence_length'], meta['stride'], meta.get('feature_cols'), arrays['window_starts'], arrays['label_codes'], meta['vocabulary'])
+
+    @classmethod
+    def _load_v1(cls, path, meta, mmap_mode):
+        """Loads a version 1 dataset (string labels), encoding its labels in memory."""
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode if name in ('features', 'window_starts') else None)
+                  for name in ('features', 'frame_labels', 'segments', 'segment_ids', 'window_starts', 'labels')}
+        (frame_codes,), vocabulary = frame_label_codes([arrays['frame_labels']])
+        window_labels = np.where(arrays['labels'] == NO_MANEUVER, NO_LABEL, arrays['labels'])
+        window_codes = label_codes(window_labels, vocabulary)[0]
+        return cls(arrays['features'], frame_codes, arrays['segments'], arrays['segment_ids'],
+                   meta['sequence_length'], meta['stride'], meta.get('feature_cols'), arrays['window_starts'], window_codes, vocabulary)
+
+def dataset_size_report(dataset):
+    """Bytes on disk/in memory of the window dataset versus the equivalent dense sequence array."""
+    stored = sum(np.asarray(array).nbytes for array in (dataset.features, dataset.frame_codes, dataset.window_starts, dataset.label_codes))
+    dense = len(dataset) * dataset.sequence_length * dataset.n_features * dataset.features.dtype.itemsize + dataset.labels.nbytes
+    return stored, dense